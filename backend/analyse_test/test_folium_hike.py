@@ -5,6 +5,7 @@ import folium
 import sys
 from utils.db_utils import MySQLUtils
 from utils.mongo_utils import MongoUtils
+from services.trace_store import doc_coords
 
 
 # Paramètre : id MySQL de la randonnée
@@ -32,7 +33,7 @@ if not trace:
     sys.exit(1)
 
 # Extraction des points
-points = [(pt["lat"], pt["lon"]) for pt in trace["points"]]
+points = list(zip(*(coords.tolist() for coords in doc_coords(trace))))
 if not points:
     print("Aucun point dans la trace.")
     sys.exit(1)
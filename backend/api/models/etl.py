@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 class GPXUploadResponse(BaseModel):
@@ -6,8 +7,29 @@ class GPXUploadResponse(BaseModel):
     message: str
     city: Optional[str] = None
     role: Optional[str] = None
+    job_id: Optional[str] = None
 
 class GPXDeleteResponse(BaseModel):
     success: bool
     message: str
     deleted_file: Optional[str] = None
+
+class BulkImportResponse(BaseModel):
+    success: bool
+    message: str
+    state: Dict[str, Any] = {}
+
+class JobStage(BaseModel):
+    stage: str
+    at: datetime
+
+class GPXJobStatus(BaseModel):
+    id: str
+    filename: str
+    status: str
+    stage: str
+    stages: List[JobStage] = []
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    city: Optional[str] = None
+    message: Optional[str] = None
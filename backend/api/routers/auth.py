@@ -4,6 +4,7 @@ from api.models.auth import UserLogin
 from fastapi.responses import ORJSONResponse
 from passlib.hash import bcrypt
 from datetime import datetime, timedelta
+from utils.async_utils import run_blocking
 from services.authentification import (
     get_user_by_username, get_roles_for_user, insert_auth_log, create_access_token
 )
@@ -12,21 +13,21 @@ router = APIRouter()
 
 @router.post("/login", summary="Login user and return JWT token")
 async def login(request: Request, body: UserLogin = Body(...)) -> ORJSONResponse:
-    username = body.username
-    password = body.password
+    # SQLite et bcrypt.verify (volontairement lent) sont bloquants : exécutés dans
+    # le pool de threads pour ne pas figer la boucle d'événements.
+    content, status_code = await run_blocking(_authenticate, body.username, body.password)
+    return ORJSONResponse(content=content, status_code=status_code)
+
+
+def _authenticate(username, password) -> tuple[dict, int]:
+    """Vérifie les identifiants et émet le JWT ; retourne (contenu, code HTTP)."""
     user = get_user_by_username(username)
     if not user or not bcrypt.verify(password or "", user[2]):
         insert_auth_log(user[0] if user else None, username, "failed_login", "/auth/login", 401, token=None, filename=None)
-        return ORJSONResponse(
-            content={"success": False, "message": "Identifiants invalides"},
-            status_code=401,
-        )
+        return {"success": False, "message": "Identifiants invalides"}, 401
     if not user[3]:
         insert_auth_log(user[0], user[1], "login_inactive", "/auth/login", 401, token=None, filename=None)
-        return ORJSONResponse(
-            content={"success": False, "message": "Utilisateur inactif"},
-            status_code=401,
-        )
+        return {"success": False, "message": "Utilisateur inactif"}, 401
     roles = list(get_roles_for_user(user[0]))
     token_data = {
         "user_id": user[0],
@@ -37,14 +38,12 @@ async def login(request: Request, body: UserLogin = Body(...)) -> ORJSONResponse
     token = create_access_token(token_data, expires_delta)
     expires_at = (datetime.utcnow() + expires_delta).isoformat() + "Z"
     insert_auth_log(user[0], user[1], "login", "/auth/login", 200, token=token, filename=None)
-    return ORJSONResponse(
-        content={
-            "success": True,
-            "user": {"id": int(user[0]), "username": user[1], "roles": roles},
-            "token": token,
-            "expires_at": expires_at
-        }
-    )
+    return {
+        "success": True,
+        "user": {"id": int(user[0]), "username": user[1], "roles": roles},
+        "token": token,
+        "expires_at": expires_at
+    }, 200
 
 @router.post("/logout", summary="Logout user")
 async def logout(request: Request) -> ORJSONResponse:
@@ -1,17 +1,22 @@
 from utils.db_utils import MySQLUtils
-from utils.mongo_utils import MongoUtils
+from services.trace_store import delete_traces
+import shutil
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from pathlib import Path
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from utils.service_utils import ServiceUtil
-from api.models.etl import GPXUploadResponse, GPXDeleteResponse
-from etl.etl_pipeline import main as run_etl_pipeline
+from api.models.etl import BulkImportResponse, GPXDeleteResponse, GPXJobStatus, GPXUploadResponse
+from etl.bulk_import_gpx import bulk_import
+from etl.city_stats import refresh_city_stats_around
+from services import gpx_jobs
 from services.authentification import get_roles_for_user, insert_auth_log
+from utils.async_utils import run_blocking
 
 router = APIRouter()
 
 ALLOWED_EXT = {"gpx"}
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 security = HTTPBearer()
 
 
@@ -31,58 +36,62 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     except JWTError:
         raise HTTPException(status_code=401, detail="Token invalide")
 
-@router.post("/upload_gpx", summary="Upload a GPX file and launch the ETL pipeline (Admin and Contributor only)", response_model=GPXUploadResponse)
+def _save_upload(source, dest_path: Path) -> None:
+    with open(dest_path, "wb") as dest:
+        shutil.copyfileobj(source, dest, UPLOAD_CHUNK_SIZE)
+
+
+@router.post("/upload_gpx", summary="Upload a GPX file and queue its import (Admin and Contributor only)", response_model=GPXUploadResponse)
 async def upload_gpx(
     file: UploadFile = File(..., description="Fichier GPX"),
     user=Depends(get_current_user)
 ):
+    """
+    Enregistre le fichier et met son import en file (services.gpx_jobs) : la
+    réponse part dès l'écriture sur disque, avec un job_id à suivre sur
+    GET /api/etl/jobs/{job_id}.
+    """
     # Récupérer le rôle de l'utilisateur
     user_id = user["user_id"]
-    roles = get_roles_for_user(user_id)
+    roles = await run_blocking(get_roles_for_user, user_id)
     user_role = "admin" if "admin" in roles else "user"
+    # Nom réduit à sa partie finale : pas d'écriture hors du dossier data.
+    filename = Path(file.filename or "").name
     # Vérification extension
-    ext = file.filename.split(".")[-1].lower()
+    ext = filename.split(".")[-1].lower()
     if ext not in ALLOWED_EXT:
         return GPXUploadResponse(success=False, message=f"Extension non autorisée: {ext}")
     # Sauvegarde du fichier dans le dossier data (volume Docker)
     DATA = Path("/usr/src/data")
     DATA.mkdir(parents=True, exist_ok=True)
-    dest_path = DATA / file.filename
-    with open(dest_path, "wb") as f:
-        f.write(await file.read())
-    # Lancer le pipeline ETL (traitement synchrone)
-    try:
-        city = run_etl_pipeline(user_role=user_role)
-        # Si city est une liste, on ne retourne que la première (pour compatibilité front)
-        if isinstance(city, list):
-            city = city[0] if city else None
-        if city:
-            msg = f"Nouveau tracé sur {city} (fichier {file.filename})."
-        else:
-            msg = f"Fichier {file.filename} importé."
-        # Audit log - succès
-        insert_auth_log(
-            user_id=user_id,
-            username=user["username"],
-            action="upload_gpx",
-            route="/api/etl/upload_gpx",
-            status_code=200,
-            token=None,
-            filename=file.filename
-        )
-        return GPXUploadResponse(success=True, message=msg, city=city, role=user_role)
-    except Exception as e:
-        # Audit log - échec
-        insert_auth_log(
-            user_id=user_id,
-            username=user["username"],
-            action="upload_gpx_failed",
-            route="/api/etl/upload_gpx",
-            status_code=500,
-            token=None,
-            filename=file.filename
-        )
-        return GPXUploadResponse(success=False, message=f"Erreur ETL: {e}", role=user_role)
+    dest_path = DATA / filename
+    # Copie par blocs : le fichier (jusqu'à 20 Mo) n'est jamais entier en mémoire.
+    await run_blocking(_save_upload, file.file, dest_path)
+    job_id = gpx_jobs.submit(dest_path, verifie=1 if user_role == "admin" else 0, user=user)
+    # Audit log - fichier reçu (un échec du traitement est journalisé par le job)
+    await run_blocking(
+        insert_auth_log,
+        user_id=user_id,
+        username=user["username"],
+        action="upload_gpx",
+        route="/api/etl/upload_gpx",
+        status_code=200,
+        token=None,
+        filename=filename
+    )
+    msg = f"Fichier {filename} reçu, import en cours."
+    return GPXUploadResponse(success=True, message=msg, role=user_role, job_id=job_id)
+
+
+@router.get("/jobs/{job_id}", summary="Progress of a GPX import job", response_model=GPXJobStatus)
+async def gpx_job_status(job_id: str, user=Depends(get_current_user)):
+    """État et étapes d'un import lancé par upload_gpx (son auteur ou un admin)."""
+    job = gpx_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job inconnu")
+    if job["user_id"] != user["user_id"]:
+        await _require_admin(user)
+    return GPXJobStatus(**job)
 
 @router.delete("/delete_gpx/{filename}", summary="Delete a GPX file (Admin only)", response_model=GPXDeleteResponse)
 async def delete_gpx(
@@ -94,7 +103,7 @@ async def delete_gpx(
     """
     # Vérifier que l'utilisateur est admin
     user_id = user["user_id"]
-    roles = get_roles_for_user(user_id)
+    roles = await run_blocking(get_roles_for_user, user_id)
     if "admin" not in roles:
         raise HTTPException(status_code=403, detail="Accès refusé : rôle admin requis")
 
@@ -103,24 +112,11 @@ async def delete_gpx(
     if ext not in ALLOWED_EXT:
         return GPXDeleteResponse(success=False, message=f"Extension non autorisée: {ext}")
 
-    # Suppression dans MySQL
-    cnx = MySQLUtils.connect()
-    cursor = cnx.cursor()
-    cursor.execute("DELETE FROM hikes WHERE filename = %s", (filename,))
-    mysql_deleted = cursor.rowcount
-    cnx.commit()
-    cursor.close()
-    MySQLUtils.disconnect(cnx)
-
-    # Suppression dans MongoDB
-    MongoUtils.connect()
-    collection = MongoUtils.get_collection("gpx_traces")
-    result = collection.delete_many({"filename": filename})
-    mongo_deleted = result.deleted_count
-    MongoUtils.disconnect()
+    mysql_deleted, mongo_deleted = await run_blocking(_delete_gpx_records, filename)
 
     # Audit log - succès
-    insert_auth_log(
+    await run_blocking(
+        insert_auth_log,
         user_id=user_id,
         username=user["username"],
         action="delete_gpx",
@@ -130,4 +126,48 @@ async def delete_gpx(
         filename=filename
     )
     msg = f"Suppression en base : MySQL={mysql_deleted}, MongoDB={mongo_deleted}"
-    return GPXDeleteResponse(success=True, message=msg, deleted_file=filename)
\ No newline at end of file
+    return GPXDeleteResponse(success=True, message=msg, deleted_file=filename)
+
+
+async def _require_admin(user) -> None:
+    roles = await run_blocking(get_roles_for_user, user["user_id"])
+    if "admin" not in roles:
+        raise HTTPException(status_code=403, detail="Accès refusé : rôle admin requis")
+
+
+@router.post("/bulk_import_gpx", summary="Import every GPX file of the data folder in bulk (Admin only)", response_model=BulkImportResponse)
+async def start_bulk_import(user=Depends(get_current_user)):
+    """
+    Lance en arrière-plan l'import en masse des fichiers GPX déposés dans le
+    dossier data (etl.bulk_import_gpx) ; l'avancement se suit avec GET.
+    """
+    await _require_admin(user)
+    started = bulk_import.start(verifie=1)
+    message = "Import en masse lancé" if started else "Un import en masse est déjà en cours"
+    return BulkImportResponse(success=started, message=message, state=bulk_import.state())
+
+
+@router.get("/bulk_import_gpx", summary="Progress of the bulk GPX import (Admin only)", response_model=BulkImportResponse)
+async def bulk_import_status(user=Depends(get_current_user)):
+    await _require_admin(user)
+    state = bulk_import.state()
+    message = "Import en cours" if state.get("running") else "Aucun import en cours"
+    return BulkImportResponse(success=True, message=message, state=state)
+
+
+def _delete_gpx_records(filename: str) -> tuple[int, int]:
+    """Supprime la randonnée (MySQL) et son tracé (MongoDB) ; retourne les compteurs."""
+    # Suppression dans MySQL
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        cursor.execute("SELECT start_latitude, start_longitude FROM hikes WHERE filename = %s", (filename,))
+        start_points = cursor.fetchall()
+        cursor.execute("DELETE FROM hikes WHERE filename = %s", (filename,))
+        mysql_deleted = cursor.rowcount
+        cnx.commit()
+        cursor.close()
+    refresh_city_stats_around(start_points)
+
+    # Suppression dans MongoDB (tracé et GPX d'origine rangé dans GridFS)
+    mongo_deleted = delete_traces(filename)
+    return mysql_deleted, mongo_deleted
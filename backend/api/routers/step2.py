@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Query, Body
+import unicodedata
+from urllib.parse import quote
+
+from fastapi import APIRouter, Query, Body, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from services.plan_service import insert_or_update_plan
-from utils.db_utils import MySQLUtils
+from utils.db_utils import MySQLUtils, get_db
 from utils.display_utils import enrich_hike
+from utils.trace_utils import encode_polyline, zoom_to_tolerance_m
+from services.trace_store import GPX_MEDIA_TYPE, fetch_profile, fetch_trace, open_raw_gpx
 from utils.logger_util import LoggerUtil
 
 router = APIRouter()
@@ -10,7 +16,8 @@ logger = LoggerUtil.get_logger(__name__)
 @router.get("/hikes", summary="Returns the hikes for a given city with details.")
 def get_hikes(
     city_id: int = Query(..., description="ID de la ville"),
-    distance_km: float = Query(5, description="Rayon de recherche en km autour de la ville")
+    distance_km: float = Query(5, description="Rayon de recherche en km autour de la ville"),
+    cnx=Depends(get_db)
 ):
     """
     Retourne les randonnées pour une ville donnée avec tous les détails :
@@ -20,7 +27,6 @@ def get_hikes(
     Vérifiées ou non, quel que soit le statut de connexion de l'utilisateur.
     """
     logger.info(f"Route /hikes appelée avec city_id={city_id}")
-    cnx = MySQLUtils.connect()
     cursor = cnx.cursor(dictionary=True)
     
     # Récupérer les coordonnées de la ville
@@ -32,19 +38,17 @@ def get_hikes(
     
     if not city:
         cursor.close()
-        MySQLUtils.disconnect(cnx)
         return []
     
-    # Calculer la bounding box autour de la ville
-    from utils.geo_utils import get_bounding_box
-    min_lat, min_lon, max_lat, max_lon = get_bounding_box(
-        city['latitude'], 
-        city['longitude'], 
-        distance_km
+    # Rayon autour de la ville : index géographique en mémoire (ou, à défaut,
+    # index SPATIAL MySQL sur le point de départ)
+    from services.geo_index import radius_filter
+    radius_where, radius_params = radius_filter(
+        "hikes", "id", "start_location", city['latitude'], city['longitude'], distance_km, cnx=cnx
     )
-    
+
     # Toutes les randonnées (vérifiées et non vérifiées)
-    query = """
+    query = f"""
         SELECT
             id,
             name,
@@ -58,47 +62,112 @@ def get_hikes(
             description,
             city_id
         FROM hikes
-        WHERE start_latitude BETWEEN %s AND %s
-        AND start_longitude BETWEEN %s AND %s
+        WHERE {radius_where}
         ORDER BY name ASC
     """
 
-    cursor.execute(query, (min_lat, max_lat, min_lon, max_lon))
+    cursor.execute(query, radius_params)
     hikes = cursor.fetchall()
-
     cursor.close()
-    MySQLUtils.disconnect(cnx)
 
     # Champs prêts à afficher (badge, catégories, libellés) calculés en Python :
     # le frontend n'a plus qu'à les insérer dans la page.
     return [enrich_hike(h, i, len(hikes)) for i, h in enumerate(hikes)]
 
 @router.get("/hike/{hike_id}/trace", summary="Get GPS trace points for a hike from MongoDB.")
-def get_hike_trace(hike_id: int):
-    """Retourne les points lat/lon de la trace GPX depuis MongoDB."""
-    from utils.mongo_utils import MongoUtils
-    from bson import ObjectId
+def get_hike_trace(
+    hike_id: int,
+    zoom: float = Query(None, ge=0, le=22, description="Zoom de la carte : tracé simplifié à un pixel près"),
+    tolerance_m: float = Query(None, ge=0, description="Tolérance de simplification en mètres (prioritaire sur zoom)"),
+    encoding: str = Query("points", pattern="^(points|polyline)$", description="points (liste lat/lon) ou polyline encodée"),
+):
+    """
+    Retourne les points lat/lon de la trace GPX depuis MongoDB.
 
-    cnx = MySQLUtils.connect()
-    cursor = cnx.cursor(dictionary=True)
-    cursor.execute("SELECT mongo_id FROM hikes WHERE id = %s", (hike_id,))
-    hike = cursor.fetchone()
-    cursor.close()
-    MySQLUtils.disconnect(cnx)
+    Sans zoom ni tolérance, tous les points enregistrés sont renvoyés. Avec l'un
+    des deux, le tracé est simplifié : une carte ne distingue pas les points à
+    moins d'un pixel de la ligne. Le niveau de détail pré-calculé à l'import le
+    plus grossier qui suffit est renvoyé tel quel (services.trace_store).
+    """
+    empty = {"points": []} if encoding == "points" else {"polyline": ""}
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        cursor.execute("SELECT mongo_id FROM hikes WHERE id = %s", (hike_id,))
+        hike = cursor.fetchone()
+        cursor.close()
 
     if not hike or not hike.get("mongo_id"):
-        return {"points": []}
+        return empty
 
+    if tolerance_m is None and zoom is not None:
+        tolerance_m = zoom_to_tolerance_m(zoom)
     try:
-        MongoUtils.connect()
-        doc = MongoUtils.get_collection("gpx_traces").find_one({"_id": ObjectId(hike["mongo_id"])})
-        MongoUtils.disconnect()
-        if not doc or not doc.get("points"):
-            return {"points": []}
-        return {"points": [{"lat": p["lat"], "lon": p["lon"]} for p in doc["points"]]}
+        lats, lons = fetch_trace(hike["mongo_id"], tolerance_m=tolerance_m)
     except Exception as e:
         logger.error(f"Erreur récupération trace hike {hike_id}: {e}")
-        return {"points": []}
+        return empty
+
+    if encoding == "polyline":
+        return {"polyline": encode_polyline(lats, lons), "precision": 5}
+    return {"points": [{"lat": lat, "lon": lon} for lat, lon in zip(lats, lons)]}
+
+
+@router.get("/hike/{hike_id}/profile", summary="Get the elevation profile and metrics of a hike.")
+def get_hike_profile(hike_id: int):
+    """
+    Profil altimétrique (distance_km / elevation_m, ~200 points) et métriques du
+    tracé (distance, D+/D−, temps de marche estimé), calculés à l'import et
+    stockés avec le tracé : aucun calcul à la lecture.
+    """
+    empty = {"metrics": None, "profile": None}
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        cursor.execute("SELECT mongo_id FROM hikes WHERE id = %s", (hike_id,))
+        hike = cursor.fetchone()
+        cursor.close()
+
+    if not hike or not hike.get("mongo_id"):
+        return empty
+    try:
+        return fetch_profile(hike["mongo_id"]) or empty
+    except Exception as e:
+        logger.error(f"Erreur récupération profil hike {hike_id}: {e}")
+        return empty
+
+
+def _attachment_header(filename: str) -> str:
+    """
+    Content-Disposition d'un téléchargement : `filename=` en ASCII (accents
+    retirés, guillemets remplacés) pour les vieux clients, `filename*=` en
+    UTF-8 encodé (RFC 5987). Le nom brut cassait l'en-tête sur un `"` et
+    faisait échouer Starlette (UnicodeEncodeError, 500) hors latin-1.
+    """
+    ascii_name = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+    ascii_name = "".join("_" if c in '"\\' or not c.isprintable() else c for c in ascii_name) or "trace.gpx"
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+@router.get("/hike/{hike_id}/gpx", summary="Download the original GPX file of a hike.")
+def download_hike_gpx(hike_id: int):
+    """
+    Fichier GPX d'origine, tel qu'importé. Diffusé bloc par bloc depuis GridFS
+    (services.trace_store) : un gros fichier ne transite jamais entier en mémoire.
+    """
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        cursor.execute("SELECT mongo_id FROM hikes WHERE id = %s", (hike_id,))
+        hike = cursor.fetchone()
+        cursor.close()
+
+    raw = open_raw_gpx(hike["mongo_id"]) if hike and hike.get("mongo_id") else None
+    if raw is None:
+        raise HTTPException(status_code=404, detail="Fichier GPX introuvable")
+    filename, chunks = raw
+    return StreamingResponse(
+        chunks,
+        media_type=GPX_MEDIA_TYPE,
+        headers={"Content-Disposition": _attachment_header(filename)},
+    )
 
 
 @router.put("/update_plan/{plan_id}", summary="Update an existing trip plan with new data.")
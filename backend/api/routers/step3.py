@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Query, Body
+from fastapi import APIRouter, Query, Body, Depends
 from services.plan_service import insert_or_update_plan
 from utils.display_utils import enrich_spot
 from utils.logger_util import LoggerUtil
-from utils.db_utils import MySQLUtils
+from utils.db_utils import get_db
 
 router = APIRouter()
 logger = LoggerUtil.get_logger(__name__)
@@ -10,7 +10,8 @@ logger = LoggerUtil.get_logger(__name__)
 @router.get("/spots", summary="Returns the spots for a given city.")
 def get_spots(
     city_id: int = Query(..., description="ID de la ville"),
-    distance_km: float = Query(5, description="Rayon de la zone en km")
+    distance_km: float = Query(5, description="Rayon de la zone en km"),
+    cnx=Depends(get_db)
 ):
     """
     Retourne les spots (bivouac, camping, aire CC) pour une ville donnée,
@@ -18,9 +19,8 @@ def get_spots(
     """
     logger.info(f"Route /spots appelée avec city_id={city_id}, distance_km={distance_km}")
 
-    # Connexion DB
-    from utils.geo_utils import get_bounding_box
-    cnx = MySQLUtils.connect()
+    from services.geo_index import radius_filter
+    # Une seule connexion pour toute la requête (fournie par get_db)
     cursor = cnx.cursor(dictionary=True)
 
     # Récupérer les coordonnées de la ville
@@ -28,32 +28,29 @@ def get_spots(
     city = cursor.fetchone()
     if not city:
         cursor.close()
-        MySQLUtils.disconnect(cnx)
         return []
 
-    min_lat, min_lon, max_lat, max_lon = get_bounding_box(city['latitude'], city['longitude'], distance_km)
-    
-    cnx = MySQLUtils.connect()
-    cursor = cnx.cursor(dictionary=True)
-
-    # Récupérer les spots dans la bounding box (vérifiés et non vérifiés)
+    # Récupérer les spots dans le rayon (vérifiés et non vérifiés) : index
+    # géographique en mémoire, ou à défaut index SPATIAL MySQL
+    radius_where, radius_params = radius_filter(
+        "spots", "s.id", "s.location", city['latitude'], city['longitude'], distance_km, cnx=cnx
+    )
     excluded_types = ('AIRE DE SERVICES SANS STAT.', "SERVICES D'APPOINT")
 
     # duplicate_of_spot_id : spots marqués comme doublon d'un voisin par
     # etl.enrich.dedupe_spots. Ils restent en base (rien n'est supprimé), on ne
     # les affiche simplement pas deux fois sur la carte.
-    query = '''
+    query = f'''
             SELECT s.id, s.name, s.description, s.type, s.latitude, s.longitude, s.rating, s.url, s.verifie, s.address,
                    s.place_label, s.display_name, s.description_ia
             FROM spots s
-            WHERE s.latitude BETWEEN %s AND %s
-                AND s.longitude BETWEEN %s AND %s
+            WHERE {radius_where}
                 AND s.type IS NOT NULL
                 AND s.type NOT IN (%s, %s)
                 AND s.duplicate_of_spot_id IS NULL
             ORDER BY s.name ASC
         '''
-    cursor.execute(query, (min_lat, max_lat, min_lon, max_lon, *excluded_types))
+    cursor.execute(query, (*radius_params, *excluded_types))
     spots = cursor.fetchall()
 
     # Récupérer les services associés à chaque spot
@@ -74,6 +71,7 @@ def get_spots(
             if spot_id not in services_map:
                 services_map[spot_id] = []
             services_map[spot_id].append(service)
+    cursor.close()
 
     # Construire la réponse, avec les champs prêts à afficher (catégorie prix,
     # badge, icônes des services...) calculés en Python par enrich_spot.
@@ -96,8 +94,6 @@ def get_spots(
             "services": services_map.get(spot["id"], [])
         }))
 
-    cursor.close()
-    MySQLUtils.disconnect(cnx)
     return result
 
 @router.put("/update_plan/{plan_id}",summary="Update an existing trip plan with new data.")
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Query, Body
+from fastapi import APIRouter, Query, Body, Depends
 from services.plan_service import insert_or_update_plan
-from utils.db_utils import MySQLUtils
+from utils.db_utils import get_db
 from utils.display_utils import enrich_poi, poi_subtitle
 from utils.service_utils import POI_FRONTEND_CATEGORY_MAP
 
@@ -22,7 +22,8 @@ def get_poi(
     city_id: int = Query(..., description="ID de la ville"),
     distance_km: float = Query(5, description="Rayon de recherche en km autour de la ville"),
     spot_lat: float = Query(None, description="Latitude du spot choisi, utilisée comme point de référence"),
-    spot_lon: float = Query(None, description="Longitude du spot choisi, utilisée comme point de référence")
+    spot_lon: float = Query(None, description="Longitude du spot choisi, utilisée comme point de référence"),
+    cnx=Depends(get_db)
 ):
     """
     Retourne les POI (Points d'Intérêt / Services) pour une ville donnée,
@@ -36,9 +37,8 @@ def get_poi(
     POI les plus proches du spot choisi (ou du centre-ville à défaut), afin
     d'éviter une liste trop longue dans les grandes villes.
     """
-    cnx = MySQLUtils.connect()
     cursor = cnx.cursor(dictionary=True)
-    
+
     # Récupérer les coordonnées de la ville
     cursor.execute(
         "SELECT latitude, longitude FROM cities WHERE id = %s", 
@@ -48,7 +48,6 @@ def get_poi(
     
     if not city:
         cursor.close()
-        MySQLUtils.disconnect(cnx)
         empty = {
             "eau": [], "vidange": [], "gasoil": [], "supermarche": [], "commerce": [],
             "restauration": [],
@@ -60,12 +59,12 @@ def get_poi(
         empty["subtitles"] = _build_subtitles(empty)
         return empty
     
-    # Calculer la bounding box autour de la ville
-    from utils.geo_utils import get_bounding_box, haversine_distance_km
-    min_lat, min_lon, max_lat, max_lon = get_bounding_box(
-        city['latitude'],
-        city['longitude'],
-        distance_km
+    # Rayon autour de la ville : index géographique en mémoire, ou à défaut
+    # index SPATIAL MySQL sur poi.location
+    from services.geo_index import radius_filter
+    from utils.geo_utils import haversine_distance_km
+    radius_where, radius_params = radius_filter(
+        "poi", "p.id", "p.location", city['latitude'], city['longitude'], distance_km, cnx=cnx
     )
 
     # Point de référence pour trier par proximité : le spot choisi si fourni, sinon le centre-ville
@@ -73,7 +72,7 @@ def get_poi(
     ref_lon = spot_lon if spot_lon is not None else city['longitude']
     
     # Tous les POI (vérifiés et non vérifiés)
-    query = """
+    query = f"""
         SELECT
             p.id,
             p.name,
@@ -90,16 +89,13 @@ def get_poi(
         FROM poi p
         JOIN poi_service ps ON p.id = ps.poi_id
         JOIN services s ON ps.service_id = s.id
-        WHERE p.latitude BETWEEN %s AND %s
-        AND p.longitude BETWEEN %s AND %s
+        WHERE {radius_where}
         ORDER BY s.category, p.name ASC
     """
 
-    cursor.execute(query, (min_lat, max_lat, min_lon, max_lon))
+    cursor.execute(query, radius_params)
     poi_list = cursor.fetchall()
-    
     cursor.close()
-    MySQLUtils.disconnect(cnx)
     
     category_mapping = POI_FRONTEND_CATEGORY_MAP
 
@@ -7,6 +7,8 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 import mysql.connector
 from utils.db_utils import MySQLUtils
+from etl.city_stats import CITY_STATS_TABLE
+from services.meteo_scheduler import WEATHER_REFRESH_TABLE
 from mysql.connector import Error
 from utils.service_utils import ServiceUtil
 logger = LoggerUtil.get_logger("db_init")
@@ -73,6 +75,12 @@ def init_database():
         logger.info(f"[MySQL] : Utilisateur {DB_USER} créé.")
 
     # Liste des statements pour la création des tables
+    # Colonnes `location` / `start_location` : POINT SRID 4326 générés (STORED)
+    # depuis latitude/longitude, porteurs des index SPATIAL utilisés par les
+    # recherches par rayon (cf. geo_utils.spatial_radius_clause). Un index
+    # SPATIAL exige une colonne NOT NULL : sur hikes et poi, où les coordonnées
+    # sont facultatives, une ligne sans coordonnées est placée en (0, 0), hors de
+    # toute zone de recherche. Bases existantes : db_init.migrate_spatial (démarrage de l'API)
         statements = [
             # 1. tables de base sans dépendances
             # 1. table cities
@@ -84,7 +92,9 @@ def init_database():
                 longitude FLOAT NOT NULL,
                 department VARCHAR(255),
                 region VARCHAR(255),
-                country VARCHAR(255)
+                country VARCHAR(255),
+                location POINT AS (ST_SRID(POINT(COALESCE(longitude, 0), COALESCE(latitude, 0)), 4326)) STORED NOT NULL SRID 4326,
+                SPATIAL INDEX idx_cities_location (location)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
             """,
             # 2. table sources
@@ -131,9 +141,11 @@ def init_database():
                 enriched_at DATETIME,
                 source_hash CHAR(64),
                 duplicate_of_spot_id INT NULL,
+                location POINT AS (ST_SRID(POINT(COALESCE(longitude, 0), COALESCE(latitude, 0)), 4326)) STORED NOT NULL SRID 4326,
                 UNIQUE (p4n_id),
                 FOREIGN KEY (duplicate_of_spot_id) REFERENCES spots(id),
                 INDEX idx_spots_latlon (latitude, longitude),
+                SPATIAL INDEX idx_spots_location (location),
                 FOREIGN KEY (source_id) REFERENCES sources(id)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
             """,
@@ -177,7 +189,9 @@ def init_database():
                 city_id INT,
                 verifie BOOL DEFAULT FALSE,
                 imported_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                start_location POINT AS (ST_SRID(POINT(COALESCE(start_longitude, 0), COALESCE(start_latitude, 0)), 4326)) STORED NOT NULL SRID 4326,
                 INDEX idx_hikes_latlon (start_latitude, start_longitude),
+                SPATIAL INDEX idx_hikes_start_location (start_location),
                 FOREIGN KEY (source_id) REFERENCES sources(id),
                 FOREIGN KEY (city_id) REFERENCES cities(id)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -195,8 +209,10 @@ def init_database():
                 original_id VARCHAR(255),
                 source_id INT,
                 verifie BOOL DEFAULT FALSE,
+                location POINT AS (ST_SRID(POINT(COALESCE(longitude, 0), COALESCE(latitude, 0)), 4326)) STORED NOT NULL SRID 4326,
                 unique (original_id, source_id),
                 INDEX idx_poi_latlon (latitude, longitude),
+                SPATIAL INDEX idx_poi_location (location),
                 FOREIGN KEY (source_id) REFERENCES sources(id)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
             """,
@@ -234,6 +250,8 @@ def init_database():
                 weather_code INT,
                 solar_energy_sum FLOAT,
                 city_id INT NOT NULL,
+                -- Un jour par ville : clé de l'upsert de load_meteo.load_weather_batch
+                UNIQUE KEY uq_weather_city_date (city_id, date),
                 FOREIGN KEY (city_id) REFERENCES cities(id)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
             """,
@@ -275,6 +293,14 @@ def init_database():
                 FOREIGN KEY (poi_id) REFERENCES poi(id)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
             """,
+            # 15. city_stats (dépend de cities) : stats matérialisées par rayon
+            # standard, maintenues par etl.city_stats (définition partagée avec
+            # son ensure_table, qui la crée sur les bases plus anciennes).
+            CITY_STATS_TABLE,
+            # 16. weather_refresh (dépend de cities) : date du dernier chargement
+            # météo par ville, lue par services.meteo_scheduler (même définition
+            # que son ensure_table).
+            WEATHER_REFRESH_TABLE,
         ]
         ("- Création des tables :")
         user_cnx = MySQLUtils.connect()
@@ -0,0 +1,53 @@
+"""
+Migration : sort le GPX d'origine (`gpx_content`) des documents gpx_traces
+importés avant son passage dans GridFS (services.trace_store.GPX_BUCKET).
+
+Chaque document voit son contenu rangé dans GridFS, référencé par
+`gpx_file_id`, puis le champ `gpx_content` retiré. Rejouable : seuls les
+documents qui ont encore `gpx_content` sont traités, et un fichier GridFS déjà
+créé pour un tracé (migration interrompue entre les deux écritures) est
+réutilisé plutôt que dupliqué.
+
+MongoDB ne rend pas l'espace disque libéré de lui-même ; après une grosse
+migration, `db.runCommand({compact: "gpx_traces"})` le récupère.
+
+Usage (depuis /usr/src/app dans le conteneur backend) :
+    python -m db_init.migrate_gpx_files
+"""
+from services.trace_store import COLLECTION, find_raw_gpx_id, store_raw_gpx
+from utils.logger_util import LoggerUtil
+from utils.mongo_utils import MongoUtils
+
+logger = LoggerUtil.get_logger("db_init")
+
+
+def migrate_document(collection, doc: dict) -> None:
+    """Range le GPX d'un document dans GridFS et retire `gpx_content` (idempotent)."""
+    file_id = find_raw_gpx_id(doc["_id"])
+    if file_id is None:
+        file_id = store_raw_gpx(doc["gpx_content"], doc.get("filename") or f"{doc['_id']}.gpx",
+                                doc["_id"], doc.get("hike_mysql_id"))
+    collection.update_one(
+        {"_id": doc["_id"]},
+        {"$set": {"gpx_file_id": file_id}, "$unset": {"gpx_content": ""}},
+    )
+
+
+def main():
+    MongoUtils.connect()
+    collection = MongoUtils.get_collection(COLLECTION)
+    query = {"gpx_content": {"$exists": True}}
+    total = collection.count_documents(query)
+    logger.info(f"[gpx_files] {total} tracé(s) avec le GPX embarqué")
+    done = 0
+    projection = {"gpx_content": 1, "filename": 1, "hike_mysql_id": 1}
+    for doc in collection.find(query, projection):
+        migrate_document(collection, doc)
+        done += 1
+        if done % 50 == 0:
+            logger.info(f"[gpx_files] {done}/{total}")
+    logger.info(f"[gpx_files] Terminé : {done} GPX déplacé(s) dans GridFS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Migration : ajoute les colonnes POINT SRID 4326 et leurs index
+SPATIAL sur une base créée avant leur introduction dans db_randovango.py.
+
+Les colonnes sont générées (STORED) depuis latitude/longitude : l'ALTER TABLE
+les calcule pour toutes les lignes existantes (c'est le backfill), et MySQL les
+maintient ensuite seul à chaque INSERT/UPDATE - aucun loader n'a à s'en soucier.
+
+Rejouable : lancée au démarrage de l'API, elle ignore une colonne ou un
+index déjà présent.
+
+Usage (depuis /usr/src/app dans le conteneur backend) :
+    python -m db_init.migrate_spatial
+"""
+from utils.db_utils import MySQLUtils
+from utils.logger_util import LoggerUtil
+from utils.service_utils import ServiceUtil
+
+logger = LoggerUtil.get_logger("db_init")
+
+# table -> (colonne, colonne latitude, colonne longitude, nom de l'index)
+SPATIAL_COLUMNS = {
+    "cities": ("location", "latitude", "longitude", "idx_cities_location"),
+    "spots": ("location", "latitude", "longitude", "idx_spots_location"),
+    "hikes": ("start_location", "start_latitude", "start_longitude", "idx_hikes_start_location"),
+    "poi": ("location", "latitude", "longitude", "idx_poi_location"),
+}
+
+
+def point_expression(lat_col: str, lon_col: str) -> str:
+    """Expression de la colonne générée (même définition que db_randovango.py)."""
+    return f"ST_SRID(POINT(COALESCE({lon_col}, 0), COALESCE({lat_col}, 0)), 4326)"
+
+
+def add_spatial_columns(cursor, database: str) -> None:
+    """Ajoute colonne POINT et index SPATIAL manquants (idempotent)."""
+    for table, (column, lat_col, lon_col, index_name) in SPATIAL_COLUMNS.items():
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns"
+            " WHERE table_schema = %s AND table_name = %s AND column_name = %s",
+            (database, table, column),
+        )
+        if cursor.fetchone():
+            logger.info(f"[spatial] Colonne {table}.{column} déjà présente")
+        else:
+            cursor.execute(
+                f"ALTER TABLE {table} ADD COLUMN {column} POINT"
+                f" AS ({point_expression(lat_col, lon_col)}) STORED NOT NULL SRID 4326"
+            )
+            logger.info(f"[spatial] Colonne {table}.{column} ajoutée et calculée pour les lignes existantes")
+
+        cursor.execute(
+            "SELECT 1 FROM information_schema.statistics"
+            " WHERE table_schema = %s AND table_name = %s AND index_name = %s",
+            (database, table, index_name),
+        )
+        if cursor.fetchone():
+            logger.info(f"[spatial] Index {index_name} déjà présent")
+            continue
+        cursor.execute(f"ALTER TABLE {table} ADD SPATIAL INDEX {index_name} ({column})")
+        logger.info(f"[spatial] Index SPATIAL {index_name} créé sur {table}.{column}")
+
+
+def main():
+    ServiceUtil.load_env()
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor(buffered=True)
+        add_spatial_columns(cursor, ServiceUtil.get_env("DB_NAME"))
+        cnx.commit()
+        cursor.close()
+
+
+if __name__ == "__main__":
+    main()
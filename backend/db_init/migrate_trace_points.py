@@ -0,0 +1,47 @@
+"""
+Migration : convertit les points des documents gpx_traces de l'ancien format
+(`points`, tableau de {lat, lon, ele}) au format binaire compact `track`
+(utils.trace_codec), et réencode les niveaux de détail de la même façon.
+
+Rejouable : seuls les documents qui ont encore `points` sont traités, et la
+conversion d'un document (ajout de `track`, retrait de `points`) tient en une
+seule mise à jour.
+
+Usage (depuis /usr/src/app dans le conteneur backend) :
+    python -m db_init.migrate_trace_points
+"""
+from services.trace_store import COLLECTION, trace_fields
+from utils.logger_util import LoggerUtil
+from utils.mongo_utils import MongoUtils
+
+logger = LoggerUtil.get_logger("db_init")
+
+
+def migrate_document(collection, doc: dict) -> None:
+    """Remplace `points` par `track` (et réencode `levels`/`bbox`) dans un document."""
+    points = doc.get("points") or []
+    fields = trace_fields(
+        [p["lat"] for p in points],
+        [p["lon"] for p in points],
+        [p.get("ele") for p in points],
+    )
+    collection.update_one({"_id": doc["_id"]}, {"$set": fields, "$unset": {"points": ""}})
+
+
+def main():
+    MongoUtils.connect()
+    collection = MongoUtils.get_collection(COLLECTION)
+    query = {"points": {"$exists": True}}
+    total = collection.count_documents(query)
+    logger.info(f"[trace_points] {total} tracé(s) à l'ancien format")
+    done = 0
+    for doc in collection.find(query, {"points": 1}):
+        migrate_document(collection, doc)
+        done += 1
+        if done % 50 == 0:
+            logger.info(f"[trace_points] {done}/{total}")
+    logger.info(f"[trace_points] Terminé : {done} tracé(s) convertis")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Migration : clé unique (city_id, date) sur weather, pour une base créée avant
+son introduction dans db_randovango.py.
+
+Sans elle, l'upsert de load_meteo.load_weather_batch (INSERT … ON DUPLICATE
+KEY UPDATE) insérerait des doublons au lieu de mettre à jour les prévisions.
+Les doublons éventuels sont d'abord supprimés en gardant la ligne la plus
+récente (id le plus grand) de chaque (ville, jour).
+
+Rejouable : lancée au démarrage de l'API, elle ne fait rien si la clé existe.
+
+Usage (depuis /usr/src/app dans le conteneur backend) :
+    python -m db_init.migrate_weather
+"""
+from utils.db_utils import MySQLUtils
+from utils.logger_util import LoggerUtil
+from utils.service_utils import ServiceUtil
+
+logger = LoggerUtil.get_logger("db_init")
+
+UNIQUE_KEY = "uq_weather_city_date"
+
+
+def add_unique_key(cursor, database: str) -> None:
+    """Dédoublonne weather puis ajoute la clé unique (idempotent)."""
+    cursor.execute(
+        "SELECT 1 FROM information_schema.statistics"
+        " WHERE table_schema = %s AND table_name = 'weather' AND index_name = %s",
+        (database, UNIQUE_KEY),
+    )
+    if cursor.fetchone():
+        logger.info(f"[weather] Clé {UNIQUE_KEY} déjà présente")
+        return
+    cursor.execute("""
+        DELETE w FROM weather w
+        JOIN weather newer
+          ON newer.city_id = w.city_id AND newer.date = w.date AND newer.id > w.id
+    """)
+    logger.info(f"[weather] {cursor.rowcount} doublon(s) (ville, jour) supprimé(s)")
+    cursor.execute(f"ALTER TABLE weather ADD UNIQUE KEY {UNIQUE_KEY} (city_id, date)")
+    logger.info(f"[weather] Clé unique {UNIQUE_KEY} créée")
+
+
+def main():
+    ServiceUtil.load_env()
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor(buffered=True)
+        add_unique_key(cursor, ServiceUtil.get_env("DB_NAME"))
+        cnx.commit()
+        cursor.close()
+
+
+if __name__ == "__main__":
+    main()
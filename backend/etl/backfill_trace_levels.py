@@ -0,0 +1,52 @@
+"""
+Rattrapage : calcule les champs dérivés des tracés importés avant leur
+introduction dans load_gpx (services.trace_store) :
+
+  - niveaux de détail et emprise (`levels`, `bbox`) ;
+  - métriques et profil altimétrique (`metrics`, `profile`, utils.gpx_metrics).
+    Les ruptures entre segments GPX n'étant pas conservées dans le document,
+    le tracé est traité comme un seul segment.
+
+Seuls les documents auxquels il manque l'un de ces champs sont traités :
+rejouable, et relancer après une interruption reprend là où on s'était arrêté.
+
+Usage (depuis /usr/src/app dans le conteneur backend) :
+    python -m etl.backfill_trace_levels
+"""
+from services.trace_store import COLLECTION, doc_series, level_fields, metrics_fields
+from utils.gpx_metrics import compute_metrics
+from utils.logger_util import LoggerUtil
+from utils.mongo_utils import MongoUtils
+
+logger = LoggerUtil.get_logger("etl_gpx")
+
+
+def missing_fields(doc: dict) -> dict:
+    """Champs dérivés absents du document, calculés depuis ses points."""
+    lats, lons, eles = doc_series(doc)
+    fields = {}
+    if "levels" not in doc:
+        fields.update(level_fields(lats, lons))
+    if "metrics" not in doc:
+        fields.update(metrics_fields(compute_metrics(lats, lons, eles)))
+    return fields
+
+
+def main():
+    MongoUtils.connect()
+    collection = MongoUtils.get_collection(COLLECTION)
+    query = {"$or": [{"levels": {"$exists": False}}, {"metrics": {"$exists": False}}]}
+    total = collection.count_documents(query)
+    logger.info(f"[backfill] {total} tracé(s) sans niveaux de détail ou sans métriques")
+    done = 0
+    projection = {"track": 1, "points": 1, "levels.max_points": 1, "metrics.distance_m": 1}
+    for doc in collection.find(query, projection):
+        collection.update_one({"_id": doc["_id"]}, {"$set": missing_fields(doc)})
+        done += 1
+        if done % 50 == 0:
+            logger.info(f"[backfill] {done}/{total}")
+    logger.info(f"[backfill] Terminé : {done} tracé(s) mis à jour")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Import en masse de fichiers GPX (arrivée d'un nouveau département : des
+centaines de tracés d'un coup).
+
+Le pipeline habituel (etl_pipeline) traite un fichier à la fois : parsing,
+géocodage Nominatim, quatre commits MySQL, insertion MongoDB, suppression. Ici,
+par lots de BATCH_SIZE fichiers :
+
+  1. parsing et calculs (métriques, niveaux de détail, encodage des points)
+     dans un pool de processus - c'est la partie CPU ;
+  2. géocodage des points de départ, une seule fois par point de départ
+     arrondi à ~100 m, et infos administratives pour les seules villes
+     nouvelles (au rythme du limiteur Nominatim partagé de utils.geo_utils) ;
+  3. chargement groupé (load_gpx.load_gpx_batch) : une transaction MySQL en
+     executemany et un insert_many MongoDB par lot.
+
+La météo des villes créées est laissée au planificateur (services.meteo_scheduler)
+et le scraping P4N n'est pas lancé : il se déclenche à l'import unitaire.
+
+Usage (depuis /usr/src/app dans le conteneur backend) :
+    python -m etl.bulk_import_gpx [--dir /usr/src/data] [--workers 4] [--non-verifie]
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from etl.load.load_gpx import ids_by_name, load_gpx_batch, trace_document_fields
+from etl.transform.transform_gpx import summarize_gpx
+from utils.db_utils import MySQLUtils
+from services.city_resolver import resolve_city
+from utils.geo_utils import get_admin_info_from_coordinates
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger("etl_gpx")
+
+DATA_DIR = Path("/usr/src/data")
+BATCH_SIZE = 50
+# Points de départ regroupés au millième de degré (~100 m) pour le géocodage.
+GEOCODE_DECIMALS = 3
+
+
+def default_workers() -> int:
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def prepare_file(gpx_path: str):
+    """Tâche du pool : lecture, calculs et champs du document MongoDB d'un fichier."""
+    fname = os.path.basename(gpx_path)
+    try:
+        data = summarize_gpx(Path(gpx_path), fname)
+        fields = trace_document_fields(data)
+    except Exception as e:
+        logger.warning(f"[bulk] Fichier illisible ignoré : {fname} ({e})")
+        return None
+    # Les tableaux de points ne sont plus utiles une fois encodés : ne pas les
+    # renvoyer au processus principal.
+    for key in ("lats", "lons", "eles", "metrics"):
+        data.pop(key, None)
+    return {"data": data, "gpx_path": gpx_path, "fname": fname, "fields": fields}
+
+
+class Geocoder:
+    """Géocodage des points de départ, mémorisé pour la durée de l'import."""
+
+    def __init__(self):
+        self.cities = {}
+        self.calls = 0
+
+    def city_for(self, lat: float, lon: float):
+        key = (round(lat, GEOCODE_DECIMALS), round(lon, GEOCODE_DECIMALS))
+        if key not in self.cities:
+            self.calls += 1
+            self.cities[key] = resolve_city(lat, lon)
+        return self.cities[key]
+
+    def admin_info(self, lat: float, lon: float) -> tuple:
+        self.calls += 1
+        return get_admin_info_from_coordinates(lat, lon)
+
+
+def list_new_files(directory: Path) -> list:
+    """Fichiers .gpx du dossier absents de la table hikes (une seule requête)."""
+    names = sorted(f for f in os.listdir(directory) if f.endswith('.gpx'))
+    if not names:
+        return []
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        cursor.execute("SELECT filename FROM hikes WHERE filename IS NOT NULL")
+        known = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+    return [str(directory / name) for name in names if name not in known]
+
+
+def existing_cities(names: set) -> set:
+    """Noms de `names` déjà en base, au sens de MySQL (casse et accents ignorés)."""
+    if not names:
+        return set()
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        found = set(ids_by_name(cursor, "cities", names))
+        cursor.close()
+    return found
+
+
+def geocode_batch(items: list, geocoder: Geocoder) -> tuple:
+    """(items avec 'city_name', villes à créer {nom: (lat, lon, dep, region, pays)})."""
+    located = []
+    for item in items:
+        data = item["data"]
+        if not (data["start_lat"] and data["start_lon"]):
+            logger.info(f"[bulk] Aucun point dans {item['fname']}, fichier ignoré")
+            continue
+        data["city_name"] = geocoder.city_for(data["start_lat"], data["start_lon"])
+        if not data["city_name"]:
+            logger.info(f"[bulk] Pas de ville détectée pour {item['fname']}, fichier ignoré")
+            continue
+        located.append(item)
+
+    names = {item["data"]["city_name"] for item in located}
+    known = existing_cities(names)
+    new_cities = {}
+    for item in located:
+        name, data = item["data"]["city_name"], item["data"]
+        if name not in known and name not in new_cities:
+            new_cities[name] = (data["start_lat"], data["start_lon"],
+                                *geocoder.admin_info(data["start_lat"], data["start_lon"]))
+    return located, new_cities
+
+
+class BulkImport:
+    """Import en masse, un seul à la fois par processus, avec état consultable."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._state = {"running": False}
+
+    def _update(self, **values) -> None:
+        with self._state_lock:
+            self._state.update(values)
+
+    def state(self) -> dict:
+        with self._state_lock:
+            return dict(self._state)
+
+    def run(self, directory: Path = DATA_DIR, verifie: int = 1, workers: int = None) -> dict:
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("Un import en masse est déjà en cours")
+        try:
+            return self._run(Path(directory), verifie, workers or default_workers())
+        except Exception as e:
+            logger.error(f"[bulk] Import interrompu : {e}")
+            self._update(last_error=str(e))
+            raise
+        finally:
+            self._update(running=False, finished_at=datetime.now())
+            self._lock.release()
+
+    def _run(self, directory: Path, verifie: int, workers: int) -> dict:
+        started = time.perf_counter()
+        files = list_new_files(directory)
+        self._update(running=True, started_at=datetime.now(), finished_at=None, last_error=None,
+                     files_total=len(files), files_done=0, loaded=0, skipped=0, geocoding_calls=0)
+        logger.info(f"[bulk] {len(files)} fichier(s) à importer depuis {directory} ({workers} processus)")
+
+        geocoder = Geocoder()
+        loaded = skipped = 0
+        cities = set()
+        # spawn plutôt que fork : lancé depuis l'API, le processus a déjà des
+        # threads (pools MySQL/MongoDB) qu'un fork recopierait dans un état incohérent.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for start in range(0, len(files), BATCH_SIZE):
+                batch = files[start:start + BATCH_SIZE]
+                prepared = [item for item in pool.map(prepare_file, batch) if item]
+                located, new_cities = geocode_batch(prepared, geocoder)
+                done = load_gpx_batch(located, new_cities, verifie=verifie)
+                loaded += len(done)
+                skipped += len(batch) - len(done)
+                cities.update(item["data"]["city_name"] for item in done)
+                self._update(files_done=start + len(batch), loaded=loaded, skipped=skipped,
+                             geocoding_calls=geocoder.calls)
+                logger.info(f"[bulk] {start + len(batch)}/{len(files)} fichier(s) traités, {loaded} chargé(s)")
+
+        summary = {"files": len(files), "loaded": loaded, "skipped": skipped, "cities": sorted(cities),
+                   "geocoding_calls": geocoder.calls, "duration_s": round(time.perf_counter() - started, 1)}
+        logger.info(f"[bulk] Terminé : {summary}")
+        return summary
+
+    def start(self, directory: Path = DATA_DIR, verifie: int = 1, workers: int = None) -> bool:
+        """Lance l'import dans un thread ; False si un import est déjà en cours."""
+        if self.state().get("running") or self._lock.locked():
+            return False
+        self._update(running=True)
+        threading.Thread(target=self._run_quietly, args=(directory, verifie, workers),
+                         name="bulk-import-gpx", daemon=True).start()
+        return True
+
+    def _run_quietly(self, *args) -> None:
+        try:
+            self.run(*args)
+        except Exception:
+            pass  # déjà journalisé et visible dans state()["last_error"]
+
+
+bulk_import = BulkImport()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import en masse de fichiers GPX")
+    parser.add_argument("--dir", default=str(DATA_DIR), help="Dossier des fichiers .gpx")
+    parser.add_argument("--workers", type=int, default=None, help="Processus de parsing")
+    parser.add_argument("--non-verifie", action="store_true", help="Randonnées à vérifier (verifie=0)")
+    args = parser.parse_args()
+    print(bulk_import.run(Path(args.dir), verifie=0 if args.non_verifie else 1, workers=args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Statistiques par ville (randonnées, spots, POI à moins de R km) matérialisées
+dans la table `city_stats`, une ligne par (ville, rayon standard).
+
+/api/step1/cities ne les recalcule plus à chaque affichage : il les lit en une
+seule requête sur la clé primaire. Elles sont tenues à jour par les loaders
+(GPX, P4N, POI OSM/Wikidata) et par la déduplication des spots, qui appellent
+`refresh_city_stats_around` avec les coordonnées des lignes écrites : seules
+les villes à moins du plus grand rayon standard de ces points sont recalculées.
+
+La table est créée par db_init.db_randovango (ou ensure_table() au démarrage de
+l'API sur une base plus ancienne, reconstruite alors en arrière-plan).
+Reconstruction complète (après import massif, rejouable) :
+    python -m etl.city_stats
+"""
+from math import isnan
+
+from services import response_cache
+from utils.db_utils import MySQLUtils
+from utils.geo_utils import get_bounding_box
+from utils.logger_util import LoggerUtil
+from utils.service_utils import POI_FRONTEND_CATEGORY_MAP
+
+logger = LoggerUtil.get_logger("etl_city_stats")
+
+# Rayons matérialisés. Le front n'utilise aujourd'hui que 5 km (valeur par défaut
+# de /cities) ; un autre rayon reste possible mais est calculé à la volée.
+STANDARD_RADII_KM = (5, 10)
+
+# Définition unique, reprise par db_randovango.py. L'init MySQL ne tourne
+# qu'une fois (flag storage/.randovango_db_initialized), une base plus ancienne
+# n'a donc pas la table : ensure_table() la crée au démarrage de l'API.
+# radius_km en tête de clé : /cities lit toutes les villes d'un rayon par un
+# parcours de la clé primaire.
+CITY_STATS_TABLE = """
+    CREATE TABLE IF NOT EXISTS city_stats (
+        radius_km SMALLINT NOT NULL,
+        city_id INT NOT NULL,
+        hikes INT NOT NULL DEFAULT 0,
+        spots INT NOT NULL DEFAULT 0,
+        poi INT NOT NULL DEFAULT 0,
+        updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (radius_km, city_id),
+        FOREIGN KEY (city_id) REFERENCES cities(id) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+
+def ensure_table() -> bool:
+    """Crée la table si besoin ; retourne True si elle est vide (reconstruction à prévoir)."""
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        cursor.execute(CITY_STATS_TABLE)
+        cursor.execute("SELECT 1 FROM city_stats LIMIT 1")
+        empty = cursor.fetchone() is None
+        cnx.commit()
+        cursor.close()
+    return empty
+
+def compute_city_stats(cursor, cities, distance_km=5):
+    """
+    Calcule les stats (randonnées, spots, POI) des villes données en une poignée
+    de requêtes agrégées (une par table), au lieu d'une boucle de 6 requêtes par ville.
+    Le nombre de requêtes ne dépend pas du nombre de villes.
+    `cursor` doit être un curseur dictionary=True.
+    Retourne un dict {city_id: {"hikes", "spots", "poi"}}.
+    """
+    city_ids = [c["id"] for c in cities]
+    stats = {cid: {"hikes": 0, "spots": 0, "poi": 0} for cid in city_ids}
+    if not city_ids:
+        return stats
+    city_filter = f"c.id IN ({','.join(['%s'] * len(city_ids))})"
+
+    # Bounding box de chaque ville construite côté SQL (demi-côté en latitude
+    # constant, en longitude corrigé par le cosinus de la latitude de la ville) :
+    # ces calculs ne portent que sur la table externe `cities`, l'index SPATIAL
+    # de la table jointe reste donc utilisable (MBRContains), puis
+    # ST_Distance_Sphere garde le cercle exact.
+    lat_delta = distance_km / 111.32
+    lon_delta = "(%s / COS(RADIANS(c.latitude)))"
+    corners = [("-", "-"), ("+", "-"), ("+", "+"), ("-", "+"), ("-", "-")]
+    city_zone = "ST_GeomFromText(CONCAT('POLYGON((', {}, '))'), 4326, 'axis-order=long-lat')".format(
+        ", ',', ".join(
+            f"c.longitude {lon_sign} {lon_delta}, ' ', c.latitude {lat_sign} %s"
+            for lon_sign, lat_sign in corners
+        )
+    )
+    def bbox_on(alias, location_col):
+        return f"""
+            ON MBRContains({city_zone}, {alias}.{location_col})
+           AND ST_Distance_Sphere(c.location, {alias}.{location_col}) <= %s
+        """
+    bbox_params = (lat_delta,) * (2 * len(corners)) + (distance_km * 1000,)
+
+    cursor.execute(f"""
+        SELECT c.id AS city_id, COUNT(*) AS cnt
+        FROM cities c
+        JOIN hikes h {bbox_on("h", "start_location")}
+        WHERE {city_filter}
+        GROUP BY c.id
+    """, bbox_params + tuple(city_ids))
+    for row in cursor.fetchall():
+        stats[row["city_id"]]["hikes"] = row["cnt"]
+
+    # Spots marqués doublons par etl.enrich.dedupe_spots : non affichés en step3,
+    # donc non comptés.
+    cursor.execute(f"""
+        SELECT c.id AS city_id, COUNT(*) AS cnt
+        FROM cities c
+        JOIN spots sp {bbox_on("sp", "location")}
+        WHERE {city_filter} AND sp.duplicate_of_spot_id IS NULL
+        GROUP BY c.id
+    """, bbox_params + tuple(city_ids))
+    for row in cursor.fetchall():
+        stats[row["city_id"]]["spots"] = row["cnt"]
+
+    # Services (POI) : uniquement les catégories affichées en step4 (même règle que POI_FRONTEND_CATEGORY_MAP)
+    valid_categories = list(POI_FRONTEND_CATEGORY_MAP.keys())
+    placeholders = ",".join(["%s"] * len(valid_categories))
+    cursor.execute(f"""
+        SELECT c.id AS city_id, COUNT(DISTINCT p.id) AS cnt
+        FROM cities c
+        JOIN poi p {bbox_on("p", "location")}
+        JOIN poi_service ps ON p.id = ps.poi_id
+        JOIN services s ON ps.service_id = s.id
+        WHERE {city_filter} AND s.category IN ({placeholders})
+        GROUP BY c.id
+    """, bbox_params + tuple(city_ids) + tuple(valid_categories))
+    for row in cursor.fetchall():
+        stats[row["city_id"]]["poi"] = row["cnt"]
+
+    return stats
+
+
+def read_city_stats(cursor, cities, distance_km) -> dict | None:
+    """
+    Stats matérialisées des villes données pour ce rayon, lues en une requête.
+    Retourne None si le rayon n'est pas matérialisé ; une ville encore absente de
+    la table (base non reconstruite) est calculée à la volée.
+    """
+    if distance_km not in STANDARD_RADII_KM:
+        return None
+    cursor.execute(
+        "SELECT city_id, hikes, spots, poi FROM city_stats WHERE radius_km = %s",
+        (int(distance_km),),
+    )
+    stored = {row["city_id"]: {"hikes": row["hikes"], "spots": row["spots"], "poi": row["poi"]}
+              for row in cursor.fetchall()}
+    missing = [c for c in cities if c["id"] not in stored]
+    if missing:
+        logger.warning(
+            f"[city_stats] {len(missing)} ville(s) sans stats matérialisées ({distance_km} km) :"
+            " calcul à la volée (python -m etl.city_stats pour reconstruire)"
+        )
+        stored.update(compute_city_stats(cursor, missing, distance_km))
+    return {c["id"]: stored[c["id"]] for c in cities}
+
+
+def _upsert(cursor, stats: dict, radius_km: int) -> None:
+    cursor.executemany(
+        """
+        INSERT INTO city_stats (city_id, radius_km, hikes, spots, poi)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE hikes = VALUES(hikes), spots = VALUES(spots), poi = VALUES(poi)
+        """,
+        [(city_id, radius_km, s["hikes"], s["spots"], s["poi"]) for city_id, s in stats.items()],
+    )
+
+
+def refresh_city_stats(city_ids=None) -> int:
+    """Recalcule et enregistre les stats des villes données (toutes si None). Retourne le nombre de villes."""
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        if city_ids is None:
+            cursor.execute("SELECT id FROM cities")
+        elif not city_ids:
+            cursor.close()
+            return 0
+        else:
+            cursor.execute(
+                f"SELECT id FROM cities WHERE id IN ({','.join(['%s'] * len(city_ids))})",
+                tuple(city_ids),
+            )
+        cities = cursor.fetchall()
+        for radius_km in STANDARD_RADII_KM:
+            _upsert(cursor, compute_city_stats(cursor, cities, radius_km), radius_km)
+        cnx.commit()
+        cursor.close()
+    response_cache.invalidate(response_cache.CITIES_CACHE)
+    return len(cities)
+
+
+def refresh_city_stats_around(points) -> None:
+    """
+    Recalcule les stats des villes potentiellement touchées par des lignes
+    écrites aux coordonnées `points` [(lat, lon), ...] : celles situées dans la
+    zone englobant ces points, élargie du plus grand rayon standard.
+    Ne lève jamais : des stats en retard ne doivent pas faire échouer un chargement.
+    Emprunte ses propres connexions au pool : l'appelant doit avoir rendu la sienne.
+    """
+    try:
+        points = [(float(lat), float(lon)) for lat, lon in points if lat is not None and lon is not None]
+        points = [(lat, lon) for lat, lon in points if not (isnan(lat) or isnan(lon))]
+        if not points:
+            return
+        lats = [lat for lat, _ in points]
+        lons = [lon for _, lon in points]
+        margin_km = max(STANDARD_RADII_KM)
+        south, west, _, _ = get_bounding_box(min(lats), min(lons), margin_km)
+        _, _, north, east = get_bounding_box(max(lats), max(lons), margin_km)
+        with MySQLUtils.connection() as cnx:
+            cursor = cnx.cursor()
+            cursor.execute(
+                "SELECT id FROM cities WHERE latitude BETWEEN %s AND %s AND longitude BETWEEN %s AND %s",
+                (south, north, west, east),
+            )
+            city_ids = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        refreshed = refresh_city_stats(city_ids)
+        logger.info(f"[city_stats] Stats recalculées pour {refreshed} ville(s)")
+    except Exception as e:
+        logger.warning(f"[city_stats] Recalcul des stats impossible : {e} (python -m etl.city_stats)")
+
+
+def main():
+    ensure_table()
+    count = refresh_city_stats()
+    logger.info(f"[city_stats] Reconstruction terminée : {count} ville(s) x {len(STANDARD_RADII_KM)} rayon(s)")
+
+
+if __name__ == "__main__":
+    main()
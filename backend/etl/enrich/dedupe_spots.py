@@ -27,6 +27,7 @@ Usage (depuis /usr/src/app dans le conteneur backend) :
 import argparse
 import json
 
+from etl.city_stats import refresh_city_stats_around
 from etl.clean_spots import DUPLICATE_RADIUS_M, report_geographic_duplicates
 from services.llm_service import LLMService, LLMUnavailable
 from utils.db_utils import MySQLUtils
@@ -240,15 +241,26 @@ def main():
 
     confirmed = arbitrate(LLMService(), candidate_pairs(cursor))
 
+    moved_points = []
     if args.apply:
         add_missing_column(cursor, ServiceUtil.get_env("DB_NAME"))
         apply_merges(cursor, confirmed)
         cnx.commit()
+        # Les perdants ne sont plus comptés dans les stats des villes voisines.
+        loser_ids = [loser["id"] for _, loser, _, _ in confirmed]
+        if loser_ids:
+            cursor.execute(
+                f"SELECT latitude, longitude FROM spots WHERE id IN ({','.join(['%s'] * len(loser_ids))})",
+                tuple(loser_ids),
+            )
+            moved_points = cursor.fetchall()
     else:
         logger.info(f"[dedupe] Simulation : {len(confirmed)} fusion(s) auraient été appliquées")
 
     cursor.close()
     MySQLUtils.disconnect(cnx)
+    # Après restitution de la connexion : le recalcul emprunte la sienne au pool.
+    refresh_city_stats_around(moved_points)
 
 
 if __name__ == "__main__":
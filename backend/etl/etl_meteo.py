@@ -1,6 +1,6 @@
 from utils.logger_util import LoggerUtil
-from etl.extract.api_meteo import extract_weather_data
-from etl.load.load_meteo import load_weather_data
+from etl.extract.api_meteo import extract_weather_batch, extract_weather_data
+from etl.load.load_meteo import load_weather_batch, load_weather_data
 
 def run_meteo_etl(city_name: str, latitude=None, longitude=None) -> dict:
     logger = LoggerUtil.get_logger("etl_meteo")
@@ -18,6 +18,26 @@ def run_meteo_etl(city_name: str, latitude=None, longitude=None) -> dict:
         return {"error": str(e), "city": city_name}
 
 
+def run_meteo_etl_batch(cities: list) -> dict:
+    """
+    ETL météo groupé : requêtes Open-Meteo multi-coordonnées (par lots), puis un
+    seul chargement. `cities` : dicts avec id, name, latitude, longitude.
+    """
+    logger = LoggerUtil.get_logger("etl_meteo")
+    logger.info(f"[ETL] : Début ETL météo groupé pour {len(cities)} ville(s)")
+    weather_by_city = extract_weather_batch(cities)
+    try:
+        loaded_rows = load_weather_batch(weather_by_city)
+    except Exception as e:
+        logger.error(f"[ETL] : Erreur lors du chargement météo groupé : {e}")
+        return {"refreshed": [], "failed": [c["name"] for c in cities], "error": str(e)}
+    return {
+        "refreshed": [c["name"] for c in cities if c["id"] in weather_by_city],
+        "failed": [c["name"] for c in cities if c["id"] not in weather_by_city],
+        "loaded_rows": loaded_rows,
+    }
+
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) < 2:
@@ -0,0 +1,78 @@
+"""
+Import OSM hors ligne : POI de toutes les villes depuis un extrait .osm.pbf local.
+
+Pour une reconstruction complète, interroger Overpass ville par ville (ou
+tuile par tuile, etl_osm_region) dépend de serveurs publics limités en débit.
+Ici l'extrait régional (Geofabrik) est lu une seule fois (etl.extract.pbf_osm),
+les POI répartis entre les villes selon leur bbox (même découpage que
+etl_osm_region), puis transformés et chargés ville par ville comme dans le
+pipeline (transform_osm, load_osm_poi : INSERT IGNORE, relançable).
+
+L'extrait doit couvrir les villes traitées : une ville hors de l'extrait
+n'obtient simplement aucun POI.
+
+Usage (depuis /usr/src/app dans le conteneur backend) :
+    python -m etl.etl_osm_pbf --pbf /usr/src/storage/osm/bretagne-latest.osm.pbf [--department Finistère]
+"""
+import argparse
+
+from utils.db_utils import MySQLUtils
+from utils.logger_util import LoggerUtil
+from etl.etl_osm_region import city_bboxes, split_by_city
+from etl.extract.pbf_osm import extract_pbf
+from etl.transform.transform_osm import transform_osm
+from etl.load.load_poi import load_osm_poi
+
+logger = LoggerUtil.get_logger("etl_osm_pbf")
+
+
+def _fetch_cities(department: str = None) -> list:
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        if department:
+            cursor.execute(
+                "SELECT id, name, latitude, longitude FROM cities WHERE department = %s ORDER BY name",
+                (department,)
+            )
+        else:
+            cursor.execute("SELECT id, name, latitude, longitude FROM cities ORDER BY name")
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+def run(pbf_path, department: str = None) -> dict:
+    """Lit l'extrait, répartit et charge les POI des villes ; retourne un résumé."""
+    cities = _fetch_cities(department)
+    if not cities:
+        logger.warning("[pbf] Aucune ville en base à traiter")
+        return {'cities': 0, 'elements': 0, 'loaded': {}}
+
+    bboxes = city_bboxes(cities)
+    elements = extract_pbf(pbf_path)['elements']
+
+    loaded = {}
+    for name, osm_json in split_by_city(elements, bboxes).items():
+        try:
+            df_osm = transform_osm(osm_json, city=name)
+            load_osm_poi(df_osm, city_name=name)
+            loaded[name] = len(df_osm)
+        except Exception as e:
+            logger.error(f"[pbf] Échec du chargement pour {name}: {e}")
+
+    return {'cities': len(bboxes), 'elements': len(elements), 'loaded': loaded}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import OSM des villes depuis un extrait .osm.pbf")
+    parser.add_argument("--pbf", required=True, help="Chemin de l'extrait régional (.osm.pbf)")
+    parser.add_argument("--department", help="Limite aux villes de ce département (cities.department)")
+    args = parser.parse_args()
+
+    summary = run(args.pbf, args.department)
+    logger.info(f"[pbf] Terminé : {summary['cities']} ville(s), {summary['elements']} élément(s) lus, "
+                f"{sum(summary['loaded'].values())} POI transmis au chargement")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,15 @@ camping-car) ignorés jusqu'ici par le filtre 'name' trop strict et la requête
 Overpass incomplète (voir transform_osm.py / api_osm.py).
 load_osm_poi fait un INSERT IGNORE sur (original_id, source_id) : ré-exécuter
 ce script est sans risque, il n'ajoute que les POI absents jusqu'ici.
+
+Les réponses Overpass passent par le cache disque (etl.extract.overpass_cache) :
+une ville dont la réponse est fraîche ne coûte aucun appel réseau, et les
+appels restants sont espacés par api_osm lui-même.
+
+Usage (depuis /usr/src/app dans le conteneur backend) :
+    python -m etl.etl_osm_refresh [--force-refresh | --offline]
 """
-import time
+import argparse
 
 from utils.db_utils import get_all_city_ids
 from utils.logger_util import LoggerUtil
@@ -16,19 +23,22 @@ from etl.load.load_poi import load_osm_poi
 
 logger = LoggerUtil.get_logger("etl_osm_refresh")
 
-# Pause entre deux villes pour rester sous la limite de requêtes Overpass
-# (sans ça, les 40 appels consécutifs déclenchent des 429 en rafale).
-DELAY_BETWEEN_CITIES_S = 5
-
 
 def main():
+    parser = argparse.ArgumentParser(description="Ré-extraction OSM de toutes les villes")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--force-refresh", action="store_true", help="Ignore le cache Overpass")
+    mode.add_argument("--offline", action="store_true",
+                      help="Cache Overpass seulement, même périmé (retraitement sans réseau)")
+    args = parser.parse_args()
+
     cities = get_all_city_ids()
     logger.info(f"[refresh] {len(cities)} ville(s) à retraiter")
 
-    for i, (city_id, city_name) in enumerate(cities):
+    for city_id, city_name in cities:
         logger.info(f"[refresh] OSM pour city_id={city_id} ({city_name})")
         try:
-            osm_json = extract_osm(city_name)
+            osm_json = extract_osm(city_name, force_refresh=args.force_refresh, offline=args.offline)
             if not osm_json:
                 logger.warning(f"[refresh] Pas de données OSM pour {city_name}")
             else:
@@ -37,9 +47,6 @@ def main():
         except Exception as e:
             logger.error(f"[refresh] Échec pour {city_name}: {e}")
 
-        if i < len(cities) - 1:
-            time.sleep(DELAY_BETWEEN_CITIES_S)
-
 
 if __name__ == "__main__":
     main()
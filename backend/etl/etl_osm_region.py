@@ -0,0 +1,189 @@
+"""
+Extraction OSM d'un département entier par tuiles, partagée entre ses villes.
+
+extract_osm interroge Overpass ville par ville sur un carré d'environ 11 km :
+deux bourgs voisins se recouvrent largement et chaque POI commun est
+retéléchargé, une requête (et son attente anti-429) par ville. Ici :
+
+  - les bounding boxes des villes du département sont couvertes par une grille
+    de tuiles alignées sur des multiples de --tile-deg (seules les tuiles qui
+    touchent une ville sont interrogées) ; même requête que api_osm
+    (overpass_query, réglage global [bbox]), même cache disque ;
+  - les éléments des tuiles sont fusionnés et dédoublonnés sur (type, id) : un
+    way à cheval sur deux tuiles est renvoyé par les deux ;
+  - chaque ville reçoit, localement, les éléments dont le point (node, ou
+    centre d'un way/relation) tombe dans sa bbox, puis passe par transform_osm
+    et load_osm_poi (lien histo_poi) comme dans le pipeline.
+
+Différence avec la requête par ville : un way qui déborde dans la bbox d'une
+ville sans que son centre y soit ne lui est plus rattaché (ce centre est de
+toute façon la position stockée du POI).
+
+Usage (depuis /usr/src/app dans le conteneur backend) :
+    python -m etl.etl_osm_region --department Finistère [--tile-deg 0.5] [--force-refresh | --offline]
+"""
+import argparse
+import math
+
+import numpy as np
+
+from utils.db_utils import MySQLUtils
+from utils.geo_utils import get_coordinates_for_city
+from utils.logger_util import LoggerUtil
+from etl.extract.api_osm import city_bbox, extract_bbox
+from etl.transform.transform_osm import transform_osm
+from etl.load.load_poi import load_osm_poi
+
+logger = LoggerUtil.get_logger("etl_osm_region")
+
+DEFAULT_TILE_DEG = 0.5
+# Une tuile de 0.5° renvoie bien plus d'éléments qu'une ville : délai serveur allongé.
+TILE_TIMEOUT_S = 180
+
+
+def _fetch_department_cities(department: str) -> list:
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        cursor.execute(
+            "SELECT id, name, latitude, longitude FROM cities WHERE department = %s ORDER BY name",
+            (department,)
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+def city_bboxes(cities: list) -> dict:
+    """
+    {nom: bbox} des villes, centrées comme dans extract_osm (géocodage du nom,
+    en cache) ; à défaut, sur les coordonnées de la table cities.
+    """
+    bboxes = {}
+    for _, name, latitude, longitude in cities:
+        lat, lon = get_coordinates_for_city(name.strip())
+        if lat is None or lon is None:
+            if latitude is None or longitude is None:
+                logger.warning(f"[region] Pas de coordonnées pour {name} : ville ignorée")
+                continue
+            lat, lon = float(latitude), float(longitude)
+        bboxes[name] = city_bbox(lat, lon)
+    return bboxes
+
+
+def tiles_for(bboxes, tile_deg: float = DEFAULT_TILE_DEG) -> list:
+    """
+    Tuiles de tile_deg degrés, alignées sur la grille globale (une même tuile a
+    la même requête, donc la même entrée de cache, d'un département à l'autre),
+    qui recouvrent au moins une des bboxes.
+    """
+    cells = set()
+    for bbox in bboxes:
+        for i in range(math.floor(bbox['south'] / tile_deg), math.ceil(bbox['north'] / tile_deg)):
+            for j in range(math.floor(bbox['west'] / tile_deg), math.ceil(bbox['east'] / tile_deg)):
+                cells.add((i, j))
+    return [
+        {
+            'south': round(i * tile_deg, 6),
+            'west': round(j * tile_deg, 6),
+            'north': round((i + 1) * tile_deg, 6),
+            'east': round((j + 1) * tile_deg, 6),
+        }
+        for i, j in sorted(cells)
+    ]
+
+
+def merge_elements(responses) -> list:
+    """Éléments des réponses Overpass, sans doublon sur (type, id)."""
+    merged = {}
+    for response in responses:
+        for el in (response or {}).get('elements', []):
+            merged.setdefault((el.get('type'), el.get('id')), el)
+    return list(merged.values())
+
+
+def _coordinates(elements: list):
+    """Tableaux (lat, lon) des éléments : node -> lat/lon, way/relation -> centre ; NaN sinon."""
+    lats = np.full(len(elements), np.nan)
+    lons = np.full(len(elements), np.nan)
+    for k, el in enumerate(elements):
+        point = el if el.get('type') == 'node' else (el.get('center') or {})
+        if point.get('lat') is not None and point.get('lon') is not None:
+            lats[k], lons[k] = point['lat'], point['lon']
+    return lats, lons
+
+
+def split_by_city(elements: list, bboxes: dict) -> dict:
+    """{nom: réponse Overpass restreinte à la bbox de la ville} (un élément peut servir à plusieurs villes)."""
+    lats, lons = _coordinates(elements)
+    split = {}
+    for name, bbox in bboxes.items():
+        # Les comparaisons avec NaN sont fausses : éléments sans position exclus.
+        mask = ((lats >= bbox['south']) & (lats <= bbox['north'])
+                & (lons >= bbox['west']) & (lons <= bbox['east']))
+        split[name] = {'elements': [elements[k] for k in np.flatnonzero(mask)]}
+    return split
+
+
+def run(department: str, tile_deg: float = DEFAULT_TILE_DEG, force_refresh: bool = False,
+        offline: bool = False) -> dict:
+    """Extrait, répartit et charge les POI OSM du département ; retourne un résumé."""
+    cities = _fetch_department_cities(department)
+    if not cities:
+        logger.warning(f"[region] Aucune ville en base pour le département '{department}'")
+        return {'cities': 0, 'tiles': 0, 'tiles_failed': 0, 'elements': 0, 'loaded': {}}
+
+    bboxes = city_bboxes(cities)
+    tiles = tiles_for(bboxes.values(), tile_deg)
+    logger.info(f"[region] {department} : {len(bboxes)} ville(s), {len(tiles)} tuile(s) de {tile_deg}°")
+
+    responses, failed = [], 0
+    for n, tile in enumerate(tiles, 1):
+        label = f"{department} tuile {n}/{len(tiles)}"
+        response = extract_bbox(tile, label, force_refresh=force_refresh, offline=offline,
+                                timeout_s=TILE_TIMEOUT_S)
+        if response is None:
+            failed += 1
+            continue
+        responses.append(response)
+
+    elements = merge_elements(responses)
+    logger.info(f"[region] {len(elements)} élément(s) OSM distinct(s) sur {len(responses)} tuile(s)")
+    if failed:
+        # Une tuile manquante priverait ses villes d'une partie de leurs POI : on
+        # charge quand même (INSERT IGNORE, relançable), mais on le signale.
+        logger.warning(f"[region] {failed} tuile(s) sans réponse : villes concernées incomplètes")
+
+    loaded = {}
+    for name, osm_json in split_by_city(elements, bboxes).items():
+        try:
+            df_osm = transform_osm(osm_json, city=name)
+            load_osm_poi(df_osm, city_name=name)
+            loaded[name] = len(df_osm)
+        except Exception as e:
+            logger.error(f"[region] Échec du chargement pour {name}: {e}")
+
+    return {'cities': len(bboxes), 'tiles': len(tiles), 'tiles_failed': failed,
+            'elements': len(elements), 'loaded': loaded}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extraction OSM d'un département par tuiles")
+    parser.add_argument("--department", required=True, help="Valeur de cities.department (ex. Finistère)")
+    parser.add_argument("--tile-deg", type=float, default=DEFAULT_TILE_DEG,
+                        help=f"Côté des tuiles en degrés (défaut {DEFAULT_TILE_DEG})")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--force-refresh", action="store_true", help="Ignore le cache Overpass")
+    mode.add_argument("--offline", action="store_true",
+                      help="Cache Overpass seulement, même périmé (retraitement sans réseau)")
+    args = parser.parse_args()
+    if args.tile_deg <= 0:
+        parser.error("--tile-deg doit être positif")
+
+    summary = run(args.department, args.tile_deg, force_refresh=args.force_refresh, offline=args.offline)
+    logger.info(f"[region] Terminé : {summary['cities']} ville(s), {summary['tiles']} tuile(s) "
+                f"({summary['tiles_failed']} en échec), {summary['elements']} élément(s), "
+                f"{sum(summary['loaded'].values())} POI transmis au chargement")
+
+
+if __name__ == "__main__":
+    main()
@@ -90,13 +90,11 @@ def scraping_background(city):
 def main(user_role="user"):
 
     # 1. Import GPX (Mongo + MySQL) et récupération de la ville pour chaque fichier
-    gpx_files = extract_all_gpx_files()
-    if not gpx_files:
-        logger.info("[ETL] Aucun fichier GPX à traiter. Arrêt du pipeline.")
-        return None
-
+    # Les fichiers sont lus et transformés un par un, au fil de la boucle.
     results = []
-    for data, gpx_path, fname in gpx_files:
+    processed = 0
+    for data, gpx_path, fname in extract_all_gpx_files():
+        processed += 1
         verifie = 1 if user_role == "admin" else 0
         city = load_gpx_data(data, gpx_path, verifie=verifie)
         if not city:
@@ -121,6 +119,10 @@ def main(user_role="user"):
         threading.Thread(target=scraping_background, args=(city,), daemon=True).start()
         results.append(city)
 
+    if not processed:
+        logger.info("[ETL] Aucun fichier GPX à traiter. Arrêt du pipeline.")
+        return None
+
     # Retourner la liste des villes traitées
     logger.info(f"[ETL] Pipeline principal terminé. Villes traitées: {results}")
     return results
@@ -9,7 +9,7 @@ from etl.transform.transform_wikidata import transform_wikidata
 from etl.transform.transform_p4n import transform_p4n
 from etl.load.load_poi import load_osm_poi, load_wikidata_poi
 from etl.load.load_p4n import load_p4n_to_mysql
-from etl.etl_meteo import run_meteo_etl
+from etl.etl_meteo import run_meteo_etl_batch
 
 
 logger = LoggerUtil.get_logger("etl_rattrapage")
@@ -107,14 +107,13 @@ def rattrapage_meteo():
     MySQLUtils.disconnect(cnx)
 
     logger.info(f"[METEO] Villes restant à rattraper (prévisions absentes/périmées) : {len(missing)}")
-    for city in missing:
-        logger.info(f"[METEO] Rattrapage pour {city['name']}")
-        result = run_meteo_etl(city['name'], city['latitude'], city['longitude'])
-        if 'error' in result or 'warning' in result:
-            logger.warning(f"[METEO] {city['name']} : {result}")
-        else:
-            logger.info(f"[METEO] {city['name']} : OK")
-
+    if not missing:
+        return
+    # Requêtes Open-Meteo groupées (plusieurs villes par appel) puis un seul chargement
+    result = run_meteo_etl_batch(missing)
+    for name in result["failed"]:
+        logger.warning(f"[METEO] {name} : prévisions non récupérées")
+    logger.info(f"[METEO] Rattrapage : {len(result['refreshed'])} ville(s) OK, {len(result['failed'])} échec(s)")
 
 if __name__ == "__main__":
     main()
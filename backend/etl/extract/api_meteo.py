@@ -5,13 +5,26 @@ from utils.geo_utils import get_coordinates_for_city
 
 logger = LoggerUtil.get_logger("etl_meteo")
 
+BASE_URL = "https://api.open-meteo.com/v1/forecast"
+DAILY_VARIABLES = [
+    "weather_code",
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "precipitation_sum",
+    "wind_speed_10m_max",
+    "shortwave_radiation_sum"
+]
+FORECAST_DAYS = 7
+# Coordonnées par appel groupé : l'URL reste courte, et un lot en échec ne
+# retarde qu'une partie du catalogue.
+BATCH_SIZE = 50
+BATCH_TIMEOUT_S = 30
+
 def extract_weather_data(city, latitude=None, longitude=None) -> bool | None:
     """
     Récupère les données météo pour une ville donnée via l'API Open-Meteo.
     Si latitude/longitude sont fournis, Nominatim n'est pas appelé.
     """
-    BASE_URL = "https://api.open-meteo.com/v1/forecast"
-
     if latitude is None or longitude is None:
         logger.info(f"[Extract] : Recherche des coordonnées pour {city}")
         latitude, longitude = get_coordinates_for_city(city)
@@ -27,40 +40,78 @@ def extract_weather_data(city, latitude=None, longitude=None) -> bool | None:
         "latitude": latitude,
         "longitude": longitude,
         "timezone": "Europe/Paris",
-        "daily": [
-            "weather_code",
-            "temperature_2m_max",
-            "temperature_2m_min",
-            "precipitation_sum",
-            "wind_speed_10m_max",
-            "shortwave_radiation_sum"
-        ],
-        "forecast_days": 7
+        "daily": DAILY_VARIABLES,
+        "forecast_days": FORECAST_DAYS
     }
 
     try:
         logger.info("[Extract] : Appel de l'API météo...")
         response = requests.get(BASE_URL, params=params)
         response.raise_for_status()
-        data = response.json()
-        daily_data = data.get('daily', {})
-        weather_list = []
-        # Transformation des données en une liste de tuples pour l'insertion SQL
-        for i in range(len(daily_data.get('time', []))):
-            weather_tuple = (
-                daily_data['time'][i],
-                daily_data['temperature_2m_max'][i],
-                daily_data['temperature_2m_min'][i],
-                daily_data['precipitation_sum'][i],
-                daily_data['wind_speed_10m_max'][i],
-                daily_data['weather_code'][i],
-                daily_data['shortwave_radiation_sum'][i]
-            )
-            weather_list.append(weather_tuple)
-
+        weather_list = parse_daily(response.json().get('daily', {}))
         logger.info(f"[Extract] : {len(weather_list)} jours de prévisions récupérés")
         return weather_list
     except requests.exceptions.RequestException as e:
         logger.error(f"[Extract] : Échec de l'extraction API météo : {e}")
         return None
 
+
+def extract_weather_batch(cities: list, batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Prévisions de plusieurs villes en une requête par lot de `batch_size` :
+    Open-Meteo accepte des listes de latitudes/longitudes séparées par des
+    virgules et renvoie alors une liste de réponses, dans l'ordre des coordonnées.
+    `cities` : dicts avec au moins id, latitude, longitude.
+    Retourne {city_id: [tuples comme extract_weather_data]} ; les villes d'un lot
+    en échec sont absentes du résultat (elles seront retentées au prochain passage).
+    """
+    weather_by_city = {}
+    for start in range(0, len(cities), batch_size):
+        batch = cities[start:start + batch_size]
+        params = {
+            "latitude": ",".join(str(c["latitude"]) for c in batch),
+            "longitude": ",".join(str(c["longitude"]) for c in batch),
+            "timezone": "Europe/Paris",
+            "daily": DAILY_VARIABLES,
+            "forecast_days": FORECAST_DAYS
+        }
+        try:
+            response = requests.get(BASE_URL, params=params, timeout=BATCH_TIMEOUT_S)
+            response.raise_for_status()
+            weather_by_city.update(parse_batch_response(batch, response.json()))
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            logger.error(f"[Extract] : Échec du lot météo {start // batch_size + 1} ({len(batch)} villes) : {e}")
+            continue
+    logger.info(
+        f"[Extract] : Prévisions récupérées pour {len(weather_by_city)}/{len(cities)} villes"
+        f" en {-(-len(cities) // batch_size)} requête(s)"
+    )
+    return weather_by_city
+
+
+def parse_batch_response(batch: list, data) -> dict:
+    """Associe chaque réponse d'un appel multi-coordonnées à sa ville (même ordre)."""
+    # Une seule coordonnée : Open-Meteo renvoie un objet et non une liste.
+    locations = data if isinstance(data, list) else [data]
+    if len(locations) != len(batch):
+        raise ValueError(f"{len(locations)} réponse(s) pour {len(batch)} coordonnées")
+    return {
+        city["id"]: parse_daily(location.get('daily', {}))
+        for city, location in zip(batch, locations)
+    }
+
+
+def parse_daily(daily_data: dict) -> list:
+    """Transformation du bloc `daily` en une liste de tuples pour l'insertion SQL."""
+    return [
+        (
+            daily_data['time'][i],
+            daily_data['temperature_2m_max'][i],
+            daily_data['temperature_2m_min'][i],
+            daily_data['precipitation_sum'][i],
+            daily_data['wind_speed_10m_max'][i],
+            daily_data['weather_code'][i],
+            daily_data['shortwave_radiation_sum'][i]
+        )
+        for i in range(len(daily_data.get('time', [])))
+    ]
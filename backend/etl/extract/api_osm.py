@@ -2,83 +2,140 @@ import requests
 import json
 import time
 
+import orjson
+
+from etl.extract import overpass_cache
 from utils.logger_util import LoggerUtil
 from utils.geo_utils import get_coordinates_for_city
+from utils.rate_limiter import TokenBucket
 
 OVERPASS_HEADERS = {
     "User-Agent": "RandoVanGo-ETL/1.0 (https://github.com/natbediee/randovango)"
 }
 
+# Intervalle minimal entre deux requêtes Overpass du processus : sans lui, les
+# villes traitées à la suite déclenchent des 429 en rafale. Les réponses lues
+# en cache ne l'attendent pas.
+OVERPASS_MIN_INTERVAL_S = 5
+_overpass_bucket = TokenBucket(1 / OVERPASS_MIN_INTERVAL_S)
 
 logger = LoggerUtil.get_logger("etl_osm")
 
 
-def extract_osm(city: str) -> dict:
+# Sélection des POI : clé OSM -> valeurs retenues (None : toutes). Une clause
+# Overpass par clé (valeurs fusionnées dans une regex) au lieu d'une par couple.
+OSM_TAG_FILTERS = {
+    "tourism": ["attraction", "viewpoint", "camp_site", "caravan_site", "information"],
+    "man_made": ["lighthouse"],
+    "historic": None,
+    "natural": ["beach"],
+    "amenity": ["drinking_water", "toilets", "shelter", "parking", "restaurant", "cafe", "pharmacy",
+                "fuel", "shower", "sanitary_dump_station", "waste_disposal"],
+    "shop": ["supermarket", "convenience", "bakery", "laundry"],
+}
+
+# Demi-côté de la bounding box d'une ville : 0.05 degré ≈ 5.5 km de rayon effectif
+# (1 degré de latitude ≈ 111 km).
+CITY_RADIUS_DEG = 0.05
+QUERY_TIMEOUT_S = 45
+
+
+def city_bbox(latitude: float, longitude: float) -> dict:
+    """Bounding box (~5-6 km de rayon) des POI d'une ville."""
+    return {
+        'south': latitude - CITY_RADIUS_DEG,
+        'north': latitude + CITY_RADIUS_DEG,
+        'west': longitude - CITY_RADIUS_DEG,
+        'east': longitude + CITY_RADIUS_DEG
+    }
+
+
+def overpass_query(bbox: dict, timeout_s: int = QUERY_TIMEOUT_S) -> str:
+    """
+    Requête Overpass QL des POI de OSM_TAG_FILTERS dans la bbox : réglage
+    global [bbox] plutôt que répété dans chaque clause. Récupère un large
+    éventail de POI, le filtrage se fera en transformation.
+    """
+    clauses = []
+    for key, values in OSM_TAG_FILTERS.items():
+        if values is None:
+            clauses.append(f'nwr["{key}"];')
+        elif len(values) == 1:
+            clauses.append(f'nwr["{key}"="{values[0]}"];')
+        else:
+            clauses.append(f'nwr["{key}"~"^({"|".join(values)})$"];')
+    body = "\n  ".join(clauses)
+    return (f"[out:json][timeout:{timeout_s}]"
+            f"[bbox:{bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']}];\n"
+            f"(\n  {body}\n);\nout center;")
+
+
+def extract_osm(city: str, force_refresh: bool = False, offline: bool = False) -> dict:
     """
     Récupère les POI d'OSM pour la ville donnée via l'API Overpass.
     Les données sont filtrées pour les points d'intérêt pertinents.
     Utilise une approche avec recherche par bounding box.
+
+    La réponse brute passe par le cache disque (etl.extract.overpass_cache) :
+    une entrée fraîche évite l'appel réseau. `force_refresh` ignore le cache ;
+    `offline` n'utilise que lui, quel que soit l'âge de l'entrée.
     """
     logger.info(f"[Extract] : Lancement de l'extraction OSM via Overpass pour '{city}'...")
-    
+
     # Normalisation du nom de la ville
     city_normalized = city.strip()
     # 1. Obtenir les coordonnées de la ville
     logger.info(f"[Extract] : Recherche des coordonnées pour '{city_normalized}'...")
     latitude, longitude = get_coordinates_for_city(city_normalized)
-    
+
     if latitude is None or longitude is None:
         logger.error(f"[Extract] : Impossible de trouver les coordonnées pour '{city_normalized}'")
         return None
 
     logger.info(f"[Extract] : Coordonnées trouvées : {latitude}, {longitude}")
 
-    # 2. Créer une bounding box autour de la ville (environ 5km de rayon)
-    # Approximation : 1 degré de latitude ≈ 111 km
-    # 0.05 degré ≈ 5.5 km de rayon effectif
-    radius_deg = 0.05
-    bbox = {
-        'south': latitude - radius_deg,
-        'north': latitude + radius_deg,
-        'west': longitude - radius_deg,
-        'east': longitude + radius_deg
-    }
-
+    # 2. Bounding box autour de la ville, puis requête Overpass
+    bbox = city_bbox(latitude, longitude)
     logger.info(f"[Extract] : Bounding box : {bbox} (rayon ~5-6 km)")
+    response_data = extract_bbox(bbox, city_normalized, force_refresh=force_refresh, offline=offline)
+    if response_data is not None:
+        logger.info(f"[Extract] : Données OSM extraites pour {city_normalized} ({len(response_data.get('elements', []))} POI)")
+    return response_data
+
+
+def extract_bbox(bbox: dict, label: str, force_refresh: bool = False, offline: bool = False,
+                 timeout_s: int = QUERY_TIMEOUT_S) -> dict:
+    """
+    Réponse Overpass brute des POI d'une bbox (ville ou tuile régionale,
+    `label` pour les journaux), via le cache disque : voir extract_osm.
+    """
+    query = overpass_query(bbox, timeout_s)
+    if not force_refresh:
+        cached = overpass_cache.read(query, bbox, max_age_s=None if offline else overpass_cache.ttl_s())
+        if cached is not None:
+            return cached
+    if offline:
+        logger.warning(f"[Extract] : Pas de réponse Overpass en cache pour '{label}' (mode hors ligne)")
+        return None
+
+    response_data, last_error = _fetch_overpass(query, label, timeout_s + 45)
+    if response_data is not None:
+        overpass_cache.write(query, response_data, bbox)
+        return response_data
 
-    # 3. Requête Overpass QL utilisant la bounding box
-    # Récupère un large éventail de POI, le filtrage se fera en transformation
-    overpass_query = f"""
-                [out:json][timeout:45];
-                (
-                    nwr["tourism"="attraction"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["tourism"="viewpoint"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["man_made"="lighthouse"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["historic"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["natural"="beach"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="drinking_water"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="toilets"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="shelter"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="parking"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="restaurant"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="cafe"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="pharmacy"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["tourism"="camp_site"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["tourism"="caravan_site"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["tourism"="information"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["shop"="supermarket"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["shop"="convenience"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["shop"="bakery"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="fuel"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="shower"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="sanitary_dump_station"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["amenity"="waste_disposal"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                    nwr["shop"="laundry"]({bbox['south']},{bbox['west']},{bbox['north']},{bbox['east']});
-                );
-                out center;
-        """
+    # Overpass indisponible : une entrée périmée vaut mieux que rien.
+    response_data = overpass_cache.read(query, bbox, max_age_s=None)
+    if response_data is not None:
+        logger.warning(f"[Extract] : Overpass indisponible, réponse en cache périmée utilisée pour '{label}'")
+        return response_data
+    logger.error(f"[Extract] : ÉCHEC DE L'EXTRACTION OSM : Tous les serveurs ont échoué. Dernière erreur : {last_error}")
+    return None
+
+
+def _fetch_overpass(overpass_query: str, city: str, timeout_s: int = 90) -> tuple:
+    """(réponse JSON ou None, dernière erreur) : essaie chaque serveur Overpass."""
     logger.info(f"[Extract] : Requête Overpass envoyée : {overpass_query}")
-    
+
     # Liste de serveurs Overpass à essayer (en cas d'échec du premier)
     # lz4.overpass-api.de retiré : injoignable de façon répétée (connexion impossible,
     # pas juste un 429), il ne fait que ralentir le fallback pour rien.
@@ -97,8 +154,9 @@ def extract_osm(city: str) -> dict:
         for attempt in range(2):
             try:
                 logger.info(f"[Extract] : Tentative de connexion au serveur : {server_url}")
+                _overpass_bucket.acquire()
                 response = requests.post(
-                    server_url, data={"data": overpass_query}, headers=OVERPASS_HEADERS, timeout=90
+                    server_url, data={"data": overpass_query}, headers=OVERPASS_HEADERS, timeout=timeout_s
                 )
 
                 if response.status_code == 429:
@@ -112,7 +170,8 @@ def extract_osm(city: str) -> dict:
                     break
 
                 response.raise_for_status()
-                response_data = response.json()
+                # orjson : plusieurs fois plus rapide que json sur les grosses réponses (tuiles régionales).
+                response_data = orjson.loads(response.content)
 
                 # Vérifier si la réponse contient des éléments
                 elements = response_data.get('elements', [])
@@ -141,10 +200,4 @@ def extract_osm(city: str) -> dict:
         if response_data is not None:
             break
     
-    # Si aucun serveur n'a fonctionné
-    if response_data is None:
-        logger.error(f"[Extract] : ÉCHEC DE L'EXTRACTION OSM : Tous les serveurs ont échoué. Dernière erreur : {last_error}")
-        return None
-    logger.info(f"[Extract] : Données OSM extraites pour {city_normalized} ({len(response_data.get('elements', []))} POI)")
-    return response_data
-
+    return response_data, last_error
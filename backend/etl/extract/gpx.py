@@ -1,6 +1,7 @@
 
 import os
 from pathlib import Path
+from typing import Iterator
 from utils.logger_util import LoggerUtil
 
 from etl.transform.transform_gpx import transform_gpx
@@ -8,17 +9,17 @@ from utils.db_utils import gpx_already_in_mysql
 
 logger = LoggerUtil.get_logger("etl_gpx")
 
-def extract_all_gpx_files() -> list:
+def extract_all_gpx_files() -> Iterator[tuple]:
     """
-    Recherche tous les fichiers GPX dans le dossier défini par DATA,
-    lit leur contenu, effectue la transformation, et retourne une liste de tuples (data, gpx_path, fname).
+    Recherche tous les fichiers GPX dans le dossier défini par DATA, les lit en
+    flux (etl.transform.gpx_parser), effectue la transformation et produit les
+    tuples (data, gpx_path, fname) un par un : un seul tracé en mémoire à la fois.
     """
     gpx_dir = Path("/usr/src/data")
     gpx_files = [f for f in os.listdir(gpx_dir) if f.endswith('.gpx')]
     if not gpx_files:
         logger.error(f"[Extract] : Aucun fichier GPX trouvé dans {gpx_dir}")
-        return []
-    results = []
+        return
     for fname in gpx_files:
         gpx_path = os.path.join(gpx_dir, fname)
         # Vérification présence en base MySQL
@@ -31,11 +32,8 @@ def extract_all_gpx_files() -> list:
                 logger.warning(f"[Extract] : Erreur lors de la suppression du fichier {gpx_path} : {e}")
             continue
         logger.info(f"[Extract] : Début du pipeline. Fichier GPX détecté: {fname}")
-        with open(gpx_path, 'r') as gpx_file:
-            gpx_content = gpx_file.read()
-        data = transform_gpx(gpx_content, fname)
+        data = transform_gpx(Path(gpx_path), fname)
         if not data:
             logger.info(f"[Extract] : Erreur lors de la transformation GPX pour {fname}. Fichier ignoré.")
             continue
-        results.append((data, gpx_path, fname))
-    return results
+        yield data, gpx_path, fname
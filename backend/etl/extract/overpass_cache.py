@@ -0,0 +1,119 @@
+"""
+Cache disque des réponses Overpass brutes (JSON compressé gzip).
+
+extract_osm retéléchargeait tout le résultat Overpass à chaque passage d'une
+ville (pipeline, etl_osm_refresh, etl_rattrapage) : retraiter les transforms
+ou recharger après un changement de schéma repassait par le réseau, au rythme
+imposé par les 429 du service. Ici :
+
+  - clé = hash SHA-256 de la requête Overpass (espaces normalisés), qui
+    contient la bounding box ; le nom du fichier reprend la bbox pour s'y
+    retrouver (`<sud>_<ouest>_<nord>_<est>-<hash>.json.gz`) ;
+  - une entrée est fraîche pendant OVERPASS_CACHE_TTL_DAYS jours ; périmée,
+    elle sert encore de repli si Overpass ne répond pas ;
+  - la taille totale est bornée (OVERPASS_CACHE_MAX_MB) : les entrées les
+    moins récemment lues sont supprimées d'abord.
+
+Écritures atomiques (fichier temporaire puis os.replace) : plusieurs processus
+ETL peuvent partager le dossier (OVERPASS_CACHE_DIR, défaut storage/cache/overpass).
+"""
+import gzip
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import orjson
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger("etl_osm")
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[3] / "storage" / "cache" / "overpass"
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_MB = 500
+
+
+def cache_dir() -> Path:
+    return Path(os.getenv("OVERPASS_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+
+
+def ttl_s() -> float:
+    return float(os.getenv("OVERPASS_CACHE_TTL_DAYS", str(DEFAULT_TTL_DAYS))) * 24 * 3600
+
+
+def max_bytes() -> int:
+    return int(float(os.getenv("OVERPASS_CACHE_MAX_MB", str(DEFAULT_MAX_MB))) * 1024 * 1024)
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(" ".join(query.split()).encode("utf-8")).hexdigest()
+
+
+def _path(query: str, bbox: dict = None) -> Path:
+    digest = query_hash(query)[:24]
+    if bbox:
+        prefix = "_".join(f"{bbox[side]:.4f}" for side in ("south", "west", "north", "east"))
+        return cache_dir() / f"{prefix}-{digest}.json.gz"
+    return cache_dir() / f"{digest}.json.gz"
+
+
+def read(query: str, bbox: dict = None, max_age_s: float = None):
+    """
+    Réponse en cache de la requête, ou None si absente ou plus vieille que
+    max_age_s (None : quel que soit son âge).
+    """
+    path = _path(query, bbox)
+    try:
+        age = time.time() - path.stat().st_mtime
+        if max_age_s is not None and age > max_age_s:
+            return None
+        with gzip.open(path, "rb") as f:
+            data = orjson.loads(f.read())
+        # Date de lecture pour l'éviction LRU (la fraîcheur suit st_mtime).
+        os.utime(path, (time.time(), path.stat().st_mtime))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"[Extract] : Entrée de cache Overpass illisible ({path.name}) : {e}")
+        return None
+    logger.info(f"[Extract] : Réponse Overpass lue en cache ({path.name}, {age / 3600:.1f} h)")
+    return data
+
+
+def write(query: str, data: dict, bbox: dict = None) -> None:
+    """Enregistre une réponse, puis ramène le cache sous sa taille maximale."""
+    path = _path(query, bbox)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            f.write(orjson.dumps(data))
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"[Extract] : Écriture du cache Overpass impossible : {e}")
+        tmp.unlink(missing_ok=True)
+        return
+    evict(max_bytes())
+
+
+def evict(limit_bytes: int) -> int:
+    """Supprime les entrées les moins récemment lues au-delà de limit_bytes ; retourne leur nombre."""
+    try:
+        entries = [(p, p.stat()) for p in cache_dir().glob("*.json.gz")]
+    except OSError:
+        return 0
+    total = sum(st.st_size for _, st in entries)
+    removed = 0
+    for path, st in sorted(entries, key=lambda e: e[1].st_atime):
+        if total <= limit_bytes:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= st.st_size
+        removed += 1
+    if removed:
+        logger.info(f"[Extract] : {removed} entrée(s) supprimée(s) du cache Overpass")
+    return removed
@@ -0,0 +1,87 @@
+"""
+Extraction des POI OSM depuis un extrait régional local (.osm.pbf), sans Overpass.
+
+Alternative à extract_osm pour les reconstructions complètes : un extrait
+Geofabrik (ex. bretagne-latest.osm.pbf) est lu en un seul passage, les nodes et
+ways retenus selon la même sélection de tags que la requête Overpass
+(api_osm.OSM_TAG_FILTERS), et le résultat a la forme d'une réponse Overpass
+"out center" : transform_osm s'applique tel quel (même nommage, mêmes
+DEFAULT_NAME_BY_TYPE).
+
+Le filtrage par clé est fait par libosmium (KeyFilter, en C++) : seuls les
+objets candidats remontent en Python. Les coordonnées des nodes sont gardées en
+mémoire (with_locations) pour calculer le centre des ways, comme Overpass
+(centre de la bounding box de la géométrie). Les relations ne sont pas lues :
+leurs membres demanderaient d'assembler les multipolygones pour un gain minime
+sur ces catégories de POI.
+
+Dépendance optionnelle : le paquet `osmium` (pyosmium) n'est importé qu'à l'appel.
+"""
+from pathlib import Path
+
+from etl.extract.api_osm import OSM_TAG_FILTERS
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger("etl_osm")
+
+
+def matches_filters(tags) -> bool:
+    """Vrai si un des tags est retenu par OSM_TAG_FILTERS (même sélection que la requête Overpass)."""
+    for key, values in OSM_TAG_FILTERS.items():
+        value = tags.get(key)
+        if value is not None and (values is None or value in values):
+            return True
+    return False
+
+
+def _way_center(way):
+    """Centre de la bounding box des nodes du way (None si aucun n'est localisé dans l'extrait)."""
+    lats, lons = [], []
+    for node in way.nodes:
+        if node.location.valid():
+            lats.append(node.location.lat)
+            lons.append(node.location.lon)
+    if not lats:
+        return None
+    return {'lat': (min(lats) + max(lats)) / 2, 'lon': (min(lons) + max(lons)) / 2}
+
+
+def extract_pbf(pbf_path) -> dict:
+    """
+    Lit l'extrait et retourne {'elements': [...]} au format Overpass (nodes avec
+    lat/lon, ways avec center), limité aux POI de OSM_TAG_FILTERS.
+    """
+    try:
+        import osmium
+        import osmium.filter
+    except ImportError as exc:
+        raise RuntimeError(
+            "Le paquet 'osmium' n'est pas installé (voir requirements.backend.txt)."
+        ) from exc
+
+    pbf_path = Path(pbf_path)
+    logger.info(f"[Extract] : Lecture de l'extrait OSM {pbf_path.name}...")
+    processor = (
+        osmium.FileProcessor(str(pbf_path), osmium.osm.NODE | osmium.osm.WAY)
+        .with_locations()
+        .with_filter(osmium.filter.KeyFilter(*OSM_TAG_FILTERS))
+    )
+
+    elements = []
+    for obj in processor:
+        tags = dict(obj.tags)
+        if not matches_filters(tags):
+            continue
+        if obj.is_node():
+            if not obj.location.valid():
+                continue
+            elements.append({'type': 'node', 'id': obj.id, 'lat': obj.location.lat,
+                             'lon': obj.location.lon, 'tags': tags})
+        else:
+            center = _way_center(obj)
+            if center is None:
+                continue
+            elements.append({'type': 'way', 'id': obj.id, 'center': center, 'tags': tags})
+
+    logger.info(f"[Extract] : {len(elements)} POI OSM lus dans {pbf_path.name}")
+    return {'elements': elements}
@@ -1,111 +1,148 @@
 import os
 from pathlib import Path
 
+from bson import ObjectId
+
 from utils.mongo_utils import MongoUtils
 from utils.logger_util import LoggerUtil
 from utils.service_utils import ServiceUtil
 from utils.db_utils import MySQLUtils
 from utils.geo_utils import get_admin_info_from_coordinates
+from utils.geocode_cache import remember_city
+from services import city_resolver, geo_index
+from etl.city_stats import refresh_city_stats_around
+from services.trace_store import delete_traces_by_id, metrics_fields, store_raw_gpx, trace_fields
 
 ROOT = Path(__file__).resolve().parents[3]
 logger = LoggerUtil.get_logger("etl_gpx")
 
 ServiceUtil.load_env()
 
+INSERT_HIKE_SQL = """INSERT INTO hikes
+    (name, description, start_latitude, start_longitude, distance_km, estimated_duration_h, elevation_gain_m, difficulte, mongo_id, source_id, city_id, filename, verifie)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
+
+
+def _hike_row(data, fname, source_id, city_id, verifie) -> tuple:
+    """Valeurs de INSERT_HIKE_SQL (mongo_id à NULL, renseigné après l'insertion MongoDB)."""
+    return (data['name'], data['description'], data['start_lat'], data['start_lon'], data['distance_km'],
+            data['estimated_duration_h'], data['denivele_m'], data['difficulte'], None, source_id, city_id,
+            fname, verifie)
+
+
+def trace_document_fields(data) -> dict:
+    """
+    Champs calculés du document MongoDB : points en binaire compact
+    (utils.trace_codec), niveaux de détail (50/500/5000 points) et emprise,
+    calculés une fois ici plutôt qu'à chaque affichage (services.trace_store),
+    puis distance, D+/D−, temps de marche et profil altimétrique (transform_gpx).
+    """
+    return {
+        **trace_fields(data['lats'], data['lons'], data['eles']),
+        **metrics_fields(data.get('metrics')),
+    }
+
+
+def _trace_doc(trace_id, data, fname, hike_id, gpx_file_id, fields) -> dict:
+    return {
+        "_id": trace_id,
+        "name": data['name'],
+        "waypoints": data['waypoints'],
+        "filename": fname,
+        "hike_mysql_id": hike_id,
+        "gpx_file_id": gpx_file_id,
+        **fields,
+    }
+
+
 def load_gpx_data(data, gpx_path, verifie=0) -> str:
     """
     Charge les données GPX transformées dans MongoDB et MySQL, puis archive le fichier.
     Retourne le nom de la ville ou None si déjà importé.
     verifie: 1 si admin, 0 sinon
     """
-    # Create MySQL connection inside function
-    mysql_conn = MySQLUtils.connect()
-    
     fname = os.path.basename(gpx_path)
     MongoUtils.connect()
     gpx_collection = MongoUtils.get_collection("gpx_traces")
-    existing = gpx_collection.find_one({"filename": fname})
+    existing = gpx_collection.find_one({"filename": fname}, {"_id": 1})
     city_name = data.get('city_name')
     if existing:
         logger.info(f"[load] : Le fichier {fname} existe déjà dans MongoDB (id={existing.get('_id')}). Ignorer l'import.")
-        MySQLUtils.disconnect(mysql_conn)
         return city_name if city_name else None
 
     logger.info(f"[load] : Import du fichier GPX: {fname}")
 
     start_lat = data['start_lat']
     start_lon = data['start_lon']
-    description = data['description']
-    # city_name déjà défini ci-dessus
-    cursor = mysql_conn.cursor()
-    cursor.execute("SELECT id FROM cities WHERE name = %s", (city_name,))
-    result = cursor.fetchone()
-    if result:
-        city_id = result[0]
-        logger.info(f"[load] : Ville {city_name} trouvée avec ID={city_id}")
-    else:
-        # Récupérer infos admin
-        department, region, country = get_admin_info_from_coordinates(start_lat, start_lon)
-        cursor.execute(
-            "INSERT INTO cities (name, latitude, longitude, department, region, country) VALUES (%s, %s, %s, %s, %s, %s)",
-            (city_name, start_lat, start_lon, department, region, country)
-        )
-        mysql_conn.commit()
-        city_id = cursor.lastrowid
-        logger.info(f"[load] : Ville {city_name} créée avec ID={city_id}, {department}, {region}, {country}")
-    cursor.close()
-
-    # --- Gestion de la source ---
-    source_name = data.get('author') or 'inconnue'
-    with mysql_conn.cursor() as cursor:
-        cursor.execute("SELECT id FROM sources WHERE name = %s", (source_name,))
+    # Connexion rendue au pool même si MySQL, GridFS ou MongoDB lève en cours d'import.
+    with MySQLUtils.connection() as mysql_conn:
+        cursor = mysql_conn.cursor()
+        cursor.execute("SELECT id FROM cities WHERE name = %s", (city_name,))
         result = cursor.fetchone()
         if result:
-            source_id = result[0]
+            city_id = result[0]
+            logger.info(f"[load] : Ville {city_name} trouvée avec ID={city_id}")
         else:
-            cursor.execute("INSERT INTO sources (name) VALUES (%s)", (source_name,))
+            # Récupérer infos admin
+            department, region, country = get_admin_info_from_coordinates(start_lat, start_lon)
+            cursor.execute(
+                "INSERT INTO cities (name, latitude, longitude, department, region, country) VALUES (%s, %s, %s, %s, %s, %s)",
+                (city_name, start_lat, start_lon, department, region, country)
+            )
             mysql_conn.commit()
-            source_id = cursor.lastrowid
+            city_id = cursor.lastrowid
+            logger.info(f"[load] : Ville {city_name} créée avec ID={city_id}, {department}, {region}, {country}")
+            # Les extractions OSM, P4N et météo de la ville géocodent son nom : servi par le cache.
+            remember_city(city_name, start_lat, start_lon)
+            city_resolver.add(city_id, city_name, start_lat, start_lon)
+        cursor.close()
 
+        # --- Gestion de la source ---
+        source_name = data.get('author') or 'inconnue'
+        with mysql_conn.cursor() as cursor:
+            cursor.execute("SELECT id FROM sources WHERE name = %s", (source_name,))
+            result = cursor.fetchone()
+            if result:
+                source_id = result[0]
+            else:
+                cursor.execute("INSERT INTO sources (name) VALUES (%s)", (source_name,))
+                mysql_conn.commit()
+                source_id = cursor.lastrowid
 
-    # --- Insertion MySQL d'abord (mongo_id=None) ---
-    cursor = mysql_conn.cursor()
-    cursor.execute(
-        """INSERT INTO hikes 
-           (name, description, start_latitude, start_longitude, distance_km, estimated_duration_h, elevation_gain_m, difficulte, mongo_id, source_id, city_id, filename, verifie) 
-           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
-        (data['name'], description, start_lat, start_lon, data['distance_km'], data['estimated_duration_h'], data['denivele_m'], data['difficulte'], None, source_id, city_id, fname, verifie)
-    )
-    mysql_conn.commit()
-    gpxtrace_id = cursor.lastrowid
-
+        # --- Insertion MySQL d'abord (mongo_id=None) ---
+        cursor = mysql_conn.cursor()
+        cursor.execute(INSERT_HIKE_SQL, _hike_row(data, fname, source_id, city_id, verifie))
+        mysql_conn.commit()
+        gpxtrace_id = cursor.lastrowid
 
+        # --- GPX brut dans GridFS, octets d'origine intacts (lu seulement au
+        # téléchargement, il n'alourdit plus les lectures de tracés) ---
+        trace_id = ObjectId()
+        with open(gpx_path, 'rb') as f:
+            gpx_file_id = store_raw_gpx(f, fname, trace_id, gpxtrace_id)
 
-    # --- Lecture du contenu GPX brut ---
-    with open(gpx_path, 'r', encoding='utf-8') as f:
-        gpx_content = f.read()
+        # --- Insertion MongoDB ---
+        trace_doc = _trace_doc(trace_id, data, fname, gpxtrace_id, gpx_file_id, trace_document_fields(data))
+        try:
+            mongo_result = gpx_collection.insert_one(trace_doc)
+        except Exception:
+            # Sans document, le GPX déjà rangé dans GridFS ne serait plus rattaché à rien.
+            delete_traces_by_id([trace_id])
+            raise
+        id_mongo = str(mongo_result.inserted_id)
+        logger.info(f"[load] : Document MongoDB créé avec l'id: {id_mongo}")
 
-    # --- Insertion MongoDB avec le contenu brut ---
-    trace_doc = {
-        "name": data['name'],
-        "points": data['points'],
-        "waypoints": data['waypoints'],
-        "filename": fname,
-        "hike_mysql_id": gpxtrace_id,
-        "gpx_content": gpx_content
-    }
-    mongo_result = gpx_collection.insert_one(trace_doc)
-    id_mongo = str(mongo_result.inserted_id)
-    logger.info(f"[load] : Document MongoDB créé avec l'id: {id_mongo}")
-
-    # --- Mise à jour du champ mongo_id dans MySQL ---
-    cursor.execute(
-        "UPDATE hikes SET mongo_id = %s WHERE id = %s",
-        (id_mongo, gpxtrace_id)
-    )
-    mysql_conn.commit()
-    cursor.close()
-    logger.info(f"[load] : Loaded: {fname} (MySQL id={gpxtrace_id}, Mongo id={id_mongo})")
+        # --- Mise à jour du champ mongo_id dans MySQL ---
+        cursor.execute(
+            "UPDATE hikes SET mongo_id = %s WHERE id = %s",
+            (id_mongo, gpxtrace_id)
+        )
+        mysql_conn.commit()
+        cursor.close()
+        logger.info(f"[load] : Loaded: {fname} (MySQL id={gpxtrace_id}, Mongo id={id_mongo})")
+    # Connexion rendue : l'index et les stats des villes empruntent la leur.
+    geo_index.refresh("hikes")
+    refresh_city_stats_around([(start_lat, start_lon)])
 
     # --- Suppression du fichier source après traitement ---
     try:
@@ -114,10 +151,134 @@ def load_gpx_data(data, gpx_path, verifie=0) -> str:
     except Exception as e:
         logger.warning(f"[load] : Erreur lors de la suppression du fichier {gpx_path} : {e}")
 
-    # Close MySQL connection
-    MySQLUtils.disconnect(mysql_conn)
-    
     return city_name if city_name else None
 
 
 
+
+
+def ids_by_name(cursor, table: str, names) -> dict:
+    """
+    {nom demandé: id} des noms présents dans `table`. Une requête `WHERE name = %s`
+    par nom, comme load_gpx_data : l'égalité suit la collation de la colonne
+    (casse et accents ignorés), qu'une comparaison en Python ne reproduit pas.
+    Peu de noms distincts par lot (villes, auteurs).
+    """
+    ids = {}
+    for name in names:
+        cursor.execute(f"SELECT id FROM {table} WHERE name = %s ORDER BY id LIMIT 1", (name,))
+        row = cursor.fetchone()
+        if row:
+            ids[name] = row[0]
+    return ids
+
+
+def _ids_creating_missing(cursor, table: str, columns: str, rows_by_name: dict, names: set) -> tuple:
+    """
+    ({nom: id}, lignes créées) : ids des `names` existants, et création des
+    absents dont `rows_by_name` fournit les valeurs (nom en tête). Un nom égal
+    pour MySQL à un nom créé juste avant dans le lot réutilise sa ligne.
+    """
+    ids = ids_by_name(cursor, table, names)
+    created = []
+    placeholders = ", ".join(["%s"] * len(columns.split(",")))
+    for name in sorted(names - ids.keys()):
+        if name not in rows_by_name:
+            continue
+        found = ids_by_name(cursor, table, [name]) if created else {}
+        if found:
+            ids.update(found)
+            continue
+        cursor.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows_by_name[name])
+        ids[name] = cursor.lastrowid
+        created.append(rows_by_name[name])
+    return ids, created
+
+
+def load_gpx_batch(items: list, new_cities: dict, verifie=0) -> list:
+    """
+    Chargement groupé (etl.bulk_import_gpx) d'un lot de fichiers déjà transformés
+    et géocodés. `items` : [{"data", "gpx_path", "fname", "fields"}] où `fields`
+    sont les champs calculés du document (trace_document_fields, déjà calculés
+    dans le pool de processus) ; `new_cities` : {nom: (lat, lon, department,
+    region, country)} des villes à créer.
+
+    Une transaction MySQL pour tout le lot (randonnées en executemany ; villes
+    et sources, peu nombreuses, retrouvées par nom comme dans load_gpx_data),
+    un insert_many MongoDB ; un échec annule le lot entier.
+    Retourne les items chargés (les fichiers déjà en base sont ignorés).
+    """
+    if not items:
+        return []
+    MongoUtils.connect()
+    gpx_collection = MongoUtils.get_collection("gpx_traces")
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        fnames = [item["fname"] for item in items]
+        placeholders = ", ".join(["%s"] * len(fnames))
+        cursor.execute(f"SELECT filename FROM hikes WHERE filename IN ({placeholders})", fnames)
+        existing = {row[0] for row in cursor.fetchall()}
+        items = [item for item in items if item["fname"] not in existing]
+        if not items:
+            cursor.close()
+            return []
+
+        # --- Villes et sources : retrouvées comme dans load_gpx_data, créées si absentes ---
+        city_names = {item["data"]["city_name"] for item in items}
+        city_ids, missing = _ids_creating_missing(
+            cursor, "cities", "name, latitude, longitude, department, region, country",
+            {name: (name, *values) for name, values in new_cities.items()}, city_names,
+        )
+        source_names = {item["data"].get("author") or "inconnue" for item in items}
+        source_ids, _ = _ids_creating_missing(
+            cursor, "sources", "name", {name: (name,) for name in source_names}, source_names,
+        )
+
+        # --- Randonnées (mongo_id à NULL), ids relus par nom de fichier ---
+        items = [item for item in items if item["data"]["city_name"] in city_ids]
+        if not items:
+            cnx.commit()
+            cursor.close()
+            return []
+        cursor.executemany(INSERT_HIKE_SQL, [
+            _hike_row(item["data"], item["fname"], source_ids[item["data"].get("author") or "inconnue"],
+                      city_ids[item["data"]["city_name"]], verifie)
+            for item in items
+        ])
+        fnames = [item["fname"] for item in items]
+        placeholders = ", ".join(["%s"] * len(fnames))
+        cursor.execute(f"SELECT filename, id FROM hikes WHERE filename IN ({placeholders})", fnames)
+        hike_ids = dict(cursor.fetchall())
+
+        # --- MongoDB : GPX d'origine dans GridFS, puis tous les tracés d'un coup ---
+        docs = []
+        try:
+            for item in items:
+                trace_id = ObjectId()
+                hike_id = hike_ids[item["fname"]]
+                with open(item["gpx_path"], 'rb') as f:
+                    gpx_file_id = store_raw_gpx(f, item["fname"], trace_id, hike_id)
+                docs.append(_trace_doc(trace_id, item["data"], item["fname"], hike_id, gpx_file_id, item["fields"]))
+            gpx_collection.insert_many(docs, ordered=False)
+            cursor.executemany("UPDATE hikes SET mongo_id = %s WHERE id = %s",
+                               [(str(doc["_id"]), doc["hike_mysql_id"]) for doc in docs])
+            cnx.commit()
+        except Exception:
+            # La transaction MySQL est annulée par MySQLUtils.connection ; on
+            # retire ce qui a déjà été écrit côté MongoDB.
+            delete_traces_by_id([doc["_id"] for doc in docs])
+            raise
+        cursor.close()
+
+    logger.info(f"[load] : Lot chargé : {len(items)} randonnée(s), {len(missing)} ville(s) créée(s)")
+    for name, latitude, longitude, *_ in missing:
+        remember_city(name, latitude, longitude)
+        city_resolver.add(city_ids[name], name, latitude, longitude)
+    geo_index.refresh("hikes")
+    refresh_city_stats_around([(item["data"]["start_lat"], item["data"]["start_lon"]) for item in items])
+    for item in items:
+        try:
+            os.remove(item["gpx_path"])
+        except Exception as e:
+            logger.warning(f"[load] : Erreur lors de la suppression du fichier {item['gpx_path']} : {e}")
+    return items
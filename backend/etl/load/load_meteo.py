@@ -2,34 +2,65 @@
 from utils.logger_util import LoggerUtil
 from utils.db_utils import MySQLUtils
 from utils.service_utils import ServiceUtil
+from services import response_cache
 
 logger = LoggerUtil.get_logger("etl_meteo")
 
 def load_weather_data(data, city) -> None:
-    cnx = MySQLUtils.connect()
-    cursor = cnx.cursor()
-    city_id = ServiceUtil.get_city_id(cursor, city)
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        city_id = ServiceUtil.get_city_id(cursor, city)
+        cursor.close()
     if city_id is None:
         logger.warning(f"Ville {city} absente de la base. Aucune donnée météo insérée.")
-        cursor.close()
-        MySQLUtils.disconnect(cnx)
         return
-    # Filtrer les tuples déjà présents (city_id, date)
-    filtered_data = []
-    for row in data:
-        date = row[0]
-        cursor.execute("SELECT 1 FROM weather WHERE city_id = %s AND date = %s", (city_id, date))
-        if cursor.fetchone() is None:
-            # On recompose le tuple avec city_id devant
-            filtered_data.append((city_id, *row))
-    if filtered_data:
-        sql = ("""
-            INSERT INTO weather (
-                city_id, date, temp_max_c, temp_min_c, precipitation_mm, wind_max_kmh, weather_code, solar_energy_sum
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """)
-        cursor.executemany(sql, filtered_data)
-        cnx.commit()
-    cursor.close()
-    MySQLUtils.disconnect(cnx)
+    load_weather_batch({city_id: data})
 
+
+def load_weather_batch(weather_by_city: dict) -> int:
+    """
+    Charge les prévisions de plusieurs villes en un aller-retour :
+    {city_id: [(date, temp_max, temp_min, precipitation, wind, weather_code, solar), ...]}.
+    Upsert sur la clé unique (city_id, date) : un jour déjà en base reçoit la
+    prévision la plus récente au lieu de garder la première jamais chargée.
+    Retourne le nombre de lignes insérées ou modifiées.
+    """
+    if not weather_by_city:
+        return 0
+    rows = [
+        # On recompose le tuple avec city_id devant
+        (city_id, *row)
+        for city_id, city_rows in weather_by_city.items()
+        for row in city_rows
+    ]
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        written = 0
+        if rows:
+            cursor.executemany("""
+                INSERT INTO weather (
+                    city_id, date, temp_max_c, temp_min_c, precipitation_mm, wind_max_kmh, weather_code, solar_energy_sum
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    temp_max_c = VALUES(temp_max_c),
+                    temp_min_c = VALUES(temp_min_c),
+                    precipitation_mm = VALUES(precipitation_mm),
+                    wind_max_kmh = VALUES(wind_max_kmh),
+                    weather_code = VALUES(weather_code),
+                    solar_energy_sum = VALUES(solar_energy_sum)
+            """, rows)
+            # MySQL compte 1 par insertion, 2 par ligne modifiée, 0 si inchangée.
+            written = cursor.rowcount
+        # Date du dernier chargement, lue par services.meteo_scheduler pour juger
+        # de la fraîcheur de la ville (même si aucune prévision n'a changé).
+        cursor.executemany(
+            "INSERT INTO weather_refresh (city_id, refreshed_at) VALUES (%s, NOW())"
+            " ON DUPLICATE KEY UPDATE refreshed_at = NOW()",
+            [(city_id,) for city_id in weather_by_city]
+        )
+        cnx.commit()
+        if written:
+            response_cache.invalidate(response_cache.CITIES_CACHE)
+        cursor.close()
+    logger.info(f"[Load] : {len(rows)} jour(s) de prévisions chargés pour {len(weather_by_city)} ville(s)")
+    return written
@@ -2,40 +2,10 @@ import pandas as pd
 from utils.logger_util import LoggerUtil
 from utils.db_utils import MySQLUtils
 from utils.service_utils import ServiceUtil, SERVICE_CATEGORY_LABEL_MAP
+from services import geo_index
+from etl.city_stats import refresh_city_stats_around
 logger = LoggerUtil.get_logger("etl_poi")
 
-def insert_service_and_link(cursor, poi_id, type_value):
-    """
-    Crée le service (category+name) si besoin et lie le POI à ce service dans poi_service.
-    """
-    
-    name_value = SERVICE_CATEGORY_LABEL_MAP.get(type_value, type_value)
-    # Vérifier si la catégorie existe déjà dans services (category + name)
-    cursor.execute("SELECT id FROM services WHERE category = %s AND name = %s", (type_value, name_value))
-    service_res = cursor.fetchone()
-    if service_res:
-        service_id = service_res[0]
-    else:
-        cursor.execute("INSERT INTO services (category, name) VALUES (%s, %s)", (type_value, name_value))
-        service_id = cursor.lastrowid
-    # Lier poi et service
-    cursor.execute("INSERT IGNORE INTO poi_service (poi_id, service_id) VALUES (%s, %s)", (poi_id, service_id))
-
-
-def insert_histo_poi(cursor, poi_id, city_name):
-    """
-    Insère le lien entre un POI et une ville dans la table histo_poi, à partir du nom de la ville.
-    """
-    city_id = ServiceUtil.get_city_id(cursor, city_name)
-    if city_id:
-        cursor.execute(
-            """
-            INSERT IGNORE INTO histo_poi (poi_id, city_id)
-            VALUES (%s, %s)
-            """,
-            (poi_id, city_id)
-        )
-
 def get_or_create_source(cursor, source_name):
     cursor.execute("SELECT id FROM sources WHERE name = %s", (source_name,))
     result = cursor.fetchone()
@@ -44,6 +14,106 @@ def get_or_create_source(cursor, source_name):
     cursor.execute("INSERT INTO sources (name) VALUES (%s)", (source_name,))
     return cursor.lastrowid
 
+
+# Lignes par requête multi-lignes (executemany regroupe les INSERT en un seul
+# VALUES (...), (...) ; les SELECT ... IN sont découpés d'autant).
+BATCH_SIZE = 2000
+
+INSERT_POI_SQL = """
+    INSERT IGNORE INTO poi (original_id, name, description, latitude, longitude, url, image_url, source_id, verifie, address)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 1, %s)
+"""
+
+
+def _chunks(items: list, size: int = BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _service_ids(cursor, types: set) -> dict:
+    """
+    {type: id} des services (category = type, name = libellé), créés au besoin :
+    une requête pour tous les types du lot, plus un INSERT groupé des manquants.
+    """
+    if not types:
+        return {}
+    wanted = {(t, SERVICE_CATEGORY_LABEL_MAP.get(t, t)) for t in types}
+
+    def existing():
+        placeholders = ", ".join(["%s"] * len(types))
+        # id décroissant : en cas de doublon, le plus ancien l'emporte (comme fetchone auparavant).
+        cursor.execute(f"SELECT category, name, id FROM services WHERE category IN ({placeholders}) ORDER BY id DESC",
+                       list(types))
+        return {(category, name): service_id for category, name, service_id in cursor.fetchall()
+                if (category, name) in wanted}
+
+    ids = existing()
+    missing = sorted(wanted - ids.keys())
+    if missing:
+        cursor.executemany("INSERT INTO services (category, name) VALUES (%s, %s)", missing)
+        ids = existing()
+    return {category: service_id for (category, _), service_id in ids.items()}
+
+
+def _poi_ids(cursor, source_id: int, original_ids: list) -> dict:
+    """{original_id: id} des POI de la source, relus par lots (insérés ou déjà présents)."""
+    ids = {}
+    for chunk in _chunks(original_ids):
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(
+            f"SELECT original_id, id FROM poi WHERE source_id = %s AND original_id IN ({placeholders})",
+            [source_id, *chunk]
+        )
+        ids.update(cursor.fetchall())
+    return ids
+
+
+def _none_if_nan(value):
+    return None if value is None or value != value else value
+
+
+def _load_poi_frame(df: pd.DataFrame, source_name: str, id_column: str, city_name: str) -> int:
+    """
+    Chargement ensembliste des POI d'une ville : source, ville et services
+    résolus une fois, POI en INSERT IGNORE groupés, ids relus en une requête
+    par lot, liens histo_poi et poi_service en INSERT IGNORE groupés.
+    Remplace la boucle ligne à ligne (environ six allers-retours par POI).
+    Une seule transaction : un échec annule tout le lot.
+    Retourne le nombre de POI retrouvés en base (insérés ou déjà présents).
+    """
+    def column(name):
+        values = df[name].tolist() if name in df.columns else [None] * len(df)
+        return [_none_if_nan(v) for v in values]
+
+    # original_id est un VARCHAR : clé relue en texte par _poi_ids.
+    original_ids = [None if v is None else str(v) for v in column(id_column)]
+    types = column('type')
+
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        source_id = get_or_create_source(cursor, source_name)
+        city_id = ServiceUtil.get_city_id(cursor, city_name)
+        rows = list(zip(original_ids, column('name'), column('description'), column('lat'), column('lon'),
+                        column('website'), column('image_url'), [source_id] * len(df), column('address')))
+        for chunk in _chunks(rows):
+            cursor.executemany(INSERT_POI_SQL, chunk)
+
+        poi_ids = _poi_ids(cursor, source_id, sorted({oid for oid in original_ids if oid is not None}))
+        service_ids = _service_ids(cursor, {t for t in types if t})
+
+        if city_id:
+            histo = sorted({(poi_ids[oid], city_id) for oid in original_ids if oid in poi_ids})
+            for chunk in _chunks(histo):
+                cursor.executemany("INSERT IGNORE INTO histo_poi (poi_id, city_id) VALUES (%s, %s)", chunk)
+        links = sorted({(poi_ids[oid], service_ids[t]) for oid, t in zip(original_ids, types)
+                        if oid in poi_ids and t in service_ids})
+        for chunk in _chunks(links):
+            cursor.executemany("INSERT IGNORE INTO poi_service (poi_id, service_id) VALUES (%s, %s)", chunk)
+        cnx.commit()
+        cursor.close()
+    return len(poi_ids)
+
+
 def load_osm_poi(df_osm: pd.DataFrame, city_name: str):
     """
     Insère les POI OSM dans la table poi avec mapping explicite.
@@ -52,47 +122,10 @@ def load_osm_poi(df_osm: pd.DataFrame, city_name: str):
     if df_osm is None or df_osm.empty:
         logger.warning("[load_osm_poi] : Aucun POI OSM à insérer.")
         return
-    # Remplacer les NaN par None pour éviter les erreurs MySQL
-    df_osm = df_osm.where(pd.notnull(df_osm), None)
-    cnx = MySQLUtils.connect()
-    cursor = cnx.cursor()
-    source_id = get_or_create_source(cursor, 'osm')
-    for _, row in df_osm.iterrows():
-        # Insertion dans poi sans city_id ni type
-        cursor.execute(
-            """
-            INSERT IGNORE INTO poi (original_id, name, description, latitude, longitude, url, source_id, verifie, address)
-            VALUES (%s, %s, %s, %s, %s, %s, %s,1, %s)
-            """,
-            (
-                row.get('osm_id'),
-                row.get('name'),
-                row.get('description'),
-                row.get('lat'),
-                row.get('lon'),
-                row.get('website'),
-                source_id,
-                row.get('address')
-            )
-        )
-        # Récupérer l'id du poi inséré
-        poi_id = cursor.lastrowid
-        if not poi_id:
-            # Si déjà existant, récupérer l'id
-            cursor.execute("SELECT id FROM poi WHERE original_id = %s AND source_id = %s", (row.get('osm_id'), source_id))
-            res = cursor.fetchone()
-            if res:
-                poi_id = res[0]
-        # Insérer le lien dans histo_poi
-        if poi_id:
-            insert_histo_poi(cursor, poi_id, city_name)
-            # Insérer le type dans la table service si besoin, puis lier dans poi_service
-            if row.get('type'):
-                insert_service_and_link(cursor, poi_id, row.get('type'))
-    cnx.commit()
+    _load_poi_frame(df_osm, 'osm', 'osm_id', city_name)
     logger.info(f"[load_osm_poi] : {len(df_osm)} POI OSM insérés pour {city_name}.")
-    cursor.close()
-    MySQLUtils.disconnect(cnx)
+    geo_index.refresh("poi")
+    refresh_city_stats_around(zip(df_osm['lat'], df_osm['lon']))
 
 def load_wikidata_poi(df_wiki: pd.DataFrame, city_name: str):
     """
@@ -102,42 +135,7 @@ def load_wikidata_poi(df_wiki: pd.DataFrame, city_name: str):
     if df_wiki is None or df_wiki.empty:
         logger.warning("[load_wikidata_poi] : Aucun POI Wikidata à insérer.")
         return
-    cnx = MySQLUtils.connect()
-    cursor = cnx.cursor()
-    source_id = get_or_create_source(cursor, 'wikidata')
-    df_wiki = df_wiki.where(pd.notnull(df_wiki), None)
-    for _, row in df_wiki.iterrows():
-        # Insertion dans poi sans city_id ni type
-        cursor.execute(
-            """
-            INSERT IGNORE INTO poi (original_id, name, description, latitude, longitude, image_url, source_id, verifie)
-            VALUES (%s, %s, %s, %s, %s, %s, %s,1)
-            """,
-            (
-                row.get('wikidata_id'),
-                row.get('name'),
-                row.get('description'),
-                row.get('lat'),
-                row.get('lon'),
-                row.get('image_url'),
-                source_id
-            )
-        )
-        # Récupérer l'id du poi inséré
-        poi_id = cursor.lastrowid
-        if not poi_id:
-            # Si déjà existant, récupérer l'id
-            cursor.execute("SELECT id FROM poi WHERE original_id = %s AND source_id = %s", (row.get('wikidata_id'), source_id))
-            res = cursor.fetchone()
-            if res:
-                poi_id = res[0]
-        # Insérer le lien dans histo_poi
-        if poi_id:
-            insert_histo_poi(cursor, poi_id, city_name)
-            # Insérer le type dans la table service si besoin, puis lier dans poi_service
-            if row.get('type'):
-                insert_service_and_link(cursor, poi_id, row.get('type'))
-    cnx.commit()
+    _load_poi_frame(df_wiki, 'wikidata', 'wikidata_id', city_name)
     logger.info(f"[load_wikidata_poi] : {len(df_wiki)} POI Wikidata insérés pour {city_name}.")
-    cursor.close()
-    MySQLUtils.disconnect(cnx)
+    geo_index.refresh("poi")
+    refresh_city_stats_around(zip(df_wiki['lat'], df_wiki['lon']))
@@ -0,0 +1,193 @@
+"""
+Lecture en flux des fichiers GPX.
+
+`gpxpy.parse` construit l'arbre XML complet puis un objet Python par point : un
+tracé de 20 Mo enregistré à la seconde (la limite d'upload de nginx) occupe
+plusieurs centaines de Mo dans le processus de l'API. `parse_gpx` lit le
+fichier par morceaux avec xml.etree.ElementTree.iterparse, range chaque point
+directement dans des tableaux compacts (array('d'), 8 octets par valeur) et
+libère les éléments XML au fur et à mesure : la mémoire ne dépend que du
+nombre de points, jamais de la taille de l'arbre XML.
+
+Seuls les éléments utilisés par transform_gpx sont lus : métadonnées (nom,
+description, auteur, GPX 1.0 et 1.1), nom/description de la première trace,
+points des traces (lat, lon, ele) avec leurs ruptures de segment, waypoints.
+Un fichier que iterparse refuse (déclaration XML précédée d'espaces ou de
+lignes vides, octets non UTF-8 dans un fichier déclaré UTF-8…) est relu en
+entier, nettoyé, puis parsé par gpxpy et converti au même format : ce repli
+reste coûteux en mémoire mais ne concerne que ces fichiers atypiques.
+"""
+import array
+import io
+import os
+import xml.etree.ElementTree as ET
+
+import gpxpy
+import numpy as np
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger("etl_gpx")
+
+# Éléments libérés dès leur fin de lecture (avec leurs enfants).
+_STREAMED = {"trkpt", "rtept", "wpt", "trk", "rte", "metadata", "extensions"}
+
+
+def _local(tag: str) -> str:
+    """Nom d'élément sans espace de noms ({http://www.topografix.com/GPX/1/1}trkpt → trkpt)."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(elem):
+    text = (elem.text or "").strip()
+    return text or None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _open(source):
+    """(flux, à fermer ?) pour un chemin, un file-like ou un contenu str/bytes."""
+    if isinstance(source, str):
+        return io.StringIO(source), True
+    if isinstance(source, bytes):
+        return io.BytesIO(source), True
+    if isinstance(source, os.PathLike):
+        return open(source, "rb"), True
+    return source, False
+
+
+def _empty() -> dict:
+    return {
+        "name": None, "description": None, "author": None,
+        "tracks": 0, "track_name": None, "track_description": None,
+        "lats": np.empty(0), "lons": np.empty(0), "eles": np.empty(0),
+        "segment_starts": np.empty(0, dtype=int), "waypoints": [],
+    }
+
+
+def _parse_stream(stream) -> dict:
+    parsed = _empty()
+    lats, lons, eles = array.array("d"), array.array("d"), array.array("d")
+    segment_starts = []
+    stack = []
+    point = waypoint = None
+
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        tag = _local(elem.tag)
+        if event == "start":
+            if not stack and tag != "gpx":
+                raise ValueError(f"racine <{tag}> au lieu de <gpx>")
+            stack.append(elem)
+            if tag == "trkpt":
+                point = [_float(elem.get("lat")), _float(elem.get("lon")), np.nan]
+            elif tag == "wpt":
+                waypoint = {"name": None, "lat": _float(elem.get("lat")), "lon": _float(elem.get("lon")),
+                            "ele": None, "desc": None}
+            elif tag == "trkseg" and parsed["tracks"] > 0:
+                segment_starts.append(len(lats))
+            elif tag == "trk":
+                parsed["tracks"] += 1
+            continue
+
+        stack.pop()
+        parent = _local(stack[-1].tag) if stack else None
+        grandparent = _local(stack[-2].tag) if len(stack) > 1 else None
+        if tag == "trkpt":
+            if point[0] is not None and point[1] is not None:
+                lats.append(point[0])
+                lons.append(point[1])
+                eles.append(point[2])
+            point = None
+        elif tag == "wpt":
+            parsed["waypoints"].append(waypoint)
+            waypoint = None
+        elif tag == "ele":
+            value = _float(_text(elem))
+            if parent == "trkpt" and value is not None:
+                point[2] = value
+            elif parent == "wpt":
+                waypoint["ele"] = value
+        elif tag in ("name", "desc"):
+            key = "description" if tag == "desc" else "name"
+            if parent == "wpt":
+                waypoint[tag] = _text(elem)
+            elif parent == "trk" and parsed["tracks"] == 1 and not parsed[f"track_{key}"]:
+                parsed[f"track_{key}"] = _text(elem)
+            elif parent in ("metadata", "gpx") and not parsed[key]:
+                parsed[key] = _text(elem)
+            elif parent == "author" and grandparent == "metadata":
+                parsed["author"] = _text(elem)
+        elif tag == "author" and parent == "gpx":
+            # GPX 1.0 : <author> est un simple texte sous la racine.
+            parsed["author"] = _text(elem)
+
+        if tag in _STREAMED:
+            # Le parent ne garde que des enfants déjà traités : on les libère tous
+            # (retirer le seul élément courant coûterait un parcours de la liste).
+            if stack:
+                stack[-1].clear()
+            else:
+                elem.clear()
+
+    # Le premier segment commence à 0 : seules les ruptures suivantes comptent.
+    parsed["segment_starts"] = np.array(segment_starts[1:], dtype=int)
+    parsed["lats"] = np.frombuffer(lats, dtype=float)
+    parsed["lons"] = np.frombuffer(lons, dtype=float)
+    parsed["eles"] = np.frombuffer(eles, dtype=float)
+    return parsed
+
+
+def _parse_gpxpy(stream) -> dict:
+    """Repli : parsing complet par gpxpy, converti au format de `parse_gpx`."""
+    content = stream.read()
+    if isinstance(content, bytes):
+        # Octets invalides dans un fichier « UTF-8 » (export mal encodé) : remplacés.
+        content = content.decode("utf-8-sig", errors="replace")
+    gpx = gpxpy.parse(content.lstrip())
+    parsed = _empty()
+    points = [pt for track in gpx.tracks for segment in track.segments for pt in segment.points]
+    sizes = [len(segment.points) for track in gpx.tracks for segment in track.segments]
+    parsed.update(
+        name=gpx.name,
+        description=gpx.description,
+        author=gpx.author_name,
+        tracks=len(gpx.tracks),
+        track_name=gpx.tracks[0].name if gpx.tracks else None,
+        track_description=gpx.tracks[0].description if gpx.tracks else None,
+        lats=np.array([pt.latitude for pt in points], dtype=float),
+        lons=np.array([pt.longitude for pt in points], dtype=float),
+        eles=np.array([pt.elevation for pt in points], dtype=float),
+        segment_starts=np.cumsum(sizes, dtype=int)[:-1],
+        waypoints=[
+            {"name": wpt.name, "lat": wpt.latitude, "lon": wpt.longitude, "ele": wpt.elevation, "desc": wpt.description}
+            for wpt in gpx.waypoints
+        ],
+    )
+    return parsed
+
+
+def parse_gpx(source) -> dict:
+    """
+    Lit un GPX : chemin (Path), file-like ou contenu (str/bytes). Retourne
+    {"name", "description", "author", "tracks", "track_name", "track_description",
+    "lats", "lons", "eles" (NaN si absente), "segment_starts", "waypoints"}.
+    """
+    stream, owned = _open(source)
+    try:
+        start = stream.tell() if stream.seekable() else None
+        try:
+            return _parse_stream(stream)
+        except (ET.ParseError, ValueError) as e:
+            if start is None:
+                raise
+            logger.warning(f"[Transform] : Lecture en flux du GPX impossible ({e}), repli sur gpxpy")
+            stream.seek(start)
+            return _parse_gpxpy(stream)
+    finally:
+        if owned:
+            stream.close()
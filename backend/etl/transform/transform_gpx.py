@@ -1,22 +1,10 @@
 import math
 import os
 import re
-import gpxpy
-from utils.geo_utils import get_city_from_coordinates
+from etl.transform.gpx_parser import parse_gpx
+from utils.gpx_metrics import compute_metrics
+from services.city_resolver import resolve_city
 
-def extract_points(gpx):
-	"""Extrait la liste des points (lat, lon, ele) de toutes les traces du GPX."""
-	return [
-		{'lat': pt.latitude, 'lon': pt.longitude, 'ele': pt.elevation}
-		for track in gpx.tracks for segment in track.segments for pt in segment.points
-	]
-
-def extract_waypoints(gpx):
-	"""Extrait la liste des waypoints (nom, lat, lon, ele, desc) du GPX."""
-	return [
-		{'name': wpt.name, 'lat': wpt.latitude, 'lon': wpt.longitude, 'ele': wpt.elevation, 'desc': wpt.description}
-		for wpt in gpx.waypoints
-	]
 def normalize_name(raw_name):
     # Prendre la partie après le premier tiret
     if '-' in raw_name:
@@ -37,63 +25,50 @@ def normalize_name(raw_name):
     name = re.sub(r' +', ' ', name)
     return name
 
-def transform_gpx(gpx_content, fname) -> dict:
+def transform_gpx(gpx_source, fname) -> dict:
 	"""
-	Prend le contenu brut d'un fichier GPX (texte ou file-like), parse et transforme en dict normalisé.
+	Prend un fichier GPX (chemin, file-like ou contenu texte), le lit en flux
+	(etl.transform.gpx_parser) et le transforme en dict normalisé. Les points
+	restent en tableaux numpy ('lats', 'lons', 'eles') : jamais un dict par point.
 	"""
-	if hasattr(gpx_content, 'read'):
-		gpx = gpxpy.parse(gpx_content)
-	else:
-		gpx = gpxpy.parse(str(gpx_content))
+	data = summarize_gpx(gpx_source, fname)
 
-	# Points et waypoints (via fonctions dédiées)
-	points = extract_points(gpx)
-	waypoints = extract_waypoints(gpx)
-	distance_km = 0
-	denivele_m = 0
-	start_lat = points[0]['lat'] if points else None
-	start_lon = points[0]['lon'] if points else None
-	description = None
-	# Extraire la description du GPX
-	if gpx.description:
-		description = gpx.description
-	elif gpx.tracks and gpx.tracks[0].description:
-		description = gpx.tracks[0].description
-
-	# Détection de la ville à la phase de transformation
+	# Détection de la ville à la phase de transformation : ville connue proche
+	# du départ, sinon géocodage inversé (services.city_resolver)
 	city_name = None
-	if start_lat and start_lon:
-		city_name = get_city_from_coordinates(start_lat, start_lon, language='fr')
+	if data['start_lat'] and data['start_lon']:
+		city_name = resolve_city(data['start_lat'], data['start_lon'])
 	# Si la ville n'est pas trouvée, on arrête la transformation (aucun chargement)
 	if not city_name:
 		return None
+	data['city_name'] = city_name
+	return data
 
-	if gpx.tracks:
-		# Calcul de la distance totale en 3D (prend en compte l'altitude)
-		total_distance = 0
-		for track in gpx.tracks:
-			track_distance = track.length_3d()
-			if track_distance:
-				total_distance += track_distance
-		# Conversion en kilomètres
-		distance_km = total_distance / 1000 if total_distance else 0
+def summarize_gpx(gpx_source, fname) -> dict:
+	"""
+	Lecture et calculs de transform_gpx sans le géocodage ('city_name' à None) :
+	purement local, donc exécutable dans un pool de processus (etl.bulk_import_gpx).
+	"""
+	gpx = parse_gpx(gpx_source)
 
-		# Calcul du dénivelé positif (somme des montées)
-		total_uphill = 0
-		total_downhill = 0
-		for track in gpx.tracks:
-			for segment in track.segments:
-				previous_elevation = None
-				for point in segment.points:
-					if point.elevation is not None:
-						if previous_elevation is not None:
-							elevation_diff = point.elevation - previous_elevation
-							if elevation_diff > 0:
-								total_uphill += elevation_diff  # On additionne uniquement les montées
-							else:
-								total_downhill += abs(elevation_diff)  # On additionne les descentes (optionnel)
-						previous_elevation = point.elevation
-		denivele_m = total_uphill
+	lats, lons, eles = gpx['lats'], gpx['lons'], gpx['eles']
+	waypoints = gpx['waypoints']
+	distance_km = 0
+	denivele_m = 0
+	start_lat = float(lats[0]) if len(lats) else None
+	start_lon = float(lons[0]) if len(lons) else None
+	# Extraire la description du GPX
+	description = gpx['description'] or gpx['track_description']
+
+	metrics = None
+	if gpx['tracks']:
+		# Distance 3D, D+/D− sur l'altitude lissée, temps de marche et profil
+		# altimétrique en une passe vectorisée (utils.gpx_metrics) ; les ruptures
+		# entre segments ne comptent pas, comme length_3d() de gpxpy.
+		metrics = compute_metrics(lats, lons, eles, segment_starts=gpx['segment_starts'])
+		distance_km = metrics['distance_3d_m'] / 1000
+		denivele_m = metrics['uphill_m']
+		total_downhill = metrics['downhill_m']
 		# Arrondir la distance au km supérieur, arrondir le dénivelé à l'entier
 		distance_km_rounded = math.ceil(distance_km)
 		denivele_m_rounded = round(denivele_m)
@@ -110,13 +85,13 @@ def transform_gpx(gpx_content, fname) -> dict:
 		denivele_m_rounded = 0
 		estimated_duration_h = 0
 		total_downhill = 0
-	if gpx.tracks and gpx.tracks[0].name:
-		hike_name = gpx.tracks[0].name
+	if gpx['track_name']:
+		hike_name = gpx['track_name']
 	else:
 		hike_name = os.path.splitext(fname)[0]
 	# Normalisation du nom de la randonnée
 	hike_name = normalize_name(hike_name)
-	author = gpx.author_name if hasattr(gpx, 'author_name') and gpx.author_name else 'inconnue'
+	author = gpx['author'] or 'inconnue'
 
 	# Calcul de la difficulté
 	if distance_km_rounded < 8 and denivele_m_rounded < 200:
@@ -132,11 +107,14 @@ def transform_gpx(gpx_content, fname) -> dict:
 		'denivele_m': denivele_m_rounded,
 		'estimated_duration_h': estimated_duration_h,
 		'difficulte': difficulte,
-		'points': points,
+		'lats': lats,
+		'lons': lons,
+		'eles': eles,
 		'waypoints': waypoints,
 		'author': author,
 		'start_lat': start_lat,
 		'start_lon': start_lon,
 		'description': description,
-		'city_name': city_name
+		'metrics': metrics,
+		'city_name': None
 	}
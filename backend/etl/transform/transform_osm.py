@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 from utils.logger_util import LoggerUtil
@@ -34,22 +35,51 @@ def build_address_from_tags(tags: dict) -> str | None:
     return f"{street_part}, {locality_part}" if locality_part else street_part
 
 
+OPTIONAL_COLUMNS = ('website', 'description', 'address')
+
+
 def transform_osm(osm_json : dict,city : str) -> pd.DataFrame:
     """
     Transforme les données OSM JSON extraites en un DataFrame de POI normalisés pour insertion en base.
     Seuls les POI avec nom, type et coordonnées valides sont conservés.
     Les POI de type 'information' ne sont gardés que si leur nom est 'Office du tourisme'.
     Les commerces (shop) sont inclus.
+
+    Construction par colonnes : un seul passage sur les éléments remplit une
+    liste par colonne (pas de dict par POI, coûteux à créer puis à convertir
+    en DataFrame sur des extractions régionales de centaines de milliers
+    d'éléments) ; les éléments rejetés sont écartés dès le premier test.
+    Résultat identique à l'ancienne construction ligne à ligne (voir
+    tests/etl/transform/test_transform_osm.py et tests/bench/transform_osm.py).
     """
-    pois = []
     if not osm_json or 'elements' not in osm_json:
         logger.warning(f"[transform] Données OSM invalides pour {city}")
         return pd.DataFrame()
+
+    osm_ids, names, types, lats, lons = [], [], [], [], []
+    websites, descriptions, addresses = [], [], []
+    default_names = DEFAULT_NAME_BY_TYPE
     for el in osm_json['elements']:
         if 'tags' not in el:
             continue
         tags = el['tags']
 
+        poi_type = (
+            tags.get('amenity') or
+            tags.get('tourism') or
+            tags.get('leisure') or
+            tags.get('shop') or
+            ('beach' if tags.get('natural') == 'beach' else None)
+        )
+        if not poi_type:
+            continue
+        name = tags.get('name') or tags.get('alt_name') or default_names.get(poi_type)
+        if not name:
+            continue
+        # Filtrage spécial pour 'information'
+        if poi_type == 'information' and name != 'Office du tourisme':
+            continue
+
         # Coordonnées : un node a directement lat/lon, un way/relation n'a que
         # le centre de son polygone (renvoyé par "out center"). Beaucoup de
         # supermarchés, stations-service, etc. sont mappés comme des bâtiments
@@ -59,41 +89,47 @@ def transform_osm(osm_json : dict,city : str) -> pd.DataFrame:
         else:
             center = el.get('center') or {}
             lat, lon = center.get('lat'), center.get('lon')
+        if lat is None or lon is None:
+            continue
+        # Chaînes et flottants seulement : rien que le ramasse-miettes ait à
+        # parcourir (un tuple ou un dict par POI le déclenche sans cesse).
+        osm_ids.append(el.get('id'))
+        names.append(name)
+        types.append(poi_type)
+        lats.append(lat)
+        lons.append(lon)
+        websites.append(tags.get('website') or None)
+        descriptions.append(tags.get('description') or None)
+        addresses.append(build_address_from_tags(tags) if 'addr:street' in tags else None)
 
-        name = tags.get('name') or tags.get('alt_name')
-        poi_type = (
-            tags.get('amenity') or
-            tags.get('tourism') or
-            tags.get('leisure') or
-            tags.get('shop') or
-            ('beach' if tags.get('natural') == 'beach' else None)
-        )
-        website = tags.get('website')
-        description = tags.get('description')
-        address = build_address_from_tags(tags)
+    if not osm_ids:
+        logger.info(f"[transform] 0 POI valides extraits pour {city}")
+        return pd.DataFrame()
 
-        if not name:
-            name = DEFAULT_NAME_BY_TYPE.get(poi_type)
-
-        if name and poi_type and lat is not None and lon is not None:
-            # Filtrage spécial pour 'information'
-            if poi_type == 'information' and name != 'Office du tourisme':
-                continue
-            poi = {
-                'osm_id': el.get('id'),
-                'name': name,
-                'type': poi_type,
-                'lat': lat,
-                'lon': lon,
-                'source': 'osm'
-            }
-            if website:
-                poi['website'] = website
-            if description:
-                poi['description'] = description
-            if address:
-                poi['address'] = address
-            pois.append(poi)
-    df = pd.DataFrame(pois)
+    # Colonnes converties par numpy (en C) plutôt que par l'inférence de
+    # pandas sur des listes : mêmes dtypes (int64, float64, object).
+    columns = {
+        'osm_id': np.array(osm_ids),
+        'name': np.array(names, dtype=object),
+        'type': np.array(types, dtype=object),
+        'lat': np.array(lats),
+        'lon': np.array(lons),
+        'source': 'osm',
+    }
+    # Colonnes facultatives : présentes seulement si au moins un POI les
+    # renseigne (NaN ailleurs), dans l'ordre de leur première apparition, comme
+    # l'ancien DataFrame construit à partir de dicts qui ne les contenaient pas tous.
+    first_seen = []
+    for order, (column, values) in enumerate(zip(OPTIONAL_COLUMNS, (websites, descriptions, addresses))):
+        values = np.array(values, dtype=object)
+        missing = np.equal(values, None)
+        present = np.flatnonzero(~missing)
+        if len(present):
+            values[missing] = np.nan
+            first_seen.append((present[0], order, column, values))
+    for _, _, column, values in sorted(first_seen, key=lambda seen: seen[:2]):
+        columns[column] = values
+
+    df = pd.DataFrame(columns)
     logger.info(f"[transform] {len(df)} POI valides extraits pour {city}")
     return df
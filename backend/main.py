@@ -1,5 +1,6 @@
 import sys
 import os
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
@@ -7,6 +8,11 @@ from dotenv import load_dotenv
 
 from api.routers import step1, step2, step3, step4, result, auth, etl
 from utils.logger_util import LoggerUtil
+from utils.db_utils import MySQLUtils
+from utils.geo_utils import geocoding_stats
+from services import city_resolver, geo_index, meteo_scheduler, response_cache
+from etl import city_stats
+from db_init import migrate_spatial, migrate_weather
 
 load_dotenv(Path(__file__).resolve().parents[1] / ".env")
 
@@ -35,6 +41,30 @@ app.include_router(result.router, prefix="/api/result", tags=["Result Plan"])
 app.include_router(etl.router, prefix="/api/etl", tags=["GPX Files"])
 
 
+@app.get("/api/health/db", tags=["Health"], summary="MySQL connection pool metrics.")
+def db_pool_health():
+    """Compteurs du pool MySQL (emprunts, attentes, délais dépassés, occupation)."""
+    return MySQLUtils.pool_stats()
+
+
+@app.get("/api/health/cache", tags=["Health"], summary="Response cache hit/miss counters.")
+def response_cache_health():
+    """Compteurs des caches de réponses de ce worker (hits, misses, taux, backend)."""
+    return response_cache.all_stats()
+
+
+@app.get("/api/health/geocoding", tags=["Health"], summary="Nominatim rate limiter and geocoding cache counters.")
+def geocoding_health():
+    """Compteurs Nominatim de ce worker (cache, requêtes, regroupements, attente du limiteur)."""
+    return {**geocoding_stats(), "city_resolver": city_resolver.stats()}
+
+
+@app.get("/api/health/meteo", tags=["Health"], summary="Scheduled weather refresh state.")
+def meteo_scheduler_health():
+    """État du rafraîchissement météo planifié (dernier cycle, villes périmées, prochain passage)."""
+    return meteo_scheduler.scheduler.state()
+
+
 # Logger principal pour le backend
 logger = LoggerUtil.get_logger("startup")
 logger.info("[TEST] Logger 'startup' initialisé et opérationnel.")
@@ -64,5 +94,59 @@ def init_mysql_randovango():
     else:
         logger.info(f"[INIT] Base MySQL randovango déjà initialisée (flag: {flag_path})")
 
+def init_spatial_schema():
+    # Colonnes POINT + index SPATIAL des recherches par rayon
+    # (geo_utils.spatial_radius_clause) : ajoutées aux bases créées avant elles
+    # (no-op ensuite). Avant city_stats, qui s'en sert pour ses agrégats.
+    try:
+        migrate_spatial.main()
+    except Exception as e:
+        logger.error(f"[INIT] Migration des colonnes spatiales impossible : {e}")
+
+def init_geo_index():
+    # Index géographique en mémoire (étapes 2 à 4). En cas d'échec, les routes
+    # retombent sur les requêtes spatiales MySQL : l'API démarre quand même.
+    try:
+        geo_index.load_all()
+    except Exception as e:
+        logger.error(f"[INIT] Chargement de l'index géographique impossible : {e}")
+
+def init_city_stats():
+    # Table des stats par ville (/cities) : créée si la base date d'avant son
+    # introduction, puis remplie en arrière-plan. En attendant, /cities calcule
+    # à la volée les villes absentes de la table.
+    try:
+        if city_stats.ensure_table():
+            logger.info("[INIT] Table city_stats vide : reconstruction en arrière-plan")
+            threading.Thread(target=city_stats.main, daemon=True).start()
+    except Exception as e:
+        logger.error(f"[INIT] Initialisation de city_stats impossible : {e}")
+
+def init_weather_schema():
+    # Clé unique (city_id, date) dont dépend l'upsert des prévisions : ajoutée
+    # aux bases créées avant elle (no-op ensuite).
+    try:
+        migrate_weather.main()
+    except Exception as e:
+        logger.error(f"[INIT] Migration de la table weather impossible : {e}")
+
+def init_meteo_scheduler():
+    # Rafraîchissement météo à cadence fixe (services.meteo_scheduler), hors du
+    # chemin des requêtes. METEO_SCHEDULER_ENABLED=0 pour le désactiver (tests, dev).
+    if os.getenv("METEO_SCHEDULER_ENABLED", "1") == "0":
+        logger.info("[INIT] Rafraîchissement météo planifié désactivé")
+        return
+    try:
+        meteo_scheduler.ensure_table()
+    except Exception as e:
+        logger.error(f"[INIT] Création de weather_refresh impossible : {e}")
+        return
+    meteo_scheduler.scheduler.start()
+
 init_sqlite_users()
 init_mysql_randovango()
+init_spatial_schema()
+init_geo_index()
+init_city_stats()
+init_weather_schema()
+init_meteo_scheduler()
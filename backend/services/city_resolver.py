@@ -0,0 +1,109 @@
+"""
+Ville de départ d'un tracé GPX sans appel réseau quand c'est possible.
+
+Chaque import géocodait son point de départ auprès de Nominatim, même quand
+une ville de la table cities se trouve à quelques centaines de mètres. Ici, le
+point est d'abord rapproché de la ville connue la plus proche (GeoIndex en
+mémoire sur cities) ; Nominatim n'est interrogé que si aucune ne se trouve à
+moins de CITY_SNAP_RADIUS_KM (variable d'environnement, 0 pour désactiver).
+
+Les coordonnées d'une ville sont celles du départ de son premier tracé : le
+rayon doit rester inférieur à la distance entre deux bourgs voisins.
+
+L'index est chargé au premier appel (API comme ETL en ligne de commande),
+complété par les villes créées par les loaders (`add`) et relu de façon
+incrémentale au plus toutes les REFRESH_INTERVAL_S secondes pour voir celles
+créées par un autre processus.
+"""
+import os
+import threading
+import time
+
+from services.geo_index import GeoIndex
+from utils.db_utils import MySQLUtils
+from utils.geo_utils import get_city_from_coordinates
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger("city_resolver")
+
+DEFAULT_SNAP_RADIUS_KM = 1.5
+REFRESH_INTERVAL_S = 60
+
+_index = GeoIndex()
+_names = {}
+_lock = threading.Lock()
+_refreshed_at = None
+_counters = {"snapped": 0, "geocoded": 0}
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _counters[name] += 1
+
+
+def snap_radius_km() -> float:
+    return float(os.getenv("CITY_SNAP_RADIUS_KM", str(DEFAULT_SNAP_RADIUS_KM)))
+
+
+def _fetch_cities(after_id: int) -> list:
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        cursor.execute("SELECT id, name, latitude, longitude FROM cities WHERE id > %s", (after_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+def _add_rows(rows) -> None:
+    if not rows:
+        return
+    ids, names, lats, lons = zip(*rows)
+    _names.update(zip(ids, names))
+    _index.add(ids, lats, lons)
+
+
+def _refresh() -> None:
+    global _refreshed_at
+    with _lock:
+        if _refreshed_at is not None and time.monotonic() - _refreshed_at < REFRESH_INTERVAL_S:
+            return
+        try:
+            _add_rows(_fetch_cities(_index.max_id))
+        except Exception as e:
+            # Sans index, chaque point passe par Nominatim : plus lent, pas bloquant.
+            logger.warning(f"[city_resolver] Lecture des villes impossible : {e}")
+        _refreshed_at = time.monotonic()
+
+
+def add(city_id: int, name: str, latitude: float, longitude: float) -> None:
+    """Ajoute une ville tout juste créée (ignoré tant que l'index n'est pas chargé)."""
+    with _lock:
+        if _refreshed_at is not None:
+            _add_rows([(city_id, name, latitude, longitude)])
+
+
+def nearest_city(latitude: float, longitude: float, max_km: float = None):
+    """(nom, distance_km) de la ville connue la plus proche à moins de max_km, ou None."""
+    _refresh()
+    found = _index.nearest(latitude, longitude, 1, max_km=snap_radius_km() if max_km is None else max_km)
+    if not found:
+        return None
+    city_id, distance_km = found[0]
+    return _names[city_id], distance_km
+
+
+def resolve_city(latitude: float, longitude: float):
+    """Nom de la ville du point : ville connue proche, sinon géocodage inversé Nominatim."""
+    if snap_radius_km() > 0:
+        snapped = nearest_city(latitude, longitude)
+        if snapped:
+            _count("snapped")
+            logger.info(f"[city_resolver] ({latitude}, {longitude}) -> {snapped[0]} ({snapped[1]:.2f} km)")
+            return snapped[0]
+    _count("geocoded")
+    return get_city_from_coordinates(latitude, longitude, language='fr')
+
+
+def stats() -> dict:
+    """Villes résolues localement / via Nominatim depuis le démarrage, et taille de l'index."""
+    return {**_counters, "cities": len(_index), "radius_km": snap_radius_km()}
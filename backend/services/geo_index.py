@@ -0,0 +1,320 @@
+"""
+Index géographique en mémoire pour les recherches « autour de » des étapes 2 à 4
+(départs de randonnées, spots, POI).
+
+Chaque type d'objet a son `GeoIndex` : coordonnées dans des tableaux numpy et
+grille régulière (cellules de CELL_DEG degrés) qui ne retient que les cellules
+touchées par le rayon demandé. La distance haversine est ensuite calculée de
+façon vectorisée sur ces seuls candidats : le résultat est le cercle exact, et
+non le carré d'une bounding box. L'index ne renvoie que des ids (triés par
+distance) ; les routes hydratent ensuite les lignes depuis MySQL.
+
+Cycle de vie :
+  - `load_all()` au démarrage de l'API (main.py) charge les trois index ;
+  - `get_index()` vérifie la table au plus toutes les REFRESH_INTERVAL_S
+    secondes : les ETL tournent le plus souvent dans un autre processus
+    (`docker compose exec backend python3 -m etl.*`), leurs insertions ne
+    passent donc pas par ce processus. Une empreinte (nombre de lignes et XOR
+    des CRC32 de (id, lat, lon) jusqu'au dernier id indexé) distingue un simple
+    ajout, chargé en incrémental, d'une modification ou suppression, qui
+    reconstruit l'index ;
+  - `refresh(kind)` fait la même vérification tout de suite, après chaque
+    insertion par un loader du même processus (no-op si l'index n'est pas chargé).
+Tant qu'un index n'est pas chargé, `get_index()` renvoie None et les routes
+retombent sur la requête spatiale MySQL.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils.db_utils import MySQLUtils
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger("geo_index")
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+REFRESH_INTERVAL_S = 30
+# ~5,5 km en latitude : un rayon de 5 km ne touche qu'une dizaine de cellules.
+CELL_DEG = 0.05
+
+# type d'objet -> (table, colonne latitude, colonne longitude)
+SOURCES = {
+    "hikes": ("hikes", "start_latitude", "start_longitude"),
+    "spots": ("spots", "latitude", "longitude"),
+    "poi": ("poi", "latitude", "longitude"),
+}
+
+
+def haversine_km(lat, lon, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distances haversine (km) entre un point et des tableaux de points."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoIndex:
+    """Points (id, lat, lon) indexés par grille, interrogeables par rayon ou k plus proches.
+
+    Les lectures ne prennent pas de verrou : chaque écriture construit un nouvel
+    état (ids, lats, lons, cellules) et le publie d'une seule affectation.
+    """
+
+    def __init__(self, cell_deg: float = CELL_DEG):
+        self.cell_deg = cell_deg
+        self._write_lock = threading.Lock()
+        self._state = self._build(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+
+    def __len__(self) -> int:
+        return len(self._state[0])
+
+    @property
+    def max_id(self) -> int:
+        ids = self._state[0]
+        return int(ids.max()) if len(ids) else 0
+
+    def _cell_keys(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        return np.stack(
+            [np.floor(lats / self.cell_deg), np.floor(lons / self.cell_deg)], axis=1
+        ).astype(np.int64)
+
+    def _build(self, ids, lats, lons) -> tuple:
+        cells = {}
+        if len(ids):
+            keys = self._cell_keys(lats, lons)
+            order = np.lexsort((keys[:, 1], keys[:, 0]))
+            sorted_keys = keys[order]
+            bounds = np.flatnonzero(np.any(np.diff(sorted_keys, axis=0), axis=1)) + 1
+            for positions in np.split(order, bounds):
+                lat_cell, lon_cell = keys[positions[0]]
+                cells[(int(lat_cell), int(lon_cell))] = positions
+        return ids, lats, lons, cells
+
+    def load(self, ids, lats, lons) -> None:
+        """Remplace tout le contenu de l'index."""
+        with self._write_lock:
+            self._state = self._build(
+                np.asarray(ids, dtype=np.int64), np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+            )
+
+    def add(self, ids, lats, lons) -> None:
+        """Ajoute des points (les ids déjà présents sont ignorés)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        with self._write_lock:
+            old_ids, old_lats, old_lons, _ = self._state
+            new = ~np.isin(ids, old_ids)
+            if not new.any():
+                return
+            self._state = self._build(
+                np.concatenate([old_ids, ids[new]]),
+                np.concatenate([old_lats, np.asarray(lats, dtype=float)[new]]),
+                np.concatenate([old_lons, np.asarray(lons, dtype=float)[new]]),
+            )
+
+    def _candidates(self, state, lat, lon, radius_km) -> np.ndarray:
+        _, _, _, cells = state
+        lat_delta = radius_km / KM_PER_DEG_LAT
+        lon_delta = radius_km / (KM_PER_DEG_LAT * max(np.cos(np.radians(lat)), 1e-6))
+        lat_range = range(int(np.floor((lat - lat_delta) / self.cell_deg)),
+                          int(np.floor((lat + lat_delta) / self.cell_deg)) + 1)
+        lon_range = range(int(np.floor((lon - lon_delta) / self.cell_deg)),
+                          int(np.floor((lon + lon_delta) / self.cell_deg)) + 1)
+        if len(lat_range) * len(lon_range) <= len(cells):
+            found = [cells[(i, j)] for i in lat_range for j in lon_range if (i, j) in cells]
+        else:
+            # Très grand rayon (nearest sur une zone clairsemée) : moins coûteux de
+            # parcourir les cellules occupées que toutes celles du rectangle.
+            found = [positions for (i, j), positions in cells.items() if i in lat_range and j in lon_range]
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found) if len(found) > 1 else found[0]
+
+    def within_radius(self, lat, lon, radius_km) -> list:
+        """[(id, distance_km)] des points à moins de radius_km, du plus proche au plus lointain."""
+        state = self._state
+        ids, lats, lons, _ = state
+        positions = self._candidates(state, lat, lon, radius_km)
+        if not len(positions):
+            return []
+        distances = haversine_km(lat, lon, lats[positions], lons[positions])
+        keep = distances <= radius_km
+        positions, distances = positions[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")
+        return [(int(i), float(d)) for i, d in zip(ids[positions[order]], distances[order])]
+
+    def nearest(self, lat, lon, k: int, max_km: float = None) -> list:
+        """[(id, distance_km)] des k points les plus proches (au plus max_km)."""
+        ids = self._state[0]
+        if not len(ids) or k <= 0:
+            return []
+        # Rayon élargi jusqu'à trouver k candidats : tout point hors de ce rayon
+        # est forcément plus loin que le k-ième trouvé.
+        radius = self.cell_deg * KM_PER_DEG_LAT
+        while True:
+            if max_km is not None and radius >= max_km:
+                return self.within_radius(lat, lon, max_km)[:k]
+            found = self.within_radius(lat, lon, radius)
+            if len(found) >= k or len(found) == len(ids):
+                return found[:k]
+            radius *= 2
+
+
+_indexes = {kind: GeoIndex() for kind in SOURCES}
+_loaded = set()
+_refresh_lock = threading.Lock()
+# type -> (nombre, XOR des CRC32) des lignes d'id <= max_id de l'index
+_fingerprints = {}
+_checked_at = {}
+
+
+@contextmanager
+def _cursor(cnx=None):
+    """
+    Curseur sur `cnx` si l'appelant fournit sa connexion (route qui tient déjà
+    celle de get_db), sinon sur une connexion empruntée au pool le temps du
+    bloc : jamais deux connexions tenues à la fois par le même thread.
+    """
+    if cnx is None:
+        with MySQLUtils.connection() as own, _cursor(own) as cursor:
+            yield cursor
+        return
+    cursor = cnx.cursor(buffered=True)
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+
+def _fetch_points(kind: str, after_id: int = 0, cnx=None) -> tuple:
+    table, lat_col, lon_col = SOURCES[kind]
+    with _cursor(cnx) as cursor:
+        cursor.execute(
+            f"SELECT id, {lat_col}, {lon_col} FROM {table}"
+            f" WHERE id > %s AND {lat_col} IS NOT NULL AND {lon_col} IS NOT NULL",
+            (after_id,),
+        )
+        rows = cursor.fetchall()
+    if not rows:
+        return [], [], []
+    ids, lats, lons = zip(*rows)
+    return ids, lats, lons
+
+
+def _fingerprint(kind: str, known_max_id: int, cnx=None) -> tuple:
+    """
+    (max_id de la table, nombre et XOR des CRC32 des lignes d'id <= known_max_id) :
+    une seule requête, un parcours de la table (quelques dizaines de ms).
+    """
+    table, lat_col, lon_col = SOURCES[kind]
+    row_crc = f"CRC32(CONCAT_WS(',', id, {lat_col}, {lon_col}))"
+    with _cursor(cnx) as cursor:
+        cursor.execute(
+            f"SELECT COALESCE(MAX(id), 0), COALESCE(SUM(id <= %s), 0),"
+            f" COALESCE(BIT_XOR(IF(id <= %s, {row_crc}, 0)), 0) FROM {table}"
+            f" WHERE {lat_col} IS NOT NULL AND {lon_col} IS NOT NULL",
+            (known_max_id, known_max_id),
+        )
+        max_id, count, checksum = cursor.fetchone()
+    return int(max_id), (int(count), int(checksum))
+
+
+def _reload(kind: str, cnx=None) -> int:
+    index = _indexes[kind]
+    ids, lats, lons = _fetch_points(kind, cnx=cnx)
+    index.load(ids, lats, lons)
+    _, _fingerprints[kind] = _fingerprint(kind, index.max_id, cnx)
+    return len(ids)
+
+
+def _sync(kind: str, cnx=None) -> None:
+    """Met l'index au niveau de la table : ajout incrémental, ou reconstruction si des lignes connues ont changé."""
+    index = _indexes[kind]
+    known_max_id = index.max_id
+    max_id, known = _fingerprint(kind, known_max_id, cnx)
+    if known != _fingerprints.get(kind):
+        count = _reload(kind, cnx)
+        logger.info(f"[geo_index] {kind} : lignes modifiées ou supprimées, index reconstruit ({count} point(s))")
+    elif max_id > known_max_id:
+        ids, lats, lons = _fetch_points(kind, after_id=known_max_id, cnx=cnx)
+        index.add(ids, lats, lons)
+        _, _fingerprints[kind] = _fingerprint(kind, index.max_id, cnx)
+        if ids:
+            logger.info(f"[geo_index] {kind} : {len(ids)} point(s) ajouté(s)")
+
+
+def load_all() -> None:
+    """Charge (ou recharge) tous les index depuis MySQL. Appelé au démarrage de l'API."""
+    for kind in SOURCES:
+        with _refresh_lock:
+            count = _reload(kind)
+            _checked_at[kind] = time.monotonic()
+        _loaded.add(kind)
+        logger.info(f"[geo_index] {kind} : {count} point(s) indexé(s)")
+
+
+def refresh(kind: str) -> None:
+    """
+    Rattrape tout de suite les lignes insérées par un loader de ce processus
+    (no-op si non chargé). À appeler une fois la connexion du loader rendue au pool.
+    """
+    if kind not in _loaded:
+        return
+    try:
+        with _refresh_lock:
+            _sync(kind)
+            _checked_at[kind] = time.monotonic()
+    except Exception as e:
+        # Un index en retard n'est pas bloquant pour l'ETL : la prochaine
+        # vérification (ou le redémarrage) rattrapera les lignes manquantes.
+        logger.warning(f"[geo_index] Rafraîchissement {kind} impossible : {e}")
+
+
+def _maybe_refresh(kind: str, cnx=None) -> None:
+    if time.monotonic() - _checked_at.get(kind, 0.0) < REFRESH_INTERVAL_S:
+        return
+    # Une vérification à la fois : les autres requêtes lisent l'index courant.
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        if time.monotonic() - _checked_at.get(kind, 0.0) < REFRESH_INTERVAL_S:
+            return
+        _checked_at[kind] = time.monotonic()
+        _sync(kind, cnx)
+    except Exception as e:
+        logger.warning(f"[geo_index] Vérification {kind} impossible : {e}")
+    finally:
+        _refresh_lock.release()
+
+
+def get_index(kind: str, cnx=None) -> GeoIndex | None:
+    """
+    Index chargé pour ce type d'objet, ou None (les routes retombent alors sur
+    MySQL). `cnx` : connexion déjà tenue par l'appelant, réutilisée par la
+    vérification périodique au lieu d'en emprunter une seconde au pool.
+    """
+    if kind not in _loaded:
+        return None
+    _maybe_refresh(kind, cnx)
+    return _indexes[kind]
+
+
+def radius_filter(kind: str, id_column: str, location_column: str, lat, lon, distance_km, cnx=None) -> tuple:
+    """
+    Condition SQL « à moins de distance_km » et ses paramètres, pour les routes :
+    liste d'ids issue de l'index en mémoire s'il est chargé, sinon requête
+    spatiale MySQL (geo_utils.spatial_radius_clause). Même cercle exact dans
+    les deux cas. `cnx` : connexion get_db de la route (cf. get_index).
+    """
+    index = get_index(kind, cnx)
+    if index is None:
+        from utils.geo_utils import spatial_radius_clause, spatial_radius_params
+        return spatial_radius_clause(location_column), spatial_radius_params(lat, lon, distance_km)
+    ids = [point_id for point_id, _ in index.within_radius(lat, lon, distance_km)]
+    if not ids:
+        return "1 = 0", ()
+    return f"{id_column} IN ({','.join(['%s'] * len(ids))})", tuple(ids)
@@ -0,0 +1,185 @@
+"""
+Imports GPX asynchrones : l'upload enregistre le fichier, crée un job et rend
+la main ; le traitement (lecture, géocodage, chargement, météo) se fait dans
+un petit pool de threads, étape par étape, consultable via /api/etl/jobs/{id}.
+
+Auparavant, /api/etl/upload_gpx attendait etl_pipeline.main : nouveau scan de
+tout le dossier data, géocodage Nominatim et météo Open-Meteo pendant la
+requête, puis un thread de scraping par ville sans limite. Ici :
+
+  - un job ne traite que son fichier ;
+  - GPX_JOB_WORKERS imports au plus en parallèle (les suivants attendent en file) ;
+  - le scraping des villes nouvelles (OSM, Wikidata, P4N) passe par une file à
+    un seul thread, et une ville déjà en file n'y est pas remise.
+
+Les jobs sont gardés en mémoire (les MAX_JOBS derniers) : l'API tourne dans
+un seul processus uvicorn ; un redémarrage perd l'historique, pas les données.
+"""
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from etl.etl_pipeline import scraping_background
+from etl.extract.api_meteo import extract_weather_data
+from etl.load.load_gpx import load_gpx_data
+from etl.load.load_meteo import load_weather_data
+from etl.transform.transform_gpx import summarize_gpx
+from services.authentification import insert_auth_log
+from services.city_resolver import resolve_city
+from utils.db_utils import gpx_already_in_mysql
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger("gpx_jobs")
+
+MAX_JOBS = 200
+
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_executor = None
+_scraping_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gpx-scraping")
+_scraping_pending = set()
+
+
+def job_workers() -> int:
+    return int(os.getenv("GPX_JOB_WORKERS", "2"))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _jobs_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=job_workers(), thread_name_prefix="gpx-job")
+        return _executor
+
+
+def _update(job_id: str, **values) -> None:
+    with _jobs_lock:
+        job = _jobs[job_id]
+        if "stage" in values and values["stage"] != job["stage"]:
+            job["stages"].append({"stage": values["stage"], "at": datetime.now()})
+        job.update(values)
+
+
+def get_job(job_id: str):
+    """Copie de l'état du job, ou None s'il est inconnu (ou trop ancien)."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job, "stages": list(job["stages"])}
+
+
+def submit(gpx_path: Path, verifie: int, user: dict) -> str:
+    """Crée le job d'import d'un fichier déjà enregistré sur disque ; retourne son id."""
+    job_id = uuid.uuid4().hex
+    now = datetime.now()
+    job = {
+        "id": job_id,
+        "filename": gpx_path.name,
+        "user_id": user["user_id"],
+        "status": "queued",
+        "stage": "queued",
+        "stages": [{"stage": "queued", "at": now}],
+        "created_at": now,
+        "finished_at": None,
+        "city": None,
+        "message": "En attente de traitement",
+    }
+    with _jobs_lock:
+        _jobs[job_id] = job
+        while len(_jobs) > MAX_JOBS:
+            _jobs.popitem(last=False)
+    _get_executor().submit(_run, job_id, gpx_path, verifie, user)
+    return job_id
+
+
+def _run(job_id: str, gpx_path: Path, verifie: int, user: dict) -> None:
+    try:
+        succeeded = _process(job_id, gpx_path, verifie)
+    except Exception as e:
+        logger.error(f"[job {job_id}] Échec de l'import de {gpx_path.name} : {e}")
+        _update(job_id, status="failed", message=f"Erreur ETL: {e}", finished_at=datetime.now())
+        succeeded = False
+    if not succeeded:
+        _audit(user, "upload_gpx_failed", 500, gpx_path.name)
+
+
+def _audit(user: dict, action: str, status_code: int, filename: str) -> None:
+    try:
+        insert_auth_log(user_id=user["user_id"], username=user["username"], action=action,
+                        route="/api/etl/upload_gpx", status_code=status_code, token=None, filename=filename)
+    except Exception as e:
+        logger.warning(f"Journal d'audit indisponible : {e}")
+
+
+def _discard_upload(gpx_path: Path) -> None:
+    try:
+        gpx_path.unlink()
+        logger.info(f"[upload] : Fichier supprimé : {gpx_path}")
+    except Exception as e:
+        logger.warning(f"[upload] : Erreur lors de la suppression du fichier {gpx_path} : {e}")
+
+
+def _process(job_id: str, gpx_path: Path, verifie: int) -> bool:
+    fname = gpx_path.name
+    _update(job_id, status="running", stage="parsing", message="Lecture du tracé")
+    # Même contrôle que l'extracteur du pipeline : load_gpx_data ignorerait le
+    # doublon sans le signaler (et laisserait le fichier dans le dossier data).
+    if gpx_already_in_mysql(fname):
+        _discard_upload(gpx_path)
+        _update(job_id, status="failed", finished_at=datetime.now(),
+                message=f"Le fichier {fname} a déjà été importé : aucun nouveau tracé.")
+        return False
+    data = summarize_gpx(gpx_path, fname)
+
+    _update(job_id, stage="geocoding", message="Recherche de la ville de départ")
+    city = None
+    if data["start_lat"] and data["start_lon"]:
+        city = resolve_city(data["start_lat"], data["start_lon"])
+    if not city:
+        _update(job_id, status="failed", message="Aucune ville détectée au départ du tracé",
+                finished_at=datetime.now())
+        return False
+    data["city_name"] = city
+
+    _update(job_id, stage="loading", city=city, message=f"Enregistrement de la randonnée ({city})")
+    if not load_gpx_data(data, str(gpx_path), verifie=verifie):
+        _update(job_id, status="failed", message=f"Fichier {fname} non importé", finished_at=datetime.now())
+        return False
+
+    _update(job_id, stage="weather", message=f"Prévisions météo pour {city}")
+    try:
+        weather = extract_weather_data(city, data["start_lat"], data["start_lon"])
+        if weather:
+            load_weather_data(weather, city)
+    except Exception as e:
+        # La randonnée est chargée ; le planificateur météo rattrapera la ville.
+        logger.warning(f"[job {job_id}] Météo non chargée pour {city} : {e}")
+
+    schedule_scraping(city)
+    _update(job_id, status="succeeded", stage="done", finished_at=datetime.now(),
+            message=f"Nouveau tracé sur {city} (fichier {fname}).")
+    return True
+
+
+def schedule_scraping(city: str) -> None:
+    """Met la ville en file de scraping (un seul à la fois), sauf si elle y est déjà."""
+    with _jobs_lock:
+        if city in _scraping_pending:
+            return
+        _scraping_pending.add(city)
+    _scraping_executor.submit(_scrape, city)
+
+
+def _scrape(city: str) -> None:
+    try:
+        scraping_background(city)
+    except Exception as e:
+        logger.error(f"[scraping] Échec pour {city} : {e}")
+    finally:
+        with _jobs_lock:
+            _scraping_pending.discard(city)
@@ -55,20 +55,17 @@ POI_CATEGORY_STYLES = {
 _icon_file_cache = {}
 
 
-def _fetch_hike_trace(mongo_id: str) -> list:
+def _fetch_hike_trace(mongo_id: str, pixels_across: int) -> list:
     """Récupère les points [lon, lat] du tracé GPX depuis MongoDB (même source que
-    la route /api/step2/hike/{id}/trace utilisée par la carte interactive)."""
+    la route /api/step2/hike/{id}/trace utilisée par la carte interactive), au
+    niveau de détail pré-calculé suffisant pour une image de `pixels_across` px
+    ajustée au tracé : au-delà, les points se confondraient dans le même pixel."""
     if not mongo_id:
         return []
-    from utils.mongo_utils import MongoUtils
-    from bson import ObjectId
+    from services.trace_store import fetch_trace
     try:
-        MongoUtils.connect()
-        doc = MongoUtils.get_collection("gpx_traces").find_one({"_id": ObjectId(mongo_id)})
-        MongoUtils.disconnect()
-        if not doc or not doc.get("points"):
-            return []
-        return [(p["lon"], p["lat"]) for p in doc["points"]]
+        lats, lons = fetch_trace(mongo_id, pixels_across=pixels_across)
+        return list(zip(lons, lats))
     except Exception as e:
         logger.warning(f"[map] Échec récupération tracé GPX ({mongo_id}) : {e}")
         return []
@@ -84,7 +81,7 @@ def fetch_hike_waypoints(mongo_id: str) -> list:
     from bson import ObjectId
     try:
         MongoUtils.connect()
-        doc = MongoUtils.get_collection("gpx_traces").find_one({"_id": ObjectId(mongo_id)})
+        doc = MongoUtils.get_collection("gpx_traces").find_one({"_id": ObjectId(mongo_id)}, {"_id": 0, "waypoints": 1})
         MongoUtils.disconnect()
         if not doc:
             return []
@@ -105,6 +102,21 @@ def fetch_hike_waypoints(mongo_id: str) -> list:
         return []
 
 
+def fetch_hike_profile(mongo_id: str) -> list:
+    """Profil altimétrique [(distance_km, altitude_m)] stocké avec le tracé à
+    l'import (utils.gpx_metrics), ou liste vide s'il n'y en a pas."""
+    if not mongo_id:
+        return []
+    from services.trace_store import fetch_profile
+    try:
+        stored = fetch_profile(mongo_id) or {}
+        profile = stored.get("profile") or {}
+        return list(zip(profile.get("distance_km") or [], profile.get("elevation_m") or []))
+    except Exception as e:
+        logger.warning(f"[map] Échec récupération profil GPX ({mongo_id}) : {e}")
+        return []
+
+
 def _render_pin_png(color: str, glyph: str, size: int) -> bytes:
     """Dessine un badge rond coloré avec l'icône Font Awesome centrée en blanc."""
     img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
@@ -177,7 +189,7 @@ def render_hike_map_png(mongo_id: str, width: int = 700, height: int = 420) -> b
         logger.warning("[map] Librairie staticmap non disponible, carte ignorée")
         return None
 
-    trace_points = _fetch_hike_trace(mongo_id)
+    trace_points = _fetch_hike_trace(mongo_id, max(width, height))
     if len(trace_points) < 2:
         return None
 
@@ -225,7 +237,7 @@ def render_overview_map_png(days: list, width: int = 900, height: int = 550) ->
 
     for day in days:
         if day.get("hike_id"):
-            trace_points = _fetch_hike_trace(day.get("hike_mongo_id"))
+            trace_points = _fetch_hike_trace(day.get("hike_mongo_id"), max(width, height))
             if len(trace_points) >= 2:
                 m.add_line(Line(trace_points, HIKE_STYLE[0], round(3 * scale)))
                 has_marker = True
@@ -0,0 +1,221 @@
+"""
+Rafraîchissement planifié des prévisions météo, indépendant du trafic.
+
+Auparavant, chaque appel à /api/step1/cities comptait les prévisions à J+6 et,
+s'il n'y en avait aucune, lançait un rafraîchissement de toutes les villes. Le
+planificateur prend le relais : un thread démarré avec l'API se réveille toutes
+les METEO_REFRESH_INTERVAL_S secondes, évalue la fraîcheur de chaque ville en
+une requête, et rafraîchit les villes périmées par lots (requêtes Open-Meteo
+multi-coordonnées, etl_meteo.run_meteo_etl_batch) par ordre de priorité :
+
+  1. villes d'un plan en cours ou à venir (ville de départ ou d'étape) ;
+  2. puis les prévisions qui s'arrêtent le plus tôt ;
+  3. puis les plus anciennement rafraîchies.
+
+Une ville est périmée si ses prévisions n'atteignent pas J+6 ou si son dernier
+chargement (table weather_refresh, écrite par load_meteo) date de plus de
+METEO_REFRESH_MAX_AGE_H heures.
+
+Avec plusieurs workers, un verrou MySQL nommé (GET_LOCK) garantit qu'un seul
+cycle tourne à la fois ; les autres passent leur tour.
+
+Un cycle à la demande (depuis /usr/src/app dans le conteneur backend) :
+    python -m services.meteo_scheduler
+"""
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from etl.etl_meteo import run_meteo_etl_batch
+from etl.extract.api_meteo import BATCH_SIZE
+from utils.db_utils import MySQLUtils
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger("meteo_scheduler")
+
+# Prévisions attendues de J+0 à J+6 (forecast_days=7 côté Open-Meteo).
+FORECAST_HORIZON_DAYS = 6
+# Politesse envers Open-Meteo entre deux lots d'un même cycle.
+PAUSE_BETWEEN_BATCHES_S = 2
+LOCK_NAME = "randovango_meteo_refresh"
+
+# Définition unique, reprise par db_randovango.py ; ensure_table() la crée sur
+# une base initialisée avant son introduction.
+WEATHER_REFRESH_TABLE = """
+    CREATE TABLE IF NOT EXISTS weather_refresh (
+        city_id INT NOT NULL PRIMARY KEY,
+        refreshed_at DATETIME NOT NULL,
+        FOREIGN KEY (city_id) REFERENCES cities(id) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+FRESHNESS_SQL = """
+    SELECT c.id, c.name, c.latitude, c.longitude,
+           MAX(w.date) AS last_forecast_date,
+           MAX(wr.refreshed_at) AS refreshed_at,
+           c.id IN (
+               SELECT tp.city_id FROM trip_plans tp
+               WHERE DATE_ADD(tp.start_date, INTERVAL tp.duration_days DAY) >= CURDATE()
+               UNION
+               SELECT td.city_id FROM trip_days td
+               JOIN trip_plans tp ON tp.id = td.trip_plan_id
+               WHERE td.city_id IS NOT NULL
+                 AND DATE_ADD(tp.start_date, INTERVAL tp.duration_days DAY) >= CURDATE()
+           ) AS active_plan
+    FROM cities c
+    LEFT JOIN weather w ON w.city_id = c.id
+    LEFT JOIN weather_refresh wr ON wr.city_id = c.id
+    GROUP BY c.id, c.name, c.latitude, c.longitude
+"""
+
+
+def refresh_interval_s() -> float:
+    return float(os.getenv("METEO_REFRESH_INTERVAL_S", "900"))
+
+
+def max_age() -> timedelta:
+    return timedelta(hours=float(os.getenv("METEO_REFRESH_MAX_AGE_H", "6")))
+
+
+def is_stale(city: dict, today: date, now: datetime, max_age: timedelta) -> bool:
+    last_date = city["last_forecast_date"]
+    refreshed_at = city["refreshed_at"]
+    if last_date is None or last_date < today + timedelta(days=FORECAST_HORIZON_DAYS):
+        return True
+    return refreshed_at is None or now - refreshed_at > max_age
+
+
+def stale_cities(cities: list, today: date, now: datetime, max_age: timedelta) -> list:
+    """Villes à rafraîchir, de la plus prioritaire à la moins prioritaire."""
+    stale = [c for c in cities if is_stale(c, today, now, max_age)]
+    return sorted(stale, key=lambda c: (
+        not c["active_plan"],
+        c["last_forecast_date"] or date.min,
+        c["refreshed_at"] or datetime.min,
+    ))
+
+
+def ensure_table() -> None:
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        cursor.execute(WEATHER_REFRESH_TABLE)
+        cnx.commit()
+        cursor.close()
+
+
+def fetch_freshness() -> list:
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor(dictionary=True)
+        cursor.execute(FRESHNESS_SQL)
+        cities = cursor.fetchall()
+        cursor.close()
+    return cities
+
+
+class MeteoScheduler:
+    """Thread de rafraîchissement à cadence fixe, avec état consultable."""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+        self._state_lock = threading.Lock()
+        self._state = {
+            "running": False,
+            "interval_s": None,
+            "cycles": 0,
+            "last_cycle_started_at": None,
+            "last_cycle_finished_at": None,
+            "last_cycle_refreshed": 0,
+            "last_cycle_failed": 0,
+            "last_cycle_skipped": False,
+            "cities_total": None,
+            "cities_stale": None,
+            "current_batch": None,
+            "next_cycle_at": None,
+            "last_error": None,
+        }
+
+    def _update(self, **values) -> None:
+        with self._state_lock:
+            self._state.update(values)
+
+    def state(self) -> dict:
+        with self._state_lock:
+            return dict(self._state)
+
+    def run_cycle(self) -> None:
+        """Un passage complet : fraîcheur, puis rafraîchissement des villes périmées."""
+        self._update(last_cycle_started_at=datetime.now(), last_cycle_skipped=False)
+        with MySQLUtils.connection() as lock_cnx:
+            lock_cursor = lock_cnx.cursor()
+            lock_cursor.execute("SELECT GET_LOCK(%s, 0)", (LOCK_NAME,))
+            if lock_cursor.fetchone()[0] != 1:
+                logger.info("[METEO] Cycle déjà en cours dans un autre processus, tour passé")
+                self._update(last_cycle_skipped=True, last_cycle_finished_at=datetime.now())
+                lock_cursor.close()
+                return
+            try:
+                self._refresh_stale()
+            finally:
+                lock_cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+                lock_cursor.fetchone()
+                lock_cursor.close()
+
+    def _refresh_stale(self) -> None:
+        cities = fetch_freshness()
+        todo = stale_cities(cities, date.today(), datetime.now(), max_age())
+        self._update(cities_total=len(cities), cities_stale=len(todo))
+        logger.info(f"[METEO] {len(todo)}/{len(cities)} ville(s) à rafraîchir")
+
+        # Lots dans l'ordre de priorité : une requête Open-Meteo multi-coordonnées
+        # et un chargement par lot, au lieu d'un appel par ville.
+        refreshed = failed = 0
+        for start in range(0, len(todo), BATCH_SIZE):
+            if start and self._stop.wait(PAUSE_BETWEEN_BATCHES_S):
+                break
+            batch = todo[start:start + BATCH_SIZE]
+            self._update(current_batch=[c["name"] for c in batch])
+            result = run_meteo_etl_batch(batch)
+            refreshed += len(result["refreshed"])
+            failed += len(result["failed"])
+        self._update(
+            current_batch=None,
+            cycles=self.state()["cycles"] + 1,
+            last_cycle_refreshed=refreshed,
+            last_cycle_failed=failed,
+            last_cycle_finished_at=datetime.now(),
+        )
+        logger.info(f"[METEO] Cycle terminé : {refreshed} rafraîchie(s), {failed} échec(s)")
+
+    def _loop(self) -> None:
+        interval = refresh_interval_s()
+        self._update(running=True, interval_s=interval)
+        while not self._stop.is_set():
+            try:
+                self.run_cycle()
+                self._update(last_error=None)
+            except Exception as e:
+                logger.error(f"[METEO] Cycle interrompu : {e}")
+                self._update(last_error=str(e), current_batch=None)
+            self._update(next_cycle_at=datetime.now() + timedelta(seconds=interval))
+            self._stop.wait(interval)
+        self._update(running=False, next_cycle_at=None)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="meteo-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+scheduler = MeteoScheduler()
+
+
+if __name__ == "__main__":
+    ensure_table()
+    scheduler.run_cycle()
+    print(scheduler.state())
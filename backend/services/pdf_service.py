@@ -20,6 +20,7 @@ from services.map_service import (
     render_overview_map_png,
     render_hike_map_png,
     fetch_hike_waypoints,
+    fetch_hike_profile,
     legend_entries,
 )
 
@@ -57,6 +58,8 @@ CARNET_ASSETS = Path(__file__).resolve().parents[1] / "assets" / "carnet"
 # souvent une boucle.
 OVERVIEW_MAP_PX = (1376, 524)
 HIKE_MAP_PX = (1376, 840)
+# Profil altimétrique (SVG vectoriel, unités du viewBox).
+PROFILE_SVG_SIZE = (688, 150)
 
 FR_WEEKDAYS = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
 FR_MONTHS = [
@@ -336,6 +339,16 @@ a {{ color: {TEAL}; text-decoration: none; }}
     break-inside: avoid;
 }}
 .hike-map__img {{ display: block; width: 100%; border-radius: 14px; }}
+.hike-profile {{
+    margin-bottom: 20px;
+    padding: 10px 12px 6px;
+    border: 1px solid {NEUTRAL_BORDER};
+    border-radius: 14px;
+    background: #FFFFFF;
+    break-inside: avoid;
+}}
+.hike-profile svg {{ display: block; width: 100%; height: auto; }}
+.hike-profile__scale {{ font-size: 10.5px; color: {MUTED}; display: flex; justify-content: space-between; }}
 .subhead {{
     display: block;
     font-size: 10.5px;
@@ -532,6 +545,40 @@ def _hike_map_html(day) -> str:
             f'src="{_data_uri(png_bytes)}" alt="Carte de la randonnée"></div>')
 
 
+def _elevation_profile_svg(profile, size=PROFILE_SVG_SIZE) -> str:
+    """Profil altimétrique en SVG : aire menthe sous une ligne teal, de la
+    distance 0 à la distance totale, altitude mise à l'échelle min → max."""
+    if len(profile) < 2:
+        return ""
+    width, height = size
+    distances = [d for d, _ in profile]
+    elevations = [e for _, e in profile]
+    total, low, high = distances[-1] or 1, min(elevations), max(elevations)
+    span = (high - low) or 1
+    margin = 6
+    coords = " ".join(
+        f"{d / total * width:.1f},{margin + (high - e) / span * (height - 2 * margin):.1f}"
+        for d, e in profile
+    )
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" preserveAspectRatio="none">'
+            f'<polygon points="0,{height} {coords} {width},{height}" fill="{MINT}"/>'
+            f'<polyline points="{coords}" fill="none" stroke="{TEAL}" stroke-width="2.5" stroke-linejoin="round"/>'
+            f'</svg>')
+
+
+def _hike_profile_html(day) -> str:
+    """Profil altimétrique de la rando, calculé à l'import et stocké avec le tracé."""
+    profile = fetch_hike_profile(day.get("hike_mongo_id"))
+    svg = _elevation_profile_svg(profile)
+    if not svg:
+        return ""
+    elevations = [e for _, e in profile]
+    return (f'<span class="subhead">Profil altimétrique</span>'
+            f'<div class="hike-profile">{svg}<div class="hike-profile__scale">'
+            f'<span>{_fr_int(min(elevations))} – {_fr_int(max(elevations))} m</span>'
+            f'<span>{_fr_measure(profile[-1][0])} km</span></div></div>')
+
+
 def _hike_section(day) -> str:
     if not day.get("hike_id"):
         return ('<div class="section-head"><span class="eyebrow">Randonnée du jour</span>'
@@ -575,6 +622,7 @@ def _hike_section(day) -> str:
     {address_html}
     {description_html}
     {_hike_map_html(day)}
+    {_hike_profile_html(day)}
     {steps_html}
     """
 
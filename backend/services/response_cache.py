@@ -0,0 +1,192 @@
+"""
+Cache de réponses HTTP complètes (corps JSON déjà sérialisé), invalidé par les
+écritures de données plutôt que par une durée de vie.
+
+Chaque cache porte un nom (« cities » pour /api/step1/cities). Son invalidation
+passe par un fichier marqueur `<nom>.generation` dans RESPONSE_CACHE_DIR : la
+date de modification du marqueur fait partie de la clé. Il suffit donc qu'un
+écrivain - worker API, ETL lancé en ligne de commande, autre conteneur montant
+le même volume - appelle `invalidate(nom)` pour que tous les processus
+recalculent au prochain appel, sans qu'ils aient à se connaître.
+
+Deux backends interchangeables (variable RESPONSE_CACHE_BACKEND) :
+  - `memory` (défaut) : LRU en mémoire, propre à chaque worker ;
+  - `disk` : un fichier par clé dans RESPONSE_CACHE_DIR, partagé par les workers.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger("response_cache")
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[2] / "storage" / "cache"
+DEFAULT_MAX_ENTRIES = 32
+
+# Nom du cache de /api/step1/cities, invalidé par les loaders météo et ETL.
+CITIES_CACHE = "cities"
+
+
+def cache_dir() -> Path:
+    return Path(os.getenv("RESPONSE_CACHE_DIR", str(DEFAULT_CACHE_DIR)))
+
+
+def _marker_path(name: str) -> Path:
+    return cache_dir() / f"{name}.generation"
+
+
+def invalidate(name: str) -> None:
+    """
+    Invalide le cache `name` dans tous les processus. Ne lève jamais : un cache
+    non invalidé ne doit pas faire échouer l'écriture qui l'a déclenché.
+    """
+    try:
+        marker = _marker_path(name)
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        # Le contenu change à chaque appel : la date de modification avance même
+        # si deux invalidations tombent dans la même résolution d'horloge.
+        marker.write_text(os.urandom(8).hex())
+        cache = _caches.get(name)
+        if cache is not None:
+            cache.backend.clear()
+    except OSError as e:
+        logger.warning(f"[cache] Invalidation de {name} impossible : {e}")
+
+
+class MemoryBackend:
+    """LRU en mémoire (un par worker)."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskBackend:
+    """Un fichier par clé, partagé par tous les workers qui montent le même répertoire."""
+
+    def __init__(self, directory: Path, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+
+    def get(self, key: str):
+        try:
+            return self._path(key).read_bytes()
+        except OSError:
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # Écriture atomique : un lecteur concurrent voit l'ancien fichier ou le
+        # nouveau, jamais un fichier à moitié écrit.
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(value)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in entries[:-self.max_entries]:
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+
+class ResponseCache:
+    """Cache nommé : clé applicative + génération courante, compteurs de hits/misses."""
+
+    def __init__(self, name: str, backend):
+        self.name = name
+        self.backend = backend
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def _generation(self) -> int:
+        try:
+            return _marker_path(self.name).stat().st_mtime_ns
+        except OSError:
+            return 0
+
+    def key(self, *parts) -> str:
+        """
+        Clé complète (génération courante incluse). À calculer AVANT de lire les
+        données : une invalidation survenue pendant le calcul range alors la
+        réponse sous l'ancienne génération, où plus personne ne la lira.
+        """
+        return ":".join([self.name, str(self._generation()), *map(str, parts)])
+
+    def get(self, key: str):
+        value = self.backend.get(key)
+        with self._stats_lock:
+            self._stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        try:
+            self.backend.set(key, value)
+        except OSError as e:
+            logger.warning(f"[cache] Écriture de {self.name} impossible : {e}")
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / total, 3) if total else 0.0
+        stats["backend"] = type(self.backend).__name__
+        return stats
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _make_backend(name: str):
+    kind = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+    max_entries = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    if kind == "disk":
+        return DiskBackend(cache_dir() / name, max_entries)
+    if kind != "memory":
+        logger.warning(f"[cache] Backend inconnu '{kind}', utilisation du cache mémoire")
+    return MemoryBackend(max_entries)
+
+
+def get_cache(name: str) -> ResponseCache:
+    """Cache `name` de ce processus (créé au premier appel selon RESPONSE_CACHE_BACKEND)."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = ResponseCache(name, _make_backend(name))
+        return _caches[name]
+
+
+def all_stats() -> dict:
+    """Compteurs de tous les caches créés dans ce processus."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -0,0 +1,219 @@
+"""
+Lecture et préparation des tracés GPX stockés dans MongoDB (collection gpx_traces).
+
+Point d'accès unique pour les consommateurs (carte de l'étape 2, cartes
+statiques du PDF via map_service) : ils demandent une tolérance, le module
+choisit le niveau de détail pré-calculé à l'import (`levels`, voir
+trace_utils.trace_levels) et ne lit le tracé complet que si aucun niveau ne
+suffit. Les documents importés avant les niveaux (non rattrapés par
+`python -m etl.backfill_trace_levels`) sont simplifiés à la volée.
+
+Le fichier GPX d'origine n'est plus embarqué dans le document (`gpx_content`,
+lu par aucune carte mais transféré à chaque lecture par `_id`) : il est rangé
+dans le bucket GridFS GPX_BUCKET et référencé par `gpx_file_id`. Les documents
+antérieurs sont migrés par `python -m db_init.migrate_gpx_files`.
+
+Les points eux-mêmes (`track`) et ceux des niveaux sont stockés en binaire
+compact (utils.trace_codec) et décodés par numpy ; les documents encore au
+format `points` (liste de {lat, lon, ele}) restent lisibles jusqu'à leur
+migration par `python -m db_init.migrate_trace_points`.
+"""
+import numpy as np
+from bson import ObjectId
+from gridfs import GridFSBucket
+from gridfs.errors import NoFile
+
+from utils.logger_util import LoggerUtil
+from utils.mongo_utils import MongoUtils
+from utils.trace_codec import decode_track, encode_track
+from utils.trace_utils import bbox_tolerance_m, pick_level, simplify_trace, trace_bbox, trace_levels
+
+logger = LoggerUtil.get_logger("trace_store")
+
+COLLECTION = "gpx_traces"
+GPX_BUCKET = "gpx_files"
+GPX_MEDIA_TYPE = "application/gpx+xml"
+
+
+def level_fields(lats, lons) -> dict:
+    """Niveaux de détail (points encodés) et emprise d'un tracé."""
+    levels = [
+        {"max_points": lvl["max_points"], "tolerance_m": lvl["tolerance_m"],
+         "track": encode_track(lvl["lat"], lvl["lon"])}
+        for lvl in trace_levels(lats, lons)
+    ]
+    return {"levels": levels, "bbox": trace_bbox(lats, lons)}
+
+
+def trace_fields(lats, lons, eles=None) -> dict:
+    """Points encodés, niveaux de détail et emprise, tels que stockés dans le document."""
+    return {"track": encode_track(lats, lons, eles), **level_fields(lats, lons)}
+
+
+def metrics_fields(metrics: dict) -> dict:
+    """Métriques (utils.gpx_metrics) stockées avec le tracé : résumé et profil altimétrique."""
+    if not metrics:
+        return {}
+    summary = {key: value for key, value in metrics.items() if key != "profile"}
+    return {"metrics": summary, "profile": metrics.get("profile")}
+
+
+def doc_series(doc: dict) -> tuple:
+    """(lats, lons, eles) numpy d'un document, au format `track` ou à l'ancien format `points`."""
+    if doc.get("track"):
+        return decode_track(doc["track"])
+    points = doc.get("points") or []
+    return (np.array([p["lat"] for p in points], dtype=float),
+            np.array([p["lon"] for p in points], dtype=float),
+            np.array([np.nan if p.get("ele") is None else p["ele"] for p in points], dtype=float))
+
+
+def doc_coords(doc: dict) -> tuple:
+    """(lats, lons) numpy d'un document, au format `track` ou à l'ancien format `points`."""
+    lats, lons, _ = doc_series(doc)
+    return lats, lons
+
+
+def _level_coords(level: dict) -> tuple:
+    if "track" in level:
+        lats, lons, _ = decode_track(level["track"])
+        return lats.tolist(), lons.tolist()
+    return level["lat"], level["lon"]
+
+
+def _bucket() -> GridFSBucket:
+    MongoUtils.connect()
+    return GridFSBucket(MongoUtils.get_database(), bucket_name=GPX_BUCKET)
+
+
+def store_raw_gpx(content, filename: str, trace_id: ObjectId, hike_id: int = None) -> ObjectId:
+    """
+    Range le GPX d'origine (octets, texte ou fichier ouvert en binaire, envoyé
+    par chunks) dans GridFS ; retourne l'id à stocker dans `gpx_file_id`.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    metadata = {"trace_id": trace_id, "hike_mysql_id": hike_id, "contentType": GPX_MEDIA_TYPE}
+    return _bucket().upload_from_stream(filename, content, metadata=metadata)
+
+
+def find_raw_gpx_id(trace_id: ObjectId):
+    """Fichier GridFS déjà rattaché à ce tracé (migration interrompue), ou None."""
+    MongoUtils.connect()
+    files = MongoUtils.get_database()[f"{GPX_BUCKET}.files"]
+    existing = files.find_one({"metadata.trace_id": trace_id}, {"_id": 1})
+    return existing["_id"] if existing else None
+
+
+def open_raw_gpx(mongo_id: str):
+    """
+    (filename, itérateur de blocs d'octets) du GPX d'origine, ou None. Le fichier
+    est lu bloc par bloc (chunks GridFS de 255 Ko) : jamais entièrement en mémoire.
+    """
+    doc = _find(mongo_id, {"_id": 0, "filename": 1, "gpx_file_id": 1})
+    if not doc:
+        return None
+    filename = doc.get("filename") or f"{mongo_id}.gpx"
+    if doc.get("gpx_file_id"):
+        try:
+            return filename, iter(_bucket().open_download_stream(doc["gpx_file_id"]))
+        except NoFile:
+            logger.warning(f"Fichier GPX {doc['gpx_file_id']} introuvable pour le tracé {mongo_id}")
+            return None
+    # Document pas encore migré : le GPX est encore dans le document.
+    legacy = _find(mongo_id, {"_id": 0, "gpx_content": 1}) or {}
+    if not legacy.get("gpx_content"):
+        return None
+    return filename, iter([legacy["gpx_content"].encode("utf-8")])
+
+
+def delete_traces(filename: str) -> int:
+    """Supprime les tracés d'un fichier et leurs GPX d'origine ; retourne le nombre de tracés."""
+    MongoUtils.connect()
+    collection = MongoUtils.get_collection(COLLECTION)
+    bucket = _bucket()
+    for doc in collection.find({"filename": filename, "gpx_file_id": {"$exists": True}}, {"gpx_file_id": 1}):
+        try:
+            bucket.delete(doc["gpx_file_id"])
+        except NoFile:
+            pass
+    return collection.delete_many({"filename": filename}).deleted_count
+
+
+def delete_traces_by_id(trace_ids: list) -> None:
+    """Supprime des tracés et leurs GPX d'origine par _id (annulation d'un chargement groupé)."""
+    if not trace_ids:
+        return
+    MongoUtils.connect()
+    bucket = _bucket()
+    files = MongoUtils.get_database()[f"{GPX_BUCKET}.files"]
+    for stored in files.find({"metadata.trace_id": {"$in": trace_ids}}, {"_id": 1}):
+        bucket.delete(stored["_id"])
+    MongoUtils.get_collection(COLLECTION).delete_many({"_id": {"$in": trace_ids}})
+
+
+def _find(mongo_id: str, projection: dict):
+    MongoUtils.connect()
+    try:
+        return MongoUtils.get_collection(COLLECTION).find_one({"_id": ObjectId(mongo_id)}, projection)
+    finally:
+        MongoUtils.disconnect()
+
+
+def _full_points(mongo_id: str) -> tuple:
+    # Projection : seuls lat/lon, pas les altitudes ni les niveaux.
+    doc = _find(mongo_id, {
+        "_id": 0, "track.v": 1, "track.lat": 1, "track.lon": 1, "points.lat": 1, "points.lon": 1,
+    })
+    return doc_coords(doc or {})
+
+
+def fetch_trace(mongo_id: str, tolerance_m: float = None, pixels_across: int = None) -> tuple:
+    """
+    (lats, lons) du tracé, listes vides si introuvable.
+
+    - sans paramètre : tous les points enregistrés ;
+    - `tolerance_m` : tracé à cette tolérance près (m Mercator, un pixel d'une carte) ;
+    - `pixels_across` : tolérance d'un pixel quand l'emprise du tracé occupe
+      ce nombre de pixels (cartes statiques ajustées au tracé).
+    """
+    if not mongo_id:
+        return [], []
+    if tolerance_m is None and pixels_across is None:
+        lats, lons = _full_points(mongo_id)
+        return lats.tolist(), lons.tolist()
+
+    # Métadonnées des niveaux seulement (pas leurs points) : le niveau retenu est
+    # ensuite lu seul ($slice), sans transférer les deux autres.
+    doc = _find(mongo_id, {"_id": 0, "levels.max_points": 1, "levels.tolerance_m": 1, "bbox": 1}) or {}
+    if tolerance_m is None:
+        if not doc.get("bbox"):
+            lats, lons = _full_points(mongo_id)
+            if not len(lats):
+                return [], []
+            doc["bbox"] = trace_bbox(lats, lons)
+        tolerance_m = bbox_tolerance_m(doc["bbox"], pixels_across)
+
+    levels = doc.get("levels") or []
+    level = pick_level(levels, tolerance_m)
+    if level is not None:
+        index = next(i for i, candidate in enumerate(levels) if candidate is level)
+        stored = (_find(mongo_id, {"_id": 0, "bbox": 1, "levels": {"$slice": [index, 1]}}) or {}).get("levels")
+        if stored:
+            return _level_coords(stored[0])
+    # Tolérance plus fine que le niveau le plus détaillé, ou document sans niveaux.
+    lats, lons = _full_points(mongo_id)
+    if not len(lats):
+        return [], []
+    lats, lons = simplify_trace(lats, lons, tolerance_m)
+    return lats.tolist(), lons.tolist()
+
+
+def fetch_profile(mongo_id: str):
+    """{"metrics", "profile"} stockés avec le tracé, ou None (tracé absent ou pas encore rattrapé)."""
+    if not mongo_id:
+        return None
+    doc = _find(mongo_id, {"_id": 0, "metrics": 1, "profile": 1})
+    if not doc or "metrics" not in doc:
+        return None
+    return {"metrics": doc["metrics"], "profile": doc.get("profile")}
@@ -0,0 +1,20 @@
+"""
+Passerelle entre les routes `async def` et le code bloquant (mysql.connector,
+sqlite3, bcrypt, requests vers Open-Meteo/Nominatim...).
+
+Une route `async def` s'exécute directement sur la boucle d'événements : le
+moindre appel bloquant y fige TOUTES les requêtes en cours. Les routes `def`
+sont, elles, exécutées par FastAPI dans son pool de threads. Les routes qui ont
+besoin d'être asynchrones (lecture d'un upload, par exemple) délèguent donc leur
+partie bloquante à `run_blocking`, qui utilise ce même pool de threads.
+"""
+from functools import partial
+
+from starlette.concurrency import run_in_threadpool
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Exécute `func(*args, **kwargs)` dans le pool de threads et attend son résultat."""
+    if kwargs:
+        func = partial(func, **kwargs)
+    return await run_in_threadpool(func, *args)
@@ -1,24 +1,120 @@
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
 import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
 from dotenv import load_dotenv
-from pathlib import Path
 from utils.service_utils import ServiceUtil
 
 ROOT = Path(__file__).resolve().parents[2]
 load_dotenv(ROOT/".env")
 
+# Taille et délai d'attente du pool, surchargeables par .env. Le pool borne le
+# nombre de connexions ouvertes par processus : les rafales de l'ETL (threads de
+# scraping, rafraîchissement météo) attendent une connexion libre au lieu d'en
+# ouvrir de nouvelles jusqu'à atteindre max_connections côté MySQL.
+DEFAULT_POOL_SIZE = 10
+DEFAULT_POOL_TIMEOUT_S = 10.0
+# Intervalle entre deux tentatives quand le pool est vide : mysql.connector lève
+# PoolError immédiatement au lieu d'attendre qu'une connexion soit rendue.
+POOL_RETRY_INTERVAL_S = 0.02
+
 
 class MySQLUtils:
-    """Utilitaire statique pour MySQL."""
+    """Utilitaire statique pour MySQL.
+
+    Les connexions viennent d'un pool unique par processus, créé à la première
+    demande. `connect()` / `disconnect()` gardent leur contrat historique
+    (`disconnect` rend la connexion au pool au lieu de la fermer) ; le nouveau
+    code préfère `connection()` (context manager) ou la dépendance FastAPI
+    `get_db`, qui garantissent la restitution même si une requête lève.
+    """
+    _pool: pooling.MySQLConnectionPool = None
+    _pool_lock = threading.Lock()
+    _pool_timeout_s: float = DEFAULT_POOL_TIMEOUT_S
+    _stats_lock = threading.Lock()
+    _stats = {"checkouts": 0, "waits": 0, "timeouts": 0, "wait_time_s": 0.0}
+
+    @staticmethod
+    def _get_pool() -> pooling.MySQLConnectionPool:
+        # .env n'est relu qu'une fois, à la création du pool, et non plus à
+        # chaque connexion.
+        if MySQLUtils._pool is not None:
+            return MySQLUtils._pool
+        with MySQLUtils._pool_lock:
+            if MySQLUtils._pool is None:
+                ServiceUtil.load_env()
+                size = int(ServiceUtil.get_env("DB_POOL_SIZE", str(DEFAULT_POOL_SIZE)))
+                size = max(1, min(size, pooling.CNX_POOL_MAXSIZE))
+                MySQLUtils._pool_timeout_s = float(
+                    ServiceUtil.get_env("DB_POOL_TIMEOUT", str(DEFAULT_POOL_TIMEOUT_S))
+                )
+                MySQLUtils._pool = pooling.MySQLConnectionPool(
+                    pool_name="randovango",
+                    pool_size=size,
+                    pool_reset_session=True,
+                    host=ServiceUtil.get_env('DB_HOST'),
+                    user=ServiceUtil.get_env('DB_USER'),
+                    password=ServiceUtil.get_env('DB_PSWD'),
+                    database=ServiceUtil.get_env('DB_NAME'),
+                    charset='utf8mb4'
+                )
+        return MySQLUtils._pool
+
     @staticmethod
     def connect():
-        ServiceUtil.load_env()
-        return mysql.connector.connect(
-            host=ServiceUtil.get_env('DB_HOST'),
-            user=ServiceUtil.get_env('DB_USER'),
-            password=ServiceUtil.get_env('DB_PSWD'),
-            database=ServiceUtil.get_env('DB_NAME'),
-            charset='utf8mb4'
-        )
+        """
+        Emprunte une connexion au pool, en attendant au plus DB_POOL_TIMEOUT
+        secondes qu'une connexion se libère (PoolError au-delà).
+        Contrôle de santé : get_connection() teste la connexion (ping) et la
+        rouvre si MySQL l'a coupée (wait_timeout, redémarrage du serveur).
+        """
+        pool = MySQLUtils._get_pool()
+        deadline = time.monotonic() + MySQLUtils._pool_timeout_s
+        started = None
+        while True:
+            try:
+                cnx = pool.get_connection()
+                break
+            except PoolError:
+                now = time.monotonic()
+                if started is None:
+                    started = now
+                if now >= deadline:
+                    with MySQLUtils._stats_lock:
+                        MySQLUtils._stats["waits"] += 1
+                        MySQLUtils._stats["timeouts"] += 1
+                        MySQLUtils._stats["wait_time_s"] += now - started
+                    raise
+                time.sleep(POOL_RETRY_INTERVAL_S)
+        with MySQLUtils._stats_lock:
+            MySQLUtils._stats["checkouts"] += 1
+            if started is not None:
+                MySQLUtils._stats["waits"] += 1
+                MySQLUtils._stats["wait_time_s"] += time.monotonic() - started
+        return cnx
+
+    @staticmethod
+    @contextmanager
+    def connection():
+        """
+        Connexion empruntée au pool pour la durée du bloc `with` : rollback si le
+        bloc lève, puis restitution au pool dans tous les cas.
+        """
+        cnx = MySQLUtils.connect()
+        try:
+            yield cnx
+        except Exception:
+            try:
+                cnx.rollback()
+            except mysql.connector.Error:
+                pass
+            raise
+        finally:
+            MySQLUtils.disconnect(cnx)
 
     @staticmethod
     def get_cursor(conn):
@@ -26,31 +122,52 @@ class MySQLUtils:
 
     @staticmethod
     def disconnect(conn):
+        # Sur une connexion du pool, close() la rend au pool sans la fermer.
         if conn:
             conn.close()
 
+    @staticmethod
+    def pool_stats() -> dict:
+        """Compteurs du pool : emprunts, attentes, délais dépassés, occupation."""
+        with MySQLUtils._stats_lock:
+            stats = dict(MySQLUtils._stats)
+        pool = MySQLUtils._pool
+        stats["size"] = pool.pool_size if pool else 0
+        stats["available"] = pool._cnx_queue.qsize() if pool else 0
+        stats["in_use"] = stats["size"] - stats["available"]
+        stats["wait_time_s"] = round(stats["wait_time_s"], 3)
+        return stats
+
+
+def get_db():
+    """
+    Dépendance FastAPI : une connexion du pool par requête, rendue au pool à la
+    fin de la requête (même en cas d'exception).
+    Usage : `def route(cnx = Depends(get_db)): ...`
+    """
+    with MySQLUtils.connection() as cnx:
+        yield cnx
+
 def p4n_id_exists(p4n_id: str) -> bool:
     """
     Vérifie si un p4n_id existe déjà dans la table spots (MySQL).
     """
-    conn = MySQLUtils.connect()
-    cursor = MySQLUtils.get_cursor(conn)
-    cursor.execute("SELECT 1 FROM spots WHERE p4n_id = %s LIMIT 1", (p4n_id,))
-    exists = cursor.fetchone() is not None
-    cursor.close()
-    MySQLUtils.disconnect(conn)
+    with MySQLUtils.connection() as conn:
+        cursor = MySQLUtils.get_cursor(conn)
+        cursor.execute("SELECT 1 FROM spots WHERE p4n_id = %s LIMIT 1", (p4n_id,))
+        exists = cursor.fetchone() is not None
+        cursor.close()
     return exists
 
 def get_all_city_ids():
     """
     Retourne la liste de tuples (id, name) pour toutes les villes.
     """
-    conn = MySQLUtils.connect()
-    cursor = MySQLUtils.get_cursor(conn)
-    cursor.execute("SELECT id, name FROM cities")
-    rows = cursor.fetchall()
-    cursor.close()
-    MySQLUtils.disconnect(conn)
+    with MySQLUtils.connection() as conn:
+        cursor = MySQLUtils.get_cursor(conn)
+        cursor.execute("SELECT id, name FROM cities")
+        rows = cursor.fetchall()
+        cursor.close()
     return [(row[0], row[1]) for row in rows]
 
 def get_histo_poi_city_ids(source: str):
@@ -60,43 +177,40 @@ def get_histo_poi_city_ids(source: str):
     seule) : une ville où seule Wikidata a réussi doit pouvoir être retentée
     pour OSM, et inversement.
     """
-    conn = MySQLUtils.connect()
-    cursor = MySQLUtils.get_cursor(conn)
-    cursor.execute(
-        """
-        SELECT DISTINCT hp.city_id
-        FROM histo_poi hp
-        JOIN poi p ON hp.poi_id = p.id
-        JOIN sources s ON p.source_id = s.id
-        WHERE s.name = %s
-        """,
-        (source,)
-    )
-    ids = [row[0] for row in cursor.fetchall()]
-    cursor.close()
-    MySQLUtils.disconnect(conn)
+    with MySQLUtils.connection() as conn:
+        cursor = MySQLUtils.get_cursor(conn)
+        cursor.execute(
+            """
+            SELECT DISTINCT hp.city_id
+            FROM histo_poi hp
+            JOIN poi p ON hp.poi_id = p.id
+            JOIN sources s ON p.source_id = s.id
+            WHERE s.name = %s
+            """,
+            (source,)
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
     return ids
 
 def get_histo_scrap_city_ids():
     """
     Retourne la liste des city_id présents dans histo_scrap.
     """
-    conn = MySQLUtils.connect()
-    cursor = MySQLUtils.get_cursor(conn)
-    cursor.execute("SELECT DISTINCT city_id FROM histo_scrap")
-    ids = [row[0] for row in cursor.fetchall()]
-    cursor.close()
-    MySQLUtils.disconnect(conn)
+    with MySQLUtils.connection() as conn:
+        cursor = MySQLUtils.get_cursor(conn)
+        cursor.execute("SELECT DISTINCT city_id FROM histo_scrap")
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
     return ids
 
 def gpx_already_in_mysql(fname: str) -> bool:
     """
     Vérifie si un fichier GPX (par son nom) existe déjà dans la table hikes (MySQL).
     """
-    conn = MySQLUtils.connect()
-    cursor = MySQLUtils.get_cursor(conn)
-    cursor.execute("SELECT 1 FROM hikes WHERE filename = %s LIMIT 1", (fname,))
-    exists = cursor.fetchone() is not None
-    cursor.close()
-    MySQLUtils.disconnect(conn)
+    with MySQLUtils.connection() as conn:
+        cursor = MySQLUtils.get_cursor(conn)
+        cursor.execute("SELECT 1 FROM hikes WHERE filename = %s LIMIT 1", (fname,))
+        exists = cursor.fetchone() is not None
+        cursor.close()
     return exists
@@ -1,10 +1,107 @@
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 import logging
+import os
+import threading
 from math import radians, cos, sin, asin, sqrt
 
+from utils import geocode_cache
+from utils.rate_limiter import InFlight, TokenBucket
+
 logger = logging.getLogger(__name__)
 
+NOMINATIM_USER_AGENT = "randovango-geocoder-v1"
+# Politique d'usage de Nominatim : une requête par seconde au maximum.
+NOMINATIM_RATE_PER_S = float(os.getenv("NOMINATIM_RATE_PER_S", "1"))
+
+_geolocator = None
+_geolocator_lock = threading.Lock()
+# Tous les appels Nominatim du processus (API, jobs d'import, scraping, météo)
+# passent par ce seau : les reprises après erreur aussi, à la place des
+# anciennes pauses fixes de 2 s propres à chaque fonction.
+_nominatim_bucket = TokenBucket(NOMINATIM_RATE_PER_S)
+_in_flight = InFlight()
+_counters = {"cache_hits": 0, "requests": 0, "errors": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def geocoding_stats() -> dict:
+    """Compteurs Nominatim du processus : cache, requêtes, regroupements, attente du limiteur."""
+    with _counters_lock:
+        stats = dict(_counters)
+    stats["coalesced"] = _in_flight.coalesced
+    stats["limiter"] = _nominatim_bucket.stats()
+    return stats
+
+
+def _get_geolocator() -> Nominatim:
+    # Un seul client pour le processus (et non plus un par tentative).
+    global _geolocator
+    with _geolocator_lock:
+        if _geolocator is None:
+            _geolocator = Nominatim(user_agent=NOMINATIM_USER_AGENT)
+        return _geolocator
+
+
+def _lookup(kind: str, key: str, request, max_retries: int, what: str):
+    """
+    Réponse en cache, sinon `request()` auprès de Nominatim au rythme du seau
+    partagé. Deux appelants simultanés sur la même clé partagent la requête.
+    Les réponses (même vides) sont mises en cache ; None après max_retries
+    erreurs, sans mise en cache.
+    """
+    cached = geocode_cache.get(kind, key)
+    if cached is not geocode_cache.MISS:
+        _count("cache_hits")
+        return cached
+
+    def fetch():
+        for attempt in range(max_retries):
+            _nominatim_bucket.acquire()
+            _count("requests")
+            try:
+                value = request()
+            except (GeocoderTimedOut, GeocoderServiceError) as e:
+                _count("errors")
+                logger.error(f"Erreur {what} (tentative {attempt+1}/{max_retries}): {e}")
+                continue
+            geocode_cache.put(kind, key, value)
+            return value
+        return None
+
+    return _in_flight.run((kind, key), fetch)
+
+
+def _reverse_address(latitude, longitude, language, timeout, max_retries, what):
+    """
+    Adresse Nominatim brute (dict) du point, ou None. Passe par le cache
+    persistant (utils.geocode_cache) : coordonnées arrondies à ~10 m, une
+    réponse sert aux trois lectures (ville, infos admin, adresse).
+    """
+    lat, lon = geocode_cache.round_coordinates(latitude, longitude)
+
+    def request():
+        location = _get_geolocator().reverse(f"{lat}, {lon}", language=language, timeout=timeout)
+        return (location.raw.get('address') if location else None) or None
+
+    key = geocode_cache.reverse_key(latitude, longitude, language)
+    return _lookup(geocode_cache.REVERSE, key, request, max_retries, f"{what} pour ({latitude}, {longitude})")
+
+
+def _city_from_address(address: dict):
+    # Différents niveaux de localité (du plus spécifique au plus général)
+    return (address.get('city') or
+            address.get('town') or
+            address.get('village') or
+            address.get('municipality') or
+            address.get('hamlet'))
+
+
 def haversine_distance_km(lat1, lon1, lat2, lon2):
     """
     Calcule la distance en km entre deux points (latitude, longitude) via la formule de Haversine.
@@ -21,24 +118,14 @@ def get_admin_info_from_coordinates(latitude, longitude, language='fr', timeout=
     Retourne (department, region, country) à partir de coordonnées GPS via Nominatim.
     Timeout et retry custom.
     """
-    from time import sleep
-    for attempt in range(max_retries):
-        try:
-            geolocator = Nominatim(user_agent="randovango-geocoder-v1", timeout=timeout)
-            location = geolocator.reverse(f"{latitude}, {longitude}", language=language)
-            if location and location.raw.get('address'):
-                address = location.raw['address']
-                department = address.get('state_district') or address.get('county')
-                region = address.get('state')
-                country = address.get('country')
-                return department, region, country
-            else:
-                logger.warning(f"Aucun résultat admin pour les coordonnées ({latitude}, {longitude})")
-                return None, None, None
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
-            logger.error(f"Erreur admin geocoding pour ({latitude}, {longitude}) (tentative {attempt+1}/{max_retries}): {e}")
-            sleep(2)
-    return None, None, None
+    address = _reverse_address(latitude, longitude, language, timeout, max_retries, "admin geocoding")
+    if not address:
+        logger.warning(f"Aucun résultat admin pour les coordonnées ({latitude}, {longitude})")
+        return None, None, None
+    department = address.get('state_district') or address.get('county')
+    region = address.get('state')
+    country = address.get('country')
+    return department, region, country
 
 def get_bounding_box(latitude, longitude, distance_km):
     """
@@ -56,31 +143,55 @@ def get_bounding_box(latitude, longitude, distance_km):
     max_lon = longitude + delta_lon
     return min_lat, min_lon, max_lat, max_lon
 
+def bounding_box_wkt(latitude, longitude, distance_km) -> str:
+    """
+    Polygone WKT (ordre longitude-latitude) de la bounding box de get_bounding_box,
+    pour les filtres MBRContains sur les colonnes POINT SRID 4326 indexées.
+    """
+    min_lat, min_lon, max_lat, max_lon = get_bounding_box(latitude, longitude, distance_km)
+    return (
+        f"POLYGON(({min_lon} {min_lat}, {max_lon} {min_lat}, {max_lon} {max_lat}, "
+        f"{min_lon} {max_lat}, {min_lon} {min_lat}))"
+    )
+
+def spatial_radius_clause(column: str) -> str:
+    """
+    Condition SQL « à moins de R mètres » sur une colonne POINT SRID 4326 :
+    MBRContains restreint les lignes via l'index SPATIAL, ST_Distance_Sphere
+    garde ensuite le cercle exact (et non plus le carré de la bounding box).
+    Paramètres attendus, dans l'ordre : spatial_radius_params(...).
+    """
+    return (
+        f"MBRContains(ST_GeomFromText(%s, 4326, 'axis-order=long-lat'), {column})"
+        f" AND ST_Distance_Sphere({column}, ST_SRID(POINT(%s, %s), 4326)) <= %s"
+    )
+
+def spatial_radius_params(latitude, longitude, distance_km) -> tuple:
+    """Paramètres de spatial_radius_clause pour un rayon autour de (latitude, longitude)."""
+    return (bounding_box_wkt(latitude, longitude, distance_km), longitude, latitude, distance_km * 1000)
+
 def get_coordinates_for_city(city_name, department=None, country="France", timeout=10, max_retries=3):
     """
     Géocodage direct: obtient la latitude et la longitude d'une ville.
     Permet de préciser le département pour éviter les ambiguïtés.
-    Timeout et retry custom.
+    Timeout et retry custom ; réponses gardées dans le cache persistant.
     """
-    from time import sleep
     query = city_name
     if department:
         query += f", {department}"
     query += f", {country}"
-    for attempt in range(max_retries):
-        try:
-            geolocator = Nominatim(user_agent="randovango-geocoder-v1", timeout=timeout)
-            location = geolocator.geocode(query)
-            if location:
-                logger.info(f"Coordonnées trouvées pour {query}: {location.latitude}, {location.longitude}")
-                return location.latitude, location.longitude
-            else:
-                logger.warning(f"Aucune coordonnée trouvée pour {query}")
-                return None, None
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
-            logger.error(f"Erreur de géocodage pour {query} (tentative {attempt+1}/{max_retries}): {e}")
-            sleep(2)
-    return None, None
+
+    def request():
+        location = _get_geolocator().geocode(query, timeout=timeout)
+        return [location.latitude, location.longitude] if location else None
+
+    coordinates = _lookup(geocode_cache.FORWARD, geocode_cache.forward_key(query), request,
+                          max_retries, f"de géocodage pour {query}")
+    if not coordinates:
+        logger.warning(f"Aucune coordonnée trouvée pour {query}")
+        return None, None
+    logger.info(f"Coordonnées trouvées pour {query}: {coordinates[0]}, {coordinates[1]}")
+    return coordinates[0], coordinates[1]
 
 
 def get_address_from_coordinates(latitude, longitude, language='fr', timeout=10, max_retries=3):
@@ -89,37 +200,22 @@ def get_address_from_coordinates(latitude, longitude, language='fr', timeout=10,
     Plouguerneau") à partir de coordonnées GPS via Nominatim.
     Timeout et retry custom.
     """
-    from time import sleep
-    for attempt in range(max_retries):
-        try:
-            geolocator = Nominatim(user_agent="randovango-geocoder-v1", timeout=timeout)
-            location = geolocator.reverse(f"{latitude}, {longitude}", language=language)
-
-            if location and location.raw.get('address'):
-                address = location.raw['address']
-                road = address.get('road') or address.get('pedestrian')
-                house_number = address.get('house_number')
-                postcode = address.get('postcode')
-                city = (address.get('city') or
-                        address.get('town') or
-                        address.get('village') or
-                        address.get('municipality') or
-                        address.get('hamlet'))
-
-                if not road:
-                    logger.warning(f"Pas de rue dans l'adresse pour ({latitude}, {longitude})")
-                    return None
-
-                street_part = f"{house_number} {road}" if house_number else road
-                locality_part = f"{postcode} {city}" if postcode and city else (postcode or city or '')
-                return f"{street_part}, {locality_part}" if locality_part else street_part
-            else:
-                logger.warning(f"Aucun résultat d'adresse pour les coordonnées ({latitude}, {longitude})")
-                return None
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
-            logger.error(f"Erreur de géocodage d'adresse pour ({latitude}, {longitude}) (tentative {attempt+1}/{max_retries}): {e}")
-            sleep(2)
-    return None
+    address = _reverse_address(latitude, longitude, language, timeout, max_retries, "de géocodage d'adresse")
+    if not address:
+        logger.warning(f"Aucun résultat d'adresse pour les coordonnées ({latitude}, {longitude})")
+        return None
+    road = address.get('road') or address.get('pedestrian')
+    house_number = address.get('house_number')
+    postcode = address.get('postcode')
+    city = _city_from_address(address)
+
+    if not road:
+        logger.warning(f"Pas de rue dans l'adresse pour ({latitude}, {longitude})")
+        return None
+
+    street_part = f"{house_number} {road}" if house_number else road
+    locality_part = f"{postcode} {city}" if postcode and city else (postcode or city or '')
+    return f"{street_part}, {locality_part}" if locality_part else street_part
 
 
 def get_city_from_coordinates(latitude, longitude, language='fr', timeout=10, max_retries=3):
@@ -127,33 +223,15 @@ def get_city_from_coordinates(latitude, longitude, language='fr', timeout=10, ma
     Géocodage inversé: obtient le nom de la ville à partir de coordonnées GPS.
     Timeout et retry custom.
     """
-    from time import sleep
-    for attempt in range(max_retries):
-        try:
-            geolocator = Nominatim(user_agent="randovango-geocoder-v1", timeout=timeout)
-            location = geolocator.reverse(f"{latitude}, {longitude}", language=language)
-            
-            if location and location.raw.get('address'):
-                address = location.raw['address']
-                # Essayer différents niveaux de localité (du plus spécifique au plus général)
-                city = (address.get('city') or 
-                       address.get('town') or 
-                       address.get('village') or 
-                       address.get('municipality') or
-                       address.get('hamlet'))
-                
-                if city:
-                    logger.info(f"Ville trouvée pour ({latitude}, {longitude}): {city}")
-                    return city
-                else:
-                    logger.warning(f"Aucune ville trouvée dans l'adresse pour ({latitude}, {longitude})")
-                    return None
-            else:
-                logger.warning(f"Aucun résultat pour les coordonnées ({latitude}, {longitude})")
-                return None
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
-            logger.error(f"Erreur de géocodage inversé pour ({latitude}, {longitude}) (tentative {attempt+1}/{max_retries}): {e}")
-            sleep(2)
+    address = _reverse_address(latitude, longitude, language, timeout, max_retries, "de géocodage inversé")
+    if not address:
+        logger.warning(f"Aucun résultat pour les coordonnées ({latitude}, {longitude})")
+        return None
+    city = _city_from_address(address)
+    if city:
+        logger.info(f"Ville trouvée pour ({latitude}, {longitude}): {city}")
+        return city
+    logger.warning(f"Aucune ville trouvée dans l'adresse pour ({latitude}, {longitude})")
     return None
 
 if __name__ == "__main__":
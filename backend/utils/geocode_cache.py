@@ -0,0 +1,175 @@
+"""
+Cache persistant des géocodages Nominatim, partagé par l'API, les ETL lancés
+en ligne de commande et les threads de scraping (un fichier SQLite dans le
+volume storage, GEOCODE_CACHE_PATH pour le déplacer).
+
+Sans lui, chaque extraction OSM, chaque scraping P4N et chaque chargement
+météo re-géocodait le nom d'une ville déjà connue, et chaque import GPX
+refaisait deux géocodages inversés (ville, puis département/région) du même
+point. Ici :
+
+  - direct (« forward ») : clé = requête normalisée (« crozon, france ») ;
+  - inversé (« reverse ») : clé = coordonnées arrondies à REVERSE_DECIMALS
+    (~10 m) + langue ; on garde l'adresse Nominatim brute, d'où ville, infos
+    administratives et adresse lisible sont tirées sans nouvel appel.
+
+Les réponses vides sont aussi gardées (cache négatif), moins longtemps
+(MISSING_TTL_S) : un lieu peut être ajouté à OSM. Les erreurs réseau ne sont
+jamais mises en cache. Un cache illisible ou verrouillé ne fait pas échouer
+le géocodage : il est simplement ignoré.
+
+Usage (depuis /usr/src/app dans le conteneur backend) :
+    python -m utils.geocode_cache --seed     # villes de la table cities
+    python -m utils.geocode_cache --purge    # entrées expirées
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from utils.logger_util import LoggerUtil
+
+logger = LoggerUtil.get_logger("geocode_cache")
+
+DEFAULT_PATH = Path(__file__).resolve().parents[2] / "storage" / "geocode_cache.sqlite"
+FOUND_TTL_S = 90 * 24 * 3600
+MISSING_TTL_S = 24 * 3600
+REVERSE_DECIMALS = 4
+
+FORWARD = "forward"
+REVERSE = "reverse"
+
+# Valeur de retour de get() pour une clé absente ou expirée (None = réponse vide en cache).
+MISS = object()
+
+
+def cache_path() -> Path:
+    return Path(os.getenv("GEOCODE_CACHE_PATH", str(DEFAULT_PATH)))
+
+
+@contextmanager
+def _connection():
+    """Connexion courte (une par opération) : sûre entre threads et processus."""
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _connect() -> sqlite3.Connection:
+    path = cache_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=5)
+    # WAL : les lectures d'un processus ne bloquent pas l'écriture d'un autre.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (kind, key)
+        )
+    """)
+    return conn
+
+
+def forward_key(query: str) -> str:
+    """« Crozon ,  France » → « crozon, france »."""
+    return ", ".join(" ".join(part.lower().split()) for part in query.split(","))
+
+
+def round_coordinates(latitude: float, longitude: float) -> tuple:
+    return round(float(latitude), REVERSE_DECIMALS), round(float(longitude), REVERSE_DECIMALS)
+
+
+def reverse_key(latitude: float, longitude: float, language: str) -> str:
+    lat, lon = round_coordinates(latitude, longitude)
+    return f"{lat:.{REVERSE_DECIMALS}f},{lon:.{REVERSE_DECIMALS}f},{language}"
+
+
+def get(kind: str, key: str):
+    """Valeur en cache (None pour une réponse vide), ou MISS."""
+    try:
+        with _connection() as conn:
+            row = conn.execute(
+                "SELECT value FROM geocode_cache WHERE kind = ? AND key = ? AND expires_at > ?",
+                (kind, key, time.time()),
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"[geocode] Lecture du cache impossible : {e}")
+        return MISS
+    if row is None:
+        return MISS
+    return json.loads(row[0]) if row[0] is not None else None
+
+
+def put(kind: str, key: str, value, ttl_s: float = None) -> None:
+    """Mémorise une réponse ; `value` None (aucun résultat) expire après MISSING_TTL_S."""
+    if ttl_s is None:
+        ttl_s = FOUND_TTL_S if value is not None else MISSING_TTL_S
+    payload = json.dumps(value) if value is not None else None
+    try:
+        with _connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (kind, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (kind, key, payload, time.time() + ttl_s),
+            )
+    except sqlite3.Error as e:
+        logger.warning(f"[geocode] Écriture du cache impossible : {e}")
+
+
+def purge_expired() -> int:
+    with _connection() as conn:
+        return conn.execute("DELETE FROM geocode_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+def seed_from_cities(country: str = "France") -> int:
+    """
+    Pré-remplit le géocodage direct des villes de la table cities avec leurs
+    coordonnées : les ETL relancés sur des villes connues n'appellent plus
+    Nominatim. Les entrées déjà en cache sont conservées.
+    """
+    from utils.db_utils import MySQLUtils
+    from utils.service_utils import ServiceUtil
+
+    ServiceUtil.load_env()
+    with MySQLUtils.connection() as cnx:
+        cursor = cnx.cursor()
+        cursor.execute("SELECT name, latitude, longitude FROM cities"
+                       " WHERE latitude IS NOT NULL AND longitude IS NOT NULL")
+        rows = cursor.fetchall()
+        cursor.close()
+    return sum(remember_city(name, latitude, longitude, country) for name, latitude, longitude in rows)
+
+
+def remember_city(name: str, latitude: float, longitude: float, country: str = "France") -> bool:
+    """
+    Enregistre les coordonnées d'une ville connue (table cities) comme réponse
+    de son géocodage direct, sans écraser une entrée existante. True si ajoutée.
+    """
+    key = forward_key(f"{name.strip()}, {country}")
+    if get(FORWARD, key) is not MISS:
+        return False
+    put(FORWARD, key, [float(latitude), float(longitude)])
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache des géocodages Nominatim")
+    parser.add_argument("--seed", action="store_true", help="Ajoute les villes de la table cities")
+    parser.add_argument("--purge", action="store_true", help="Supprime les entrées expirées")
+    args = parser.parse_args()
+    if args.seed:
+        logger.info(f"[geocode] {seed_from_cities()} ville(s) ajoutée(s) au cache")
+    if args.purge:
+        logger.info(f"[geocode] {purge_expired()} entrée(s) expirée(s) supprimée(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Métriques d'un tracé GPX calculées en une passe vectorisée (numpy).
+
+Remplace dans transform_gpx `length_3d()` de gpxpy et la boucle Python point
+par point du dénivelé. L'altitude GPS/barométrique est bruitée de quelques
+mètres d'un point à l'autre : sommée telle quelle sur un tracé enregistré
+toutes les secondes, elle gonfle le D+ de plusieurs centaines de mètres. On la
+lisse donc d'abord par une moyenne glissante sur SMOOTHING_WINDOW_M mètres de
+distance (et non de points : l'échantillonnage varie d'un enregistreur à
+l'autre), appliquée deux fois, calculée par sommes cumulées + searchsorted.
+
+  - distance 2D (haversine) et 3D (avec l'altitude lissée) ;
+  - D+ / D− et altitudes min/max sur l'altitude lissée ;
+  - temps de marche estimé par la fonction de Tobler (vitesse selon la pente
+    de chaque segment) ;
+  - profil altimétrique ré-échantillonné à PROFILE_POINTS points équidistants,
+    stocké avec le tracé (services.trace_store) pour l'étape 2 et le PDF.
+
+Les ruptures entre segments GPX (`segment_starts` : pause, perte du signal)
+ne comptent ni en distance ni en dénivelé : l'altitude est complétée et lissée
+segment par segment, sans quoi la fenêtre de lissage mélangerait la fin d'un
+segment et le début du suivant (rampe comptée en D+/D−).
+"""
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+SMOOTHING_WINDOW_M = 100.0
+PROFILE_POINTS = 200
+
+
+def segment_lengths_m(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Longueurs haversine (m) des n-1 segments consécutifs."""
+    lat_r, lon_r = np.radians(lats), np.radians(lons)
+    dlat, dlon = np.diff(lat_r), np.diff(lon_r)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_r[:-1]) * np.cos(lat_r[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def fill_missing_elevation(distances: np.ndarray, eles: np.ndarray) -> np.ndarray:
+    """Altitudes absentes (NaN) interpolées selon la distance ; None si aucune altitude."""
+    known = ~np.isnan(eles)
+    if not known.any():
+        return None
+    if known.all():
+        return eles
+    return np.interp(distances, distances[known], eles[known])
+
+
+def smooth_elevation(distances: np.ndarray, eles: np.ndarray, window_m: float = SMOOTHING_WINDOW_M,
+                     passes: int = 2) -> np.ndarray:
+    """
+    Moyenne des altitudes à ±window_m/2 de chaque point (distance cumulée
+    croissante). Deux passes équivalent à un noyau triangulaire : une seule
+    laisse des ondulations résiduelles qui comptent encore en D+.
+    """
+    if window_m <= 0 or len(eles) < 3:
+        return eles
+    lo = np.searchsorted(distances, distances - window_m / 2, side="left")
+    hi = np.searchsorted(distances, distances + window_m / 2, side="right")
+    for _ in range(passes):
+        cumsum = np.concatenate(([0.0], np.cumsum(eles)))
+        eles = (cumsum[hi] - cumsum[lo]) / (hi - lo)
+    return eles
+
+
+def tobler_speed_kmh(slope: np.ndarray) -> np.ndarray:
+    """Vitesse de marche (km/h) de Tobler : 6 km/h en légère descente, moins ailleurs."""
+    return 6.0 * np.exp(-3.5 * np.abs(slope + 0.05))
+
+
+def _segmentwise_elevation(distances: np.ndarray, raw: np.ndarray, bounds: list, window_m: float) -> np.ndarray:
+    """
+    Altitude complétée puis lissée indépendamment sur chaque segment GPX
+    [bounds[i], bounds[i+1]). Un segment sans aucune altitude reprend
+    l'interpolation sur l'ensemble du tracé. None si le tracé n'en a aucune.
+    """
+    whole = fill_missing_elevation(distances, raw)
+    if whole is None:
+        return None
+    parts = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        part = fill_missing_elevation(distances[start:end], raw[start:end])
+        if part is None:
+            part = whole[start:end]
+        parts.append(smooth_elevation(distances[start:end], part, window_m))
+    return np.concatenate(parts)
+
+
+def compute_metrics(lats, lons, eles=None, segment_starts=None,
+                    window_m: float = SMOOTHING_WINDOW_M, profile_points: int = PROFILE_POINTS) -> dict:
+    """
+    {"distance_m", "distance_3d_m", "uphill_m", "downhill_m", "min_elevation_m",
+    "max_elevation_m", "moving_time_h", "profile"} d'un tracé. Altitudes et
+    profil valent None si le tracé n'en a aucune.
+
+    `segment_starts` : indices des premiers points des segments GPX suivants
+    (le segment qui y mène est ignoré).
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    metrics = {
+        "distance_m": 0.0, "distance_3d_m": 0.0, "uphill_m": 0.0, "downhill_m": 0.0,
+        "min_elevation_m": None, "max_elevation_m": None, "moving_time_h": 0.0, "profile": None,
+    }
+    if len(lats) < 2:
+        return metrics
+
+    seg = segment_lengths_m(lats, lons)
+    active = np.ones(len(seg), dtype=bool)
+    bounds = [0, len(lats)]
+    if segment_starts is not None and len(segment_starts):
+        starts = np.unique(np.asarray(segment_starts, dtype=int))
+        starts = starts[(starts > 0) & (starts < len(lats))]
+        active[starts - 1] = False
+        bounds = [0, *starts.tolist(), len(lats)]
+    seg = np.where(active, seg, 0.0)
+    distances = np.concatenate(([0.0], np.cumsum(seg)))
+
+    elevation = None
+    if eles is not None:
+        # dtype float : numpy convertit les None (altitude absente) en NaN.
+        raw = np.array(eles, dtype=float)
+        elevation = _segmentwise_elevation(distances, raw, bounds, window_m)
+
+    if elevation is None:
+        dz = np.zeros(len(seg))
+    else:
+        dz = np.where(active, np.diff(elevation), 0.0)
+        metrics.update(
+            uphill_m=float(dz[dz > 0].sum()),
+            downhill_m=float(-dz[dz < 0].sum()),
+            min_elevation_m=float(elevation.min()),
+            max_elevation_m=float(elevation.max()),
+            profile=elevation_profile(distances, elevation, profile_points),
+        )
+
+    slope = np.divide(dz, seg, out=np.zeros_like(seg), where=seg > 0)
+    metrics.update(
+        distance_m=float(distances[-1]),
+        distance_3d_m=float(np.sqrt(seg ** 2 + dz ** 2).sum()),
+        moving_time_h=float((seg / 1000 / tobler_speed_kmh(slope)).sum()),
+    )
+    return metrics
+
+
+def elevation_profile(distances: np.ndarray, elevation: np.ndarray, points: int = PROFILE_POINTS) -> dict:
+    """{"distance_km", "elevation_m"} : altitude à `points` distances équidistantes."""
+    if distances[-1] <= 0:
+        return None
+    sampled = np.linspace(0.0, distances[-1], min(points, len(distances)))
+    return {
+        "distance_km": np.round(sampled / 1000, 3).tolist(),
+        "elevation_m": np.round(np.interp(sampled, distances, elevation), 1).tolist(),
+    }
@@ -0,0 +1,97 @@
+"""
+Limitation de débit et regroupement d'appels identiques, partagés par tous
+les threads d'un processus (utilisés par utils.geo_utils pour Nominatim).
+
+  - TokenBucket : seau à jetons ; `acquire()` attend qu'un jeton soit
+    disponible. Les threads sont servis dans l'ordre d'arrivée (un verrou
+    réserve le prochain créneau), sans attente active.
+  - InFlight : deux appelants qui demandent la même clé en même temps
+    partagent un seul appel ; le second attend le résultat du premier.
+
+Chacun tient des compteurs (attente cumulée et maximale, appels regroupés)
+lisibles par `stats()` pour /api/health/geocoding.
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """`rate_per_s` jetons par seconde, au plus `burst` d'avance."""
+
+    def __init__(self, rate_per_s: float, burst: int = 1):
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._stats = {"acquired": 0, "waiting": 0, "wait_total_s": 0.0, "wait_max_s": 0.0}
+
+    def acquire(self) -> float:
+        """Prend un jeton, en attendant si besoin ; retourne l'attente (s)."""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate_per_s > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_s)
+                self._updated = now
+                self._tokens -= 1
+                # Jeton « emprunté » : l'attente est réservée sous le verrou, le
+                # suivant se place donc après nous.
+                delay = -self._tokens / self.rate_per_s if self._tokens < 0 else 0.0
+            else:
+                delay = 0.0
+            self._stats["acquired"] += 1
+            self._stats["waiting"] += 1
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self._stats["waiting"] -= 1
+            self._stats["wait_total_s"] += delay
+            self._stats["wait_max_s"] = max(self._stats["wait_max_s"], delay)
+        return delay
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["wait_avg_s"] = stats["wait_total_s"] / stats["acquired"] if stats["acquired"] else 0.0
+        stats["rate_per_s"] = self.rate_per_s
+        return stats
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class InFlight:
+    """Regroupe les appels simultanés portant sur la même clé."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def run(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
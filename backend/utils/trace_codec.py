@@ -0,0 +1,50 @@
+"""
+Encodage compact des points d'un tracé GPX pour le stockage MongoDB.
+
+Un tableau BSON de sous-documents {lat, lon, ele} coûte une cinquantaine
+d'octets par point (noms de champs et index répétés) et son décodage construit
+un dict Python par point. Le format « track » range chaque série dans un champ
+binaire :
+
+  - lat / lon : micro-degrés (≈ 0,1 m, bien en dessous de la précision d'un GPS)
+    en int32 little-endian, codés en différences avec le point précédent (le
+    premier en absolu) - des valeurs petites que la compression de WiredTiger
+    réduit encore ;
+  - ele : float32 little-endian, NaN pour une altitude absente.
+
+Soit 12 octets par point, décodés par numpy (np.frombuffer + cumsum) sans
+aucun objet par point. `v` versionne le format.
+"""
+import numpy as np
+
+CODEC_VERSION = 1
+MICRODEGREES = 1_000_000
+
+
+def _pack_coords(values) -> bytes:
+    micro = np.round(np.asarray(values, dtype=float) * MICRODEGREES).astype(np.int64)
+    return np.diff(micro, prepend=0).astype("<i4").tobytes()
+
+
+def _unpack_coords(data: bytes) -> np.ndarray:
+    return np.cumsum(np.frombuffer(data, dtype="<i4"), dtype=np.int64) / MICRODEGREES
+
+
+def encode_track(lats, lons, eles=None) -> dict:
+    """{"v", "n", "lat", "lon"[, "ele"]} : séries du tracé en binaire compact."""
+    track = {"v": CODEC_VERSION, "n": len(lats), "lat": _pack_coords(lats), "lon": _pack_coords(lons)}
+    if eles is not None:
+        # dtype flottant : numpy convertit les None (altitude absente) en NaN.
+        ele = np.array(eles, dtype="<f4")
+        track["ele"] = ele.tobytes()
+    return track
+
+
+def decode_track(track: dict) -> tuple:
+    """(lats, lons, eles) en tableaux numpy ; eles vaut None si non stocké."""
+    if track.get("v") != CODEC_VERSION:
+        raise ValueError(f"Version d'encodage de tracé inconnue : {track.get('v')}")
+    lats = _unpack_coords(track["lat"])
+    lons = _unpack_coords(track["lon"])
+    eles = np.frombuffer(track["ele"], dtype="<f4").astype(float) if track.get("ele") is not None else None
+    return lats, lons, eles
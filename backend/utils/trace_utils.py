@@ -0,0 +1,192 @@
+"""
+Simplification et encodage des tracés GPX pour l'affichage.
+
+Un tracé enregistré compte souvent des milliers de points (un toutes les
+secondes) alors qu'une carte n'en distingue que quelques centaines : les points
+qui s'écartent de moins d'un pixel de la ligne simplifiée sont invisibles.
+
+  - `simplify_trace` : Douglas-Peucker sur les coordonnées projetées en Web
+    Mercator (le repère des tuiles Leaflet/OSM), tolérance en mètres Mercator ;
+  - `zoom_to_tolerance_m` : tolérance correspondant à un pixel à un zoom donné ;
+  - `encode_polyline` : format « encoded polyline » (Google, précision 1e-5),
+    compact et décodable par la plupart des bibliothèques cartographiques ;
+  - `trace_levels` / `pick_level` : versions pré-simplifiées (50 / 500 / 5000
+    points) calculées une fois à l'import, puis choisies selon la tolérance
+    demandée sans aucun calcul à la lecture.
+"""
+import numpy as np
+
+EARTH_RADIUS_M = 6378137.0
+# Taille d'un pixel au zoom 0 en Web Mercator (tuiles 256 px).
+MERCATOR_M_PER_PX_Z0 = 2 * np.pi * EARTH_RADIUS_M / 256
+MAX_LATITUDE = 85.05112878
+
+
+def project_mercator(lats, lons) -> tuple:
+    """Coordonnées Web Mercator (x, y) en mètres, vectorisées."""
+    lats = np.clip(np.asarray(lats, dtype=float), -MAX_LATITUDE, MAX_LATITUDE)
+    lons = np.asarray(lons, dtype=float)
+    x = EARTH_RADIUS_M * np.radians(lons)
+    y = EARTH_RADIUS_M * np.log(np.tan(np.pi / 4 + np.radians(lats) / 2))
+    return x, y
+
+
+def zoom_to_tolerance_m(zoom: float, pixels: float = 1.0) -> float:
+    """Tolérance Mercator (m) équivalente à `pixels` pixels au zoom `zoom`."""
+    return pixels * MERCATOR_M_PER_PX_Z0 / (2 ** zoom)
+
+
+def douglas_peucker_mask(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Masque des points conservés par Douglas-Peucker. Pile explicite (pas de
+    récursion, un tracé de 100 000 points ne fait pas déborder la pile Python) ;
+    la distance de chaque segment est calculée d'un bloc avec numpy.
+    """
+    n = len(x)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if n < 3 or tolerance <= 0:
+        keep[:] = True
+        return keep
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        xs, ys = x[start + 1:end], y[start + 1:end]
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        seg_len2 = dx * dx + dy * dy
+        if seg_len2 == 0:
+            # Boucle fermée (départ = arrivée) : distance au point de départ.
+            dist2 = (xs - x[start]) ** 2 + (ys - y[start]) ** 2
+        else:
+            # Distance au segment (projection bornée à [start, end]).
+            t = np.clip(((xs - x[start]) * dx + (ys - y[start]) * dy) / seg_len2, 0.0, 1.0)
+            dist2 = (xs - (x[start] + t * dx)) ** 2 + (ys - (y[start] + t * dy)) ** 2
+        farthest = int(np.argmax(dist2))
+        if dist2[farthest] > tolerance * tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+def douglas_peucker_importance(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Tolérance (m) en dessous de laquelle Douglas-Peucker garde chaque point :
+    `importance > t` donne exactement les points conservés à la tolérance t
+    (l'importance d'un point est bornée par celle du point qui a coupé son
+    segment). Les extrémités valent +inf. Un seul passage sert tous les niveaux.
+    """
+    n = len(x)
+    importance = np.zeros(n)
+    if n == 0:
+        return importance
+    importance[0] = importance[-1] = np.inf
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        start, end, parent = stack.pop()
+        if end - start < 2:
+            continue
+        xs, ys = x[start + 1:end], y[start + 1:end]
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        seg_len2 = dx * dx + dy * dy
+        if seg_len2 == 0:
+            dist2 = (xs - x[start]) ** 2 + (ys - y[start]) ** 2
+        else:
+            t = np.clip(((xs - x[start]) * dx + (ys - y[start]) * dy) / seg_len2, 0.0, 1.0)
+            dist2 = (xs - (x[start] + t * dx)) ** 2 + (ys - (y[start] + t * dy)) ** 2
+        farthest = int(np.argmax(dist2))
+        split = start + 1 + farthest
+        importance[split] = min(float(np.sqrt(dist2[farthest])), parent)
+        stack.append((start, split, importance[split]))
+        stack.append((split, end, importance[split]))
+    return importance
+
+
+def simplify_trace(lats, lons, tolerance_m: float) -> tuple:
+    """(lats, lons) simplifiés : tableaux numpy des points conservés, dans l'ordre."""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    x, y = project_mercator(lats, lons)
+    keep = douglas_peucker_mask(x, y, tolerance_m)
+    return lats[keep], lons[keep]
+
+
+def encode_polyline(lats, lons, precision: int = 5) -> str:
+    """Encoded polyline (algorithme Google) des coordonnées données."""
+    factor = 10 ** precision
+    values = np.stack([
+        np.round(np.asarray(lats, dtype=float) * factor),
+        np.round(np.asarray(lons, dtype=float) * factor),
+    ], axis=1).astype(np.int64)
+    if not len(values):
+        return ""
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    chunks = []
+    for value in deltas.tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+# Niveaux de détail pré-calculés à l'import (nombre maximal de points).
+LEVEL_SIZES = (50, 500, 5000)
+
+
+def trace_levels(lats, lons, sizes=LEVEL_SIZES) -> list:
+    """
+    [{"max_points", "tolerance_m", "lat", "lon"}] du plus grossier au plus fin.
+    `tolerance_m` : écart maximal (m Mercator) entre un point retiré et la ligne
+    du niveau - 0 quand le tracé tient déjà en `max_points` points.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    importance = douglas_peucker_importance(*project_mercator(lats, lons))
+    ranked = np.sort(importance)[::-1]
+    levels = []
+    for size in sorted(sizes):
+        if len(lats) <= size:
+            keep, tolerance = np.ones(len(lats), dtype=bool), 0.0
+        else:
+            tolerance = float(ranked[size])
+            keep = importance > tolerance
+        levels.append({
+            "max_points": size,
+            # Arrondi par excès : pick_level ne doit jamais sous-estimer l'écart.
+            "tolerance_m": float(np.ceil(tolerance * 1000) / 1000),
+            "lat": lats[keep].tolist(),
+            "lon": lons[keep].tolist(),
+        })
+    return levels
+
+
+def pick_level(levels: list, tolerance_m: float):
+    """Niveau le plus grossier assez précis pour cette tolérance, ou None (tracé complet requis)."""
+    for level in sorted(levels or [], key=lambda lvl: lvl["max_points"]):
+        if level["tolerance_m"] <= tolerance_m:
+            return level
+    return None
+
+
+def trace_bbox(lats, lons) -> dict | None:
+    """Emprise du tracé (min/max lat/lon), ou None si vide."""
+    if not len(lats):
+        return None
+    return {
+        "min_lat": float(np.min(lats)), "min_lon": float(np.min(lons)),
+        "max_lat": float(np.max(lats)), "max_lon": float(np.max(lons)),
+    }
+
+
+def bbox_tolerance_m(bbox: dict, pixels_across: int) -> float:
+    """Taille d'un pixel (m Mercator) quand l'emprise occupe `pixels_across` pixels."""
+    x, y = project_mercator([bbox["min_lat"], bbox["max_lat"]], [bbox["min_lon"], bbox["max_lon"]])
+    extent = max(abs(x[1] - x[0]), abs(y[1] - y[0]))
+    return extent / max(pixels_across, 1)
@@ -150,6 +150,26 @@
       msg.style.display = 'block';
     }
 
+    var JOB_POLL_MS = 1500;
+
+    // Suit l'import en arrière-plan (GET /api/etl/jobs/{id}) jusqu'à sa fin.
+    async function followJob(jobId, token) {
+      while (true) {
+        await new Promise(function (resolve) { setTimeout(resolve, JOB_POLL_MS); });
+        var res = await fetch(window.API_BASE + '/api/etl/jobs/' + encodeURIComponent(jobId), {
+          headers: { 'Authorization': 'Bearer ' + token }
+        });
+        if (!res.ok) { showMsg('Suivi de l\'import indisponible (' + res.status + ').', false); return; }
+        var job = await res.json();
+        if (job.status === 'succeeded') {
+          showMsg(job.message || 'Tracé importé.', true);
+          return;
+        }
+        if (job.status === 'failed') { showMsg(job.message || 'Échec de l\'import.', false); return; }
+        showMsg(job.message || 'Import en cours…', true);
+      }
+    }
+
     if (dropzone && input) {
       dropzone.addEventListener('click', function () { input.click(); });
       ['dragover', 'dragenter'].forEach(function (ev) {
@@ -193,8 +213,11 @@
           var ct = res.headers.get('content-type') || '';
           var data = ct.includes('application/json') ? await res.json() : { message: await res.text() };
           if (res.ok && (data.success === undefined || data.success)) {
-            var city = data.city ? ' Ville détectée : ' + data.city + '.' : '';
-            showMsg((data.message || 'Tracé envoyé en relecture.') + city, true);
+            showMsg(data.message || 'Tracé envoyé en relecture.', true);
+            if (data.job_id) {
+              submit.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Import…';
+              await followJob(data.job_id, token);
+            }
           } else {
             showMsg(data.message || ('Erreur lors de l\'envoi (' + res.status + ').'), false);
           }
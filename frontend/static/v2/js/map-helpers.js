@@ -125,6 +125,11 @@ async function createStepMap(centerLat, centerLon, zoom) {
     return map;
 }
 
+// Zoom de référence des tracés GPX demandés à l'API : le serveur les simplifie
+// à un pixel près à ce zoom (quelques centaines de points au lieu de milliers),
+// sans différence visible jusqu'au zoom rue.
+const TRACE_ZOOM = 16;
+
 // Affiche sur la carte la randonnée choisie à l'étape 2 (marqueur "Jx" + tracé GPX),
 // pour garder le contexte de la journée aux étapes 3 et 4. Renvoie la position
 // [lat, lon] du départ de la randonnée (utile pour centrer la carte), ou null.
@@ -144,7 +149,7 @@ async function addChosenHikeToMap(map, cityId, hikeId, currentDay) {
         console.error('Erreur chargement randonnée choisie:', err);
     }
     try {
-        const traceData = await apiGet(`/api/step2/hike/${hikeId}/trace`);
+        const traceData = await apiGet(`/api/step2/hike/${hikeId}/trace?zoom=${TRACE_ZOOM}`);
         if (traceData.points && traceData.points.length > 0) {
             const latlngs = traceData.points.map(p => [p.lat, p.lon]);
             L.polyline(latlngs, { color: '#2E7D86', weight: 3, opacity: 0.8 }).addTo(map);
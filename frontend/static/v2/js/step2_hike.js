@@ -78,7 +78,7 @@ document.addEventListener('DOMContentLoaded', async function () {
             tracesByHikeId = {};
             await Promise.all(hikes.map(async (hike) => {
                 try {
-                    const traceData = await apiGet(`/api/step2/hike/${hike.id}/trace`);
+                    const traceData = await apiGet(`/api/step2/hike/${hike.id}/trace?zoom=${TRACE_ZOOM}`);
                     if (traceData.points && traceData.points.length > 0) {
                         tracesByHikeId[hike.id] = traceData.points.map(p => [p.lat, p.lon]);
                     }
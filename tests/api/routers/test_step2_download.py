@@ -0,0 +1,17 @@
+import pytest
+
+from api.routers import step2
+
+
+def test_plain_filename_is_kept_in_both_forms():
+    assert step2._attachment_header("crozon.gpx") == "attachment; filename=\"crozon.gpx\"; filename*=UTF-8''crozon.gpx"
+
+
+@pytest.mark.parametrize("filename", ['Tour "du" cap.gpx', "L’Œil de Crozon.gpx", "Pointe de Pen-Hir.gpx"])
+def test_header_is_latin1_safe_and_quoted(filename):
+    header = step2._attachment_header(filename)
+
+    header.encode("latin-1")  # Starlette encode les en-têtes en latin-1
+    ascii_part = header.split("; ")[1]
+    assert ascii_part.startswith('filename="') and ascii_part.count('"') == 2
+    assert header.endswith(step2.quote(filename, safe=""))
@@ -0,0 +1,92 @@
+"""
+Mesure du cache de réponses de /api/step1/cities (services.response_cache).
+
+Lancé MANUELLEMENT (pas par pytest - pas de préfixe test_) :
+    .venv/bin/python tests/bench/cache_cities.py
+    .venv/bin/python tests/bench/cache_cities.py --disk
+
+Aucune base n'est nécessaire : `_load_city_list` est remplacé par une liste
+synthétique de NB_VILLES villes avec 7 jours de météo, précédée d'un
+`time.sleep` de LENTEUR_S secondes (≈ les requêtes MySQL). On mesure le premier
+appel (miss), puis NB_APPELS appels servis par le cache (hits), route FastAPI
+comprise, et enfin un appel après invalidation.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+os.environ["RESPONSE_CACHE_DIR"] = tempfile.mkdtemp(prefix="randovango-cache-")
+if "--disk" in sys.argv:
+    os.environ["RESPONSE_CACHE_BACKEND"] = "disk"
+
+from api.routers import step1  # noqa: E402
+from services import response_cache  # noqa: E402
+
+LENTEUR_S = 0.2
+NB_VILLES = 60
+NB_APPELS = 500
+
+
+def _villes_synthetiques(distance_km):
+    time.sleep(LENTEUR_S)
+    jour = date.today()
+    return [
+        {
+            "id": i, "name": f"Ville {i}", "department": "Finistère", "region": "Bretagne",
+            "country": "France", "latitude": 48.0 + i / 100, "longitude": -4.0 - i / 100,
+            "stats": {"hikes": i, "spots": 2 * i, "poi": 3 * i},
+            "stats_labels": {"hikes": f"{i} randonnées", "spots": f"{2 * i} spots", "poi": f"{3 * i} services"},
+            "meteo": [
+                {"date": jour + timedelta(days=d), "temp_max": 18.5, "temp_min": 9.0, "weather_code": 3,
+                 "picto": "cloud", "precipitation_sum": 0.4, "wind_speed_max": 22.0,
+                 "day_label": "Lun. 18/10", "css": "meteo-ok"}
+                for d in range(7)
+            ],
+        }
+        for i in range(NB_VILLES)
+    ]
+
+
+async def mesurer() -> None:
+    step1._load_city_list = _villes_synthetiques
+    app = FastAPI()
+    app.include_router(step1.router, prefix="/api/step1")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        debut = time.perf_counter()
+        await client.get("/api/step1/cities")
+        miss = time.perf_counter() - debut
+
+        latences = []
+        for _ in range(NB_APPELS):
+            debut = time.perf_counter()
+            await client.get("/api/step1/cities")
+            latences.append(time.perf_counter() - debut)
+
+        response_cache.invalidate(response_cache.CITIES_CACHE)
+        debut = time.perf_counter()
+        await client.get("/api/step1/cities")
+        apres_invalidation = time.perf_counter() - debut
+
+    stats = response_cache.get_cache(response_cache.CITIES_CACHE).stats()
+    print(f"Backend : {stats['backend']} ({NB_VILLES} villes)")
+    print(f"  premier appel (miss)        : {miss * 1000:.1f} ms")
+    print(f"  {NB_APPELS} appels (hits), médiane : {statistics.median(latences) * 1000:.2f} ms")
+    print(f"  {NB_APPELS} appels (hits), p95     : {sorted(latences)[int(NB_APPELS * 0.95)] * 1000:.2f} ms")
+    print(f"  après invalidation (miss)   : {apres_invalidation * 1000:.1f} ms")
+    print(f"  compteurs : {stats['hits']} hits, {stats['misses']} misses")
+
+
+if __name__ == "__main__":
+    asyncio.run(mesurer())
@@ -0,0 +1,82 @@
+"""
+Mesure de concurrence des routes `async def` (step1 /cities, /refresh-meteo).
+
+Lancé MANUELLEMENT (pas par pytest - pas de préfixe test_) :
+    .venv/bin/python tests/bench/concurrence_routes_async.py
+    .venv/bin/python tests/bench/concurrence_routes_async.py --bloquant
+
+Aucune base n'est nécessaire : la partie bloquante des deux routes est remplacée
+par un `time.sleep` de LENTEUR_S secondes (≈ une requête MySQL ou un appel
+Open-Meteo lent). Pendant que ces deux appels lents tournent, on envoie des
+requêtes rapides (/api/auth/logout) et on mesure leur latence.
+
+  - mode normal   : la partie bloquante passe par run_blocking (pool de threads),
+                    les requêtes rapides répondent en quelques millisecondes ;
+  - --bloquant    : run_blocking est remplacé par un appel direct, comme avant
+                    la correction - les requêtes rapides attendent la fin des
+                    appels lents (latence ≈ LENTEUR_S ou plus).
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from api.routers import auth, step1  # noqa: E402
+
+LENTEUR_S = 1.0
+NB_REQUETES_RAPIDES = 50
+
+
+def _lent(*args, **kwargs):
+    time.sleep(LENTEUR_S)
+    return []
+
+
+async def _appel_direct(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+
+async def mesurer(bloquant: bool) -> None:
+    step1._load_city_list = _lent
+    step1._refresh_city_meteo = _lent
+    if bloquant:
+        step1.run_blocking = _appel_direct
+
+    app = FastAPI()
+    app.include_router(step1.router, prefix="/api/step1")
+    app.include_router(auth.router, prefix="/api/auth")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def rapide(envoi):
+            # Latence mesurée depuis l'envoi : inclut l'attente derrière une
+            # boucle d'événements éventuellement figée par les appels lents.
+            await client.post("/api/auth/logout")
+            return time.perf_counter() - envoi
+
+        debut = time.perf_counter()
+        lents = [
+            asyncio.create_task(client.get("/api/step1/cities")),
+            asyncio.create_task(client.get("/api/step1/refresh-meteo/1")),
+        ]
+        rapides = [asyncio.create_task(rapide(time.perf_counter())) for _ in range(NB_REQUETES_RAPIDES)]
+        latences = await asyncio.gather(*rapides)
+        await asyncio.gather(*lents)
+        total = time.perf_counter() - debut
+
+    mode = "bloquant (avant)" if bloquant else "pool de threads (après)"
+    print(f"Mode : {mode}")
+    print(f"  {NB_REQUETES_RAPIDES} requêtes rapides pendant 2 appels lents de {LENTEUR_S:.1f} s")
+    print(f"  latence médiane : {statistics.median(latences) * 1000:.1f} ms")
+    print(f"  latence max     : {max(latences) * 1000:.1f} ms")
+    print(f"  durée totale    : {total:.2f} s (2 appels lents en parallèle ≈ {LENTEUR_S:.1f} s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(mesurer(bloquant="--bloquant" in sys.argv))
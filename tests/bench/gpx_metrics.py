@@ -0,0 +1,92 @@
+"""
+Mesure du moteur de métriques GPX (utils.gpx_metrics) face à l'ancien calcul de
+transform_gpx (gpxpy `length_3d()` + boucle Python du dénivelé).
+
+Lancé MANUELLEMENT (pas par pytest - pas de préfixe test_) :
+    .venv/bin/python tests/bench/gpx_metrics.py
+    .venv/bin/python tests/bench/gpx_metrics.py 250000
+
+Tracé synthétique de NB_POINTS points (≈ 1 m entre deux points, un
+enregistrement à la seconde) : une montée de 300 m bruitée de ±3 m. Le parsing
+GPX n'est pas mesuré, seulement le calcul des métriques à partir des points.
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import gpxpy.gpx
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from utils.gpx_metrics import compute_metrics  # noqa: E402
+
+NB_POINTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+REPETITIONS = 5
+
+
+def _trace_synthetique():
+    rng = np.random.default_rng(42)
+    lats = 48.0 + np.cumsum(rng.normal(6e-6, 2e-6, NB_POINTS))
+    lons = -4.0 + np.cumsum(rng.normal(6e-6, 2e-6, NB_POINTS))
+    eles = np.linspace(0, 300, NB_POINTS) + rng.normal(0, 3, NB_POINTS)
+    return lats.tolist(), lons.tolist(), eles.tolist()
+
+
+def _ancien_calcul(gpx):
+    distance = sum(track.length_3d() or 0 for track in gpx.tracks)
+    uphill = downhill = 0
+    for track in gpx.tracks:
+        for segment in track.segments:
+            previous = None
+            for point in segment.points:
+                if point.elevation is not None:
+                    if previous is not None:
+                        diff = point.elevation - previous
+                        if diff > 0:
+                            uphill += diff
+                        else:
+                            downhill += abs(diff)
+                    previous = point.elevation
+    return distance, uphill, downhill
+
+
+def _chrono(fonction):
+    durees = []
+    for _ in range(REPETITIONS):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees), resultat
+
+
+def mesurer() -> None:
+    lats, lons, eles = _trace_synthetique()
+    gpx = gpxpy.gpx.GPX()
+    track = gpxpy.gpx.GPXTrack()
+    segment = gpxpy.gpx.GPXTrackSegment()
+    segment.points = [gpxpy.gpx.GPXTrackPoint(a, o, elevation=e) for a, o, e in zip(lats, lons, eles)]
+    track.segments.append(segment)
+    gpx.tracks.append(track)
+    points = [{"lat": a, "lon": o, "ele": e} for a, o, e in zip(lats, lons, eles)]
+
+    ancien, (distance, uphill, _) = _chrono(lambda: _ancien_calcul(gpx))
+    # Même entrée que transform_gpx : la liste de points {lat, lon, ele}.
+    nouveau, metrics = _chrono(lambda: compute_metrics(
+        [p["lat"] for p in points], [p["lon"] for p in points], [p["ele"] for p in points]))
+    tableaux = [np.asarray(serie) for serie in (lats, lons, eles)]
+    moteur, _ = _chrono(lambda: compute_metrics(*tableaux))
+
+    print(f"Tracé synthétique : {NB_POINTS} points, montée réelle 300 m")
+    print(f"  ancien (gpxpy + boucle)  : {ancien * 1000:8.1f} ms  "
+          f"{distance / 1000:.2f} km, D+ {uphill:.0f} m (bruit compris)")
+    print(f"  gpx_metrics (numpy)      : {nouveau * 1000:8.1f} ms  "
+          f"{metrics['distance_3d_m'] / 1000:.2f} km, D+ {metrics['uphill_m']:.0f} m (lissé), "
+          f"{metrics['moving_time_h']:.1f} h, profil {len(metrics['profile']['distance_km'])} points")
+    print(f"  moteur seul (tableaux)   : {moteur * 1000:8.1f} ms")
+    print(f"  accélération             : x{ancien / nouveau:.1f} (x{ancien / moteur:.1f} sans extraction des dicts)")
+
+
+if __name__ == "__main__":
+    mesurer()
@@ -0,0 +1,85 @@
+"""
+Mesure de la transformation OSM par colonnes (etl.transform.transform_osm) face
+à l'ancienne boucle élément par élément, et du décodage JSON (orjson / json).
+
+Lancé MANUELLEMENT (pas par pytest - pas de préfixe test_) :
+    .venv/bin/python tests/bench/transform_osm.py
+    .venv/bin/python tests/bench/transform_osm.py 250000
+
+Deux réponses Overpass synthétiques de NB_ELEMENTS éléments : celle des tests
+d'équivalence (cas limites, ~30 % de POI retenus) et une plus proche d'une
+tuile régionale réelle (tags de la requête, ~70 % nommés, quelques adresses).
+Les deux transformations doivent produire exactement le même DataFrame : c'est
+vérifié avant d'afficher les durées.
+"""
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import orjson
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "etl" / "transform"))
+
+from etl.transform.transform_osm import transform_osm  # noqa: E402
+from test_transform_osm import _reference_transform, random_osm_json  # noqa: E402
+
+NB_ELEMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+REPETITIONS = 5
+
+
+def _chrono(fonction):
+    durees = []
+    for _ in range(REPETITIONS):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees), resultat
+
+
+def _reponse_realiste():
+    rng = random.Random(42)
+    valeurs = [("amenity", "toilets"), ("amenity", "restaurant"), ("tourism", "viewpoint"),
+               ("shop", "bakery"), ("historic", "memorial"), ("natural", "beach")]
+    elements = []
+    for i in range(NB_ELEMENTS):
+        cle, valeur = rng.choice(valeurs)
+        tags = {cle: valeur}
+        if rng.random() < 0.7:
+            tags["name"] = f"POI {i}"
+        if rng.random() < 0.2:
+            tags.update({"addr:street": "Rue du Port", "addr:housenumber": "3", "addr:city": "Crozon"})
+        if rng.random() < 0.1:
+            tags["website"] = "https://example.org"
+        if rng.random() < 0.7:
+            elements.append({"type": "node", "id": i, "lat": 48.2 + rng.random() / 10,
+                             "lon": -4.5 + rng.random() / 10, "tags": tags})
+        else:
+            elements.append({"type": "way", "id": i, "center": {"lat": 48.2, "lon": -4.5}, "tags": tags})
+    return {"elements": elements}
+
+
+def mesurer() -> None:
+    for libelle, osm_json in (("cas limites", random_osm_json(NB_ELEMENTS, seed=42)),
+                              ("réaliste", _reponse_realiste())):
+        brut = orjson.dumps(osm_json)
+
+        lecture_json, _ = _chrono(lambda: json.loads(brut))
+        lecture_orjson, _ = _chrono(lambda: orjson.loads(brut))
+        ancien, df_ancien = _chrono(lambda: _reference_transform(osm_json))
+        nouveau, df_nouveau = _chrono(lambda: transform_osm(osm_json, city="bench"))
+        pd.testing.assert_frame_equal(df_nouveau, df_ancien)
+
+        print(f"Réponse {libelle} : {NB_ELEMENTS} éléments ({len(brut) / 1e6:.1f} Mo), {len(df_nouveau)} POI retenus")
+        print(f"  décodage json            : {lecture_json * 1000:8.1f} ms")
+        print(f"  décodage orjson          : {lecture_orjson * 1000:8.1f} ms  (x{lecture_json / lecture_orjson:.1f})")
+        print(f"  ancienne boucle          : {ancien * 1000:8.1f} ms")
+        print(f"  transform par colonnes   : {nouveau * 1000:8.1f} ms  (x{ancien / nouveau:.1f}, résultat identique)")
+
+
+if __name__ == "__main__":
+    mesurer()
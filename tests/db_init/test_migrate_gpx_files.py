@@ -0,0 +1,34 @@
+from bson import ObjectId
+
+from db_init import migrate_gpx_files
+
+
+class FakeCollection:
+    def __init__(self):
+        self.updates = []
+
+    def update_one(self, query, update):
+        self.updates.append((query, update))
+
+
+def test_migrate_document_moves_content_to_gridfs(monkeypatch):
+    stored = []
+    monkeypatch.setattr(migrate_gpx_files, "find_raw_gpx_id", lambda trace_id: None)
+    monkeypatch.setattr(migrate_gpx_files, "store_raw_gpx",
+                        lambda content, filename, trace_id, hike_id: stored.append((content, filename, hike_id)) or "f1")
+    collection = FakeCollection()
+    doc = {"_id": ObjectId(), "gpx_content": "<gpx/>", "filename": "a.gpx", "hike_mysql_id": 7}
+    migrate_gpx_files.migrate_document(collection, doc)
+    assert stored == [("<gpx/>", "a.gpx", 7)]
+    assert collection.updates == [({"_id": doc["_id"]}, {"$set": {"gpx_file_id": "f1"}, "$unset": {"gpx_content": ""}})]
+
+
+def test_migrate_document_reuses_file_of_interrupted_run(monkeypatch):
+    def fail(*args):
+        raise AssertionError("le fichier existe déjà, pas de second envoi")
+
+    monkeypatch.setattr(migrate_gpx_files, "find_raw_gpx_id", lambda trace_id: "existant")
+    monkeypatch.setattr(migrate_gpx_files, "store_raw_gpx", fail)
+    collection = FakeCollection()
+    migrate_gpx_files.migrate_document(collection, {"_id": ObjectId(), "gpx_content": "<gpx/>"})
+    assert collection.updates[0][1]["$set"] == {"gpx_file_id": "existant"}
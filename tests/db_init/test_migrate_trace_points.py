@@ -0,0 +1,24 @@
+import numpy as np
+
+from db_init import migrate_trace_points
+from utils.trace_codec import decode_track
+
+
+class FakeCollection:
+    def __init__(self):
+        self.updates = []
+
+    def update_one(self, query, update):
+        self.updates.append((query, update))
+
+
+def test_migrate_document_replaces_points_by_track():
+    collection = FakeCollection()
+    points = [{"lat": 48.1, "lon": -4.2, "ele": 10.0}, {"lat": 48.2, "lon": -4.3, "ele": None}]
+    migrate_trace_points.migrate_document(collection, {"_id": 1, "points": points})
+    query, update = collection.updates[0]
+    assert query == {"_id": 1} and update["$unset"] == {"points": ""}
+    lats, lons, eles = decode_track(update["$set"]["track"])
+    assert np.allclose(lats, [48.1, 48.2]) and np.allclose(lons, [-4.2, -4.3])
+    assert eles[0] == 10.0 and np.isnan(eles[1])
+    assert "track" in update["$set"]["levels"][0]
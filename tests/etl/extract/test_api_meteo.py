@@ -0,0 +1,65 @@
+import pytest
+import requests
+
+from etl.extract import api_meteo
+from etl.extract.api_meteo import extract_weather_batch, parse_batch_response
+
+
+def daily(temp_max):
+    return {
+        "daily": {
+            "time": ["2026-10-18", "2026-10-19"],
+            "temperature_2m_max": [temp_max, temp_max + 1],
+            "temperature_2m_min": [5.0, 6.0],
+            "precipitation_sum": [0.0, 1.2],
+            "wind_speed_10m_max": [12.0, 30.0],
+            "weather_code": [1, 61],
+            "shortwave_radiation_sum": [10.0, 4.0],
+        }
+    }
+
+
+def cities(n):
+    return [{"id": i, "name": f"Ville {i}", "latitude": 48.0 + i, "longitude": -4.0} for i in range(n)]
+
+
+def test_parse_batch_response_keeps_coordinate_order():
+    result = parse_batch_response(cities(2), [daily(15.0), daily(20.0)])
+    assert result[0][0] == ("2026-10-18", 15.0, 5.0, 0.0, 12.0, 1, 10.0)
+    assert result[1][1][1] == 21.0
+
+
+def test_parse_batch_response_single_location_object():
+    assert list(parse_batch_response(cities(1), daily(15.0))) == [0]
+
+
+def test_parse_batch_response_rejects_count_mismatch():
+    with pytest.raises(ValueError):
+        parse_batch_response(cities(2), [daily(15.0)])
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def test_extract_weather_batch_chunks_and_skips_failed_chunk(monkeypatch):
+    calls = []
+
+    def fake_get(url, params, timeout):
+        calls.append(params["latitude"])
+        if len(calls) == 2:
+            raise requests.exceptions.ConnectionError("coupure")
+        count = len(params["latitude"].split(","))
+        return FakeResponse([daily(15.0)] * count if count > 1 else daily(15.0))
+
+    monkeypatch.setattr(api_meteo.requests, "get", fake_get)
+    result = extract_weather_batch(cities(5), batch_size=2)
+    assert calls == ["48.0,49.0", "50.0,51.0", "52.0"]
+    assert sorted(result) == [0, 1, 4]
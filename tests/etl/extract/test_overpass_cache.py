@@ -0,0 +1,109 @@
+import os
+import time
+
+import orjson
+import pytest
+import requests
+
+from etl.extract import api_osm, overpass_cache
+from utils.rate_limiter import TokenBucket
+
+QUERY = '[out:json];(nwr["amenity"="toilets"](48.19,-4.54,48.29,-4.44););out center;'
+BBOX = {"south": 48.19, "west": -4.54, "north": 48.29, "east": -4.44}
+RESPONSE = {"elements": [{"type": "node", "id": 1, "lat": 48.24, "lon": -4.49, "tags": {"amenity": "toilets"}}]}
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("OVERPASS_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_response_round_trips_compressed(cache_dir):
+    overpass_cache.write(QUERY, RESPONSE, BBOX)
+
+    (path,) = cache_dir.glob("*.json.gz")
+    assert path.name.startswith("48.1900_-4.5400_48.2900_-4.4400-")
+    assert overpass_cache.read(QUERY, BBOX, max_age_s=60) == RESPONSE
+    # Même requête aux espaces près (indentation, retours à la ligne) : même entrée.
+    assert overpass_cache.read("\n    " + QUERY.replace(" ", "\n    ") + "\n", BBOX) == RESPONSE
+
+
+def test_stale_entry_is_only_served_without_age_limit(cache_dir):
+    overpass_cache.write(QUERY, RESPONSE, BBOX)
+    _age(next(cache_dir.glob("*.json.gz")), 3600)
+
+    assert overpass_cache.read(QUERY, BBOX, max_age_s=60) is None
+    assert overpass_cache.read(QUERY, BBOX, max_age_s=None) == RESPONSE
+
+
+def test_eviction_removes_least_recently_read_entries(cache_dir):
+    for i in range(3):
+        overpass_cache.write(f"{QUERY}/*{i}*/", RESPONSE)
+    paths = {i: overpass_cache._path(f"{QUERY}/*{i}*/") for i in range(3)}
+    for i, path in paths.items():
+        _age(path, 100 - i)
+    overpass_cache.read(f"{QUERY}/*0*/")  # relue : devient la plus récente
+
+    size = paths[0].stat().st_size
+    assert overpass_cache.evict(2 * size) == 1
+    assert not paths[1].exists()
+    assert paths[0].exists() and paths[2].exists()
+
+
+def test_corrupt_entry_is_a_miss(cache_dir):
+    path = overpass_cache._path(QUERY, BBOX)
+    path.write_bytes(b"pas du gzip")
+    assert overpass_cache.read(QUERY, BBOX) is None
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+    content = orjson.dumps(RESPONSE)
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def overpass(monkeypatch):
+    calls = []
+    monkeypatch.setattr(api_osm, "get_coordinates_for_city", lambda city: (48.24, -4.49))
+    monkeypatch.setattr(api_osm, "_overpass_bucket", TokenBucket(0))
+    monkeypatch.setattr(api_osm.requests, "post", lambda url, **kw: calls.append(url) or FakeResponse())
+    return calls
+
+
+def test_extract_osm_reuses_fresh_cache(overpass):
+    assert api_osm.extract_osm("Crozon") == RESPONSE
+    assert api_osm.extract_osm("Crozon") == RESPONSE
+    assert len(overpass) == 1
+
+    assert api_osm.extract_osm("Crozon", force_refresh=True) == RESPONSE
+    assert len(overpass) == 2
+
+
+def test_extract_osm_offline_never_calls_overpass(overpass, cache_dir):
+    assert api_osm.extract_osm("Crozon", offline=True) is None
+    api_osm.extract_osm("Crozon")
+    _age(next(cache_dir.glob("*.json.gz")), 365 * 24 * 3600)
+
+    assert api_osm.extract_osm("Crozon", offline=True) == RESPONSE
+    assert len(overpass) == 1
+
+
+def test_extract_osm_falls_back_to_stale_cache_when_overpass_is_down(overpass, cache_dir, monkeypatch):
+    api_osm.extract_osm("Crozon")
+    _age(next(cache_dir.glob("*.json.gz")), 365 * 24 * 3600)
+
+    def down(url, **kwargs):
+        raise requests.exceptions.ConnectionError("injoignable")
+
+    monkeypatch.setattr(api_osm.requests, "post", down)
+    assert api_osm.extract_osm("Crozon") == RESPONSE
@@ -0,0 +1,48 @@
+import pytest
+
+from etl.extract import pbf_osm
+from etl.transform.transform_osm import transform_osm
+
+osmium = pytest.importorskip("osmium")
+
+
+@pytest.fixture
+def pbf(tmp_path):
+    """Mini extrait : quelques POI autour de Crozon, et des objets hors sélection."""
+    path = tmp_path / "crozon.osm.pbf"
+    node = osmium.osm.mutable.Node
+    way = osmium.osm.mutable.Way
+    writer = osmium.SimpleWriter(str(path))
+    writer.add_node(node(id=1, location=(-4.4890, 48.2460), tags={"amenity": "drinking_water"}))
+    writer.add_node(node(id=2, location=(-4.4800, 48.2500), tags={"amenity": "bench"}))
+    writer.add_node(node(id=3, location=(-4.4700, 48.2400), tags={"historic": "menhir", "name": "Menhir"}))
+    writer.add_node(node(id=4, location=(-4.5000, 48.2300)))
+    writer.add_node(node(id=5, location=(-4.5100, 48.2500)))
+    writer.add_node(node(id=6, location=(-4.5000, 48.2600), tags={"highway": "bus_stop"}))
+    writer.add_way(way(id=10, nodes=[4, 5, 6, 4], tags={"shop": "bakery", "name": "Boulangerie du Port"}))
+    writer.add_way(way(id=11, nodes=[4, 5], tags={"highway": "path"}))
+    writer.close()
+    return path
+
+
+def test_only_selected_pois_are_read_in_overpass_shape(pbf):
+    elements = pbf_osm.extract_pbf(pbf)["elements"]
+
+    assert sorted((el["type"], el["id"]) for el in elements) == [("node", 1), ("node", 3), ("way", 10)]
+    bakery = next(el for el in elements if el["type"] == "way")
+    # Centre de la bounding box du way, comme "out center" d'Overpass.
+    assert bakery["center"] == pytest.approx({"lat": 48.245, "lon": -4.505})
+
+
+def test_transform_names_pbf_pois_like_overpass_ones(pbf):
+    df = transform_osm(pbf_osm.extract_pbf(pbf), city="Crozon")
+
+    names = dict(zip(df["osm_id"], df["name"]))
+    assert names == {1: "Point d'eau potable", 10: "Boulangerie du Port"}  # menhir : pas de type de POI
+
+
+def test_tag_selection_matches_the_overpass_query():
+    assert pbf_osm.matches_filters({"tourism": "viewpoint"})
+    assert pbf_osm.matches_filters({"historic": "yes"})
+    assert not pbf_osm.matches_filters({"tourism": "hotel"})
+    assert not pbf_osm.matches_filters({"natural": "peak", "name": "Ménez-Hom"})
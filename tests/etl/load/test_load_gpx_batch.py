@@ -0,0 +1,126 @@
+import unicodedata
+from contextlib import contextmanager
+
+import pytest
+
+from etl.load import load_gpx
+
+
+def _collate(value):
+    """Égalité de utf8mb4_unicode_ci : casse et accents ignorés."""
+    return unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode().casefold()
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.cities = {1: "Crozon"}
+        self.sources = {1: "Randonneur"}
+        self.hikes = {}
+        self.queries = []
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+        self.lastrowid = None
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        self.db.queries.append(sql)
+        assert "IN ()" not in sql
+        if sql.startswith("SELECT filename FROM hikes"):
+            self.result = [(name,) for name in self.db.hikes if name in params]
+        elif sql.startswith("SELECT filename, id FROM hikes"):
+            self.result = [(name, hike_id) for name, hike_id in self.db.hikes.items() if name in params]
+        elif sql.startswith("SELECT id FROM cities WHERE name = %s") or sql.startswith("SELECT id FROM sources"):
+            table = self.db.cities if "cities" in sql else self.db.sources
+            self.result = sorted((i,) for i, name in table.items() if _collate(name) == _collate(params[0]))[:1]
+        elif sql.startswith("INSERT INTO cities") or sql.startswith("INSERT INTO sources"):
+            table = self.db.cities if "cities" in sql else self.db.sources
+            self.lastrowid = max(table) + 1
+            table[self.lastrowid] = params[0]
+        else:
+            raise AssertionError(f"requête inattendue : {sql}")
+
+    def executemany(self, sql, rows):
+        sql = " ".join(sql.split())
+        self.db.queries.append(sql)
+        if sql.startswith("INSERT INTO hikes"):
+            for row in rows:
+                self.db.hikes[row[11]] = len(self.db.hikes) + 1
+        elif not sql.startswith("UPDATE hikes"):
+            raise AssertionError(f"requête inattendue : {sql}")
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        pass
+
+
+class FakeCollection:
+    def insert_many(self, docs, ordered):
+        self.docs = docs
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+
+    @contextmanager
+    def connection():
+        yield FakeConnection(db)
+
+    monkeypatch.setattr(load_gpx.MySQLUtils, "connection", connection)
+    monkeypatch.setattr(load_gpx.MongoUtils, "connect", lambda: None)
+    monkeypatch.setattr(load_gpx.MongoUtils, "get_collection", lambda name: FakeCollection())
+    monkeypatch.setattr(load_gpx, "store_raw_gpx", lambda f, fname, trace_id, hike_id: None)
+    monkeypatch.setattr(load_gpx, "remember_city", lambda *args: None)
+    monkeypatch.setattr(load_gpx.city_resolver, "add", lambda *args: None)
+    monkeypatch.setattr(load_gpx.geo_index, "refresh", lambda kind: None)
+    monkeypatch.setattr(load_gpx, "refresh_city_stats_around", lambda points: None)
+    return db
+
+
+def _item(tmp_path, fname, city, author="Randonneur"):
+    path = tmp_path / fname
+    path.write_text("<gpx/>")
+    data = {"name": fname, "description": None, "start_lat": 48.24, "start_lon": -4.49, "distance_km": 5,
+            "estimated_duration_h": 1.5, "denivele_m": 100, "difficulte": "facile", "city_name": city,
+            "author": author, "waypoints": []}
+    return {"fname": fname, "gpx_path": str(path), "fields": {}, "data": data}
+
+
+def test_city_differing_by_case_or_accent_reuses_the_existing_row(db, tmp_path):
+    items = [_item(tmp_path, "a.gpx", "CROZON"), _item(tmp_path, "b.gpx", "Pleyben", author="RANDONNEUR"),
+             _item(tmp_path, "c.gpx", "Pléyben")]
+    new_cities = {name: (48.2, -3.9, "Finistère", "Bretagne", "France") for name in ("CROZON", "Pleyben", "Pléyben")}
+
+    loaded = load_gpx.load_gpx_batch(items, new_cities)
+
+    assert [item["fname"] for item in loaded] == ["a.gpx", "b.gpx", "c.gpx"]
+    assert db.cities == {1: "Crozon", 2: "Pleyben"}
+    assert db.sources == {1: "Randonneur"}
+
+
+def test_batch_filtered_to_nothing_stops_before_inserting(db, tmp_path):
+    loaded = load_gpx.load_gpx_batch([_item(tmp_path, "a.gpx", "Atlantide")], new_cities={})
+
+    assert loaded == []
+    assert not any(query.startswith(("INSERT INTO hikes", "SELECT filename, id")) for query in db.queries)
+    assert (tmp_path / "a.gpx").exists()
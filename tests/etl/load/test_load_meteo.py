@@ -0,0 +1,56 @@
+from etl.load import load_meteo
+
+
+class FakeCursor:
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+        self.batches = []
+
+    def executemany(self, sql, rows):
+        self.batches.append((" ".join(sql.split()), rows))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+
+def install(monkeypatch, rowcount):
+    cursor = FakeCursor(rowcount)
+    cnx = FakeConnection(cursor)
+    invalidated = []
+    monkeypatch.setattr(load_meteo.MySQLUtils, "connect", lambda: cnx)
+    monkeypatch.setattr(load_meteo.MySQLUtils, "disconnect", lambda _: None)
+    monkeypatch.setattr(load_meteo.response_cache, "invalidate", invalidated.append)
+    return cursor, cnx, invalidated
+
+
+ROW = ("2026-10-18", 15.0, 5.0, 0.0, 12.0, 1, 10.0)
+
+
+def test_batch_is_one_upsert_round_trip(monkeypatch):
+    cursor, cnx, invalidated = install(monkeypatch, rowcount=3)
+    written = load_meteo.load_weather_batch({1: [ROW, ROW], 2: [ROW]})
+
+    (upsert_sql, rows), (refresh_sql, refresh_rows) = cursor.batches
+    assert "ON DUPLICATE KEY UPDATE" in upsert_sql and "temp_max_c = VALUES(temp_max_c)" in upsert_sql
+    assert rows == [(1, *ROW), (1, *ROW), (2, *ROW)]
+    assert "weather_refresh" in refresh_sql and refresh_rows == [(1,), (2,)]
+    assert written == 3 and cnx.committed
+    assert invalidated == [load_meteo.response_cache.CITIES_CACHE]
+
+
+def test_unchanged_forecasts_do_not_invalidate_cache(monkeypatch):
+    cursor, cnx, invalidated = install(monkeypatch, rowcount=0)
+    assert load_meteo.load_weather_batch({1: [ROW]}) == 0
+    assert cnx.committed and invalidated == []
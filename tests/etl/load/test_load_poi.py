@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl.load import load_poi
+
+SOURCE_ID, CITY_ID = 3, 5
+
+
+class FakeDatabase:
+    """Tables poi / services / liens en mémoire, et nombre d'allers-retours."""
+
+    def __init__(self):
+        self.poi = {}
+        self.services = [(1, "toilets", "Toilettes")]
+        self.histo = set()
+        self.links = set()
+        self.round_trips = 0
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+
+    def execute(self, sql, params=()):
+        self.db.round_trips += 1
+        sql = " ".join(sql.split())
+        if sql.startswith("SELECT id FROM sources"):
+            self.result = [(SOURCE_ID,)]
+        elif sql.startswith("SELECT id FROM cities"):
+            self.result = [(CITY_ID,)]
+        elif sql.startswith("SELECT original_id, id FROM poi"):
+            source_id, *original_ids = params
+            self.result = [(oid, self.db.poi[(oid, source_id)]) for oid in original_ids
+                           if (oid, source_id) in self.db.poi]
+        elif sql.startswith("SELECT category, name, id FROM services"):
+            rows = [(category, name, sid) for sid, category, name in self.db.services if category in params]
+            self.result = sorted(rows, key=lambda row: -row[2])
+        else:
+            raise AssertionError(f"requête inattendue : {sql}")
+
+    def executemany(self, sql, rows):
+        self.db.round_trips += 1
+        sql = " ".join(sql.split())
+        for row in rows:
+            if sql.startswith("INSERT IGNORE INTO poi "):
+                assert len(row) == 9 and not any(isinstance(v, float) and v != v for v in row)
+                self.db.poi.setdefault((row[0], row[7]), len(self.db.poi) + 1)
+            elif sql.startswith("INSERT INTO services"):
+                self.db.services.append((len(self.db.services) + 1, *row))
+            elif sql.startswith("INSERT IGNORE INTO histo_poi"):
+                self.db.histo.add(row)
+            elif sql.startswith("INSERT IGNORE INTO poi_service"):
+                self.db.links.add(row)
+            else:
+                raise AssertionError(f"requête inattendue : {sql}")
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.committed = False
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.committed = True
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+
+    @contextmanager
+    def connection():
+        yield FakeConnection(db)
+
+    monkeypatch.setattr(load_poi.MySQLUtils, "connection", connection)
+    monkeypatch.setattr(load_poi.geo_index, "refresh", lambda source: None)
+    monkeypatch.setattr(load_poi, "refresh_city_stats_around", lambda points: list(points))
+    return db
+
+
+def _osm_frame(n):
+    return pd.DataFrame({
+        "osm_id": np.arange(n),
+        "name": [f"POI {i}" for i in range(n)],
+        "type": ["toilets", "bakery", "viewpoint"] * (n // 3) + ["toilets"] * (n % 3),
+        "lat": np.full(n, 48.2),
+        "lon": np.full(n, -4.5),
+        "source": "osm",
+        "website": [np.nan if i % 2 else "https://example.org" for i in range(n)],
+    })
+
+
+def test_ten_thousand_pois_take_a_few_dozen_round_trips(db):
+    load_poi.load_osm_poi(_osm_frame(10_000), city_name="Crozon")
+
+    assert len(db.poi) == 10_000
+    assert len(db.histo) == 10_000 and {city for _, city in db.histo} == {CITY_ID}
+    assert len(db.links) == 10_000
+    # Les services manquants sont créés une fois, l'existant est réutilisé.
+    assert sorted(category for _, category, _ in db.services) == ["bakery", "toilets", "viewpoint"]
+    assert db.round_trips < 40
+
+
+def test_reloading_the_same_pois_links_existing_rows(db):
+    df = _osm_frame(30)
+    load_poi.load_osm_poi(df, city_name="Crozon")
+    load_poi.load_osm_poi(df, city_name="Crozon")
+
+    assert len(db.poi) == 30
+    assert len(db.links) == 30
+    assert len(db.services) == 3
+
+
+def test_wikidata_pois_keep_their_image_and_string_ids(db, monkeypatch):
+    inserted = []
+    executemany = FakeCursor.executemany
+
+    def spy(self, sql, rows):
+        if "INTO poi " in sql:
+            inserted.extend(rows)
+        executemany(self, sql, rows)
+
+    monkeypatch.setattr(FakeCursor, "executemany", spy)
+    df = pd.DataFrame({"wikidata_id": ["http://www.wikidata.org/entity/Q1"], "name": ["Phare"],
+                       "description": [None], "type": ["lighthouse"], "lat": [48.3], "lon": [-4.7],
+                       "image_url": ["https://commons.wikimedia.org/phare.jpg"]})
+
+    load_poi.load_wikidata_poi(df, city_name="Crozon")
+
+    (row,) = inserted
+    assert row[0] == "http://www.wikidata.org/entity/Q1"
+    assert row[6] == "https://commons.wikimedia.org/phare.jpg" and row[5] is None
+    assert len(db.links) == 1
@@ -0,0 +1,56 @@
+from etl import bulk_import_gpx
+from etl.bulk_import_gpx import Geocoder, geocode_batch, prepare_file
+
+GPX = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1"><trk><name>01-boucle</name><trkseg>
+<trkpt lat="48.3904" lon="-4.4861"><ele>10</ele></trkpt>
+<trkpt lat="48.4000" lon="-4.4800"><ele>110</ele></trkpt>
+</trkseg></trk></gpx>
+"""
+
+
+def _item(fname, lat, lon):
+    return {"fname": fname, "gpx_path": f"/tmp/{fname}", "fields": {},
+            "data": {"start_lat": lat, "start_lon": lon, "city_name": None}}
+
+
+def test_prepare_file_returns_document_fields_without_point_arrays(tmp_path):
+    path = tmp_path / "boucle.gpx"
+    path.write_text(GPX, encoding="utf-8")
+    item = prepare_file(str(path))
+    assert item["fname"] == "boucle.gpx"
+    assert item["data"]["name"] == "boucle" and item["data"]["denivele_m"] == 100
+    assert {"track", "levels", "bbox", "metrics", "profile"} <= item["fields"].keys()
+    assert "lats" not in item["data"]
+
+
+def test_prepare_file_skips_unreadable_file(tmp_path):
+    path = tmp_path / "casse.gpx"
+    path.write_text("<gpx><trk>", encoding="utf-8")
+    assert prepare_file(str(path)) is None
+
+
+def test_geocode_batch_dedupes_start_points_and_new_cities(monkeypatch):
+    calls = []
+    monkeypatch.setattr(bulk_import_gpx, "resolve_city",
+                        lambda lat, lon: calls.append((lat, lon)) or ("Brest" if lat < 48.5 else None))
+    monkeypatch.setattr(bulk_import_gpx, "get_admin_info_from_coordinates",
+                        lambda lat, lon: ("Finistère", "Bretagne", "France"))
+    monkeypatch.setattr(bulk_import_gpx, "existing_cities", lambda names: set())
+    items = [_item("a.gpx", 48.39041, -4.48612), _item("b.gpx", 48.39043, -4.48608),
+             _item("c.gpx", 48.9, -4.0), _item("d.gpx", None, None)]
+    geocoder = Geocoder()
+    located, new_cities = geocode_batch(items, geocoder)
+    assert [item["fname"] for item in located] == ["a.gpx", "b.gpx"]
+    # a et b partent du même point à ~100 m près : un seul appel ; c n'a pas de ville.
+    assert len(calls) == 2
+    assert new_cities == {"Brest": (48.39041, -4.48612, "Finistère", "Bretagne", "France")}
+    assert geocoder.calls == 3
+
+
+def test_geocode_batch_does_not_recreate_known_city(monkeypatch):
+    monkeypatch.setattr(bulk_import_gpx, "resolve_city", lambda lat, lon: "Brest")
+    monkeypatch.setattr(bulk_import_gpx, "existing_cities", lambda names: {"Brest"})
+    _, new_cities = geocode_batch([_item("a.gpx", 48.39, -4.48)], Geocoder())
+    assert new_cities == {}
+
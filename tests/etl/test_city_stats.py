@@ -0,0 +1,61 @@
+from etl import city_stats
+
+
+class FakeCursor:
+    """Curseur dictionary=True minimal : renvoie `rows` à la première requête."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, sql, params=()):
+        self.queries.append((sql, params))
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+
+def test_read_city_stats_uses_materialized_rows():
+    cursor = FakeCursor([{"city_id": 1, "hikes": 3, "spots": 2, "poi": 7}])
+    stats = city_stats.read_city_stats(cursor, [{"id": 1}], 5)
+    assert stats == {1: {"hikes": 3, "spots": 2, "poi": 7}}
+    assert len(cursor.queries) == 1
+    assert "FROM city_stats" in cursor.queries[0][0]
+
+
+def test_read_city_stats_computes_missing_cities(monkeypatch):
+    computed = {}
+
+    def fake_compute(cursor, cities, distance_km):
+        computed["cities"] = cities
+        return {c["id"]: {"hikes": 1, "spots": 0, "poi": 0} for c in cities}
+
+    monkeypatch.setattr(city_stats, "compute_city_stats", fake_compute)
+    cursor = FakeCursor([{"city_id": 1, "hikes": 3, "spots": 2, "poi": 7}])
+    stats = city_stats.read_city_stats(cursor, [{"id": 1}, {"id": 2}], 5)
+    assert computed["cities"] == [{"id": 2}]
+    assert stats[2] == {"hikes": 1, "spots": 0, "poi": 0}
+    assert stats[1]["poi"] == 7
+
+
+def test_read_city_stats_non_standard_radius():
+    cursor = FakeCursor([])
+    assert city_stats.read_city_stats(cursor, [{"id": 1}], 7) is None
+    assert cursor.queries == []
+
+
+def test_refresh_around_ignores_missing_coordinates(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("aucune requête attendue")
+
+    monkeypatch.setattr(city_stats, "refresh_city_stats", fail)
+    city_stats.refresh_city_stats_around([(None, 2.0), (float("nan"), 1.0)])
+
+
+def test_refresh_around_never_raises(monkeypatch):
+    def broken_connection():
+        raise RuntimeError("MySQL indisponible")
+
+    monkeypatch.setattr(city_stats.MySQLUtils, "connection", broken_connection)
+    city_stats.refresh_city_stats_around([(48.39, -4.48)])
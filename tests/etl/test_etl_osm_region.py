@@ -0,0 +1,74 @@
+from etl import etl_osm_region
+from etl.extract import api_osm
+
+CROZON = api_osm.city_bbox(48.246, -4.489)
+CAMARET = api_osm.city_bbox(48.276, -4.570)
+
+
+def _node(id, lat, lon, **tags):
+    return {"type": "node", "id": id, "lat": lat, "lon": lon, "tags": tags or {"amenity": "toilets"}}
+
+
+def test_query_uses_global_bbox_and_one_clause_per_key():
+    query = api_osm.overpass_query(CROZON)
+
+    assert f"[bbox:{CROZON['south']},{CROZON['west']},{CROZON['north']},{CROZON['east']}]" in query
+    assert query.count("nwr[") == len(api_osm.OSM_TAG_FILTERS)
+    assert 'nwr["amenity"~"^(drinking_water|toilets|' in query
+    assert 'nwr["historic"];' in query
+
+
+def test_neighbouring_cities_share_aligned_tiles():
+    tiles = etl_osm_region.tiles_for([CROZON, CAMARET], tile_deg=0.5)
+    assert tiles == [{"south": 48.0, "west": -5.0, "north": 48.5, "east": -4.5},
+                     {"south": 48.0, "west": -4.5, "north": 48.5, "east": -4.0}]
+
+    # Seules les tuiles qui touchent une ville sont interrogées.
+    assert len(etl_osm_region.tiles_for([CROZON], tile_deg=0.05)) == 9
+
+
+def test_elements_returned_by_several_tiles_are_kept_once():
+    way = {"type": "way", "id": 7, "center": {"lat": 48.25, "lon": -4.5}, "tags": {"shop": "bakery"}}
+    merged = etl_osm_region.merge_elements([
+        {"elements": [_node(1, 48.25, -4.49), way]},
+        {"elements": [way, {**_node(7, 48.26, -4.6)}]},  # node 7 ≠ way 7
+        None,
+    ])
+    assert sorted((el["type"], el["id"]) for el in merged) == [("node", 1), ("node", 7), ("way", 7)]
+
+
+def test_elements_are_assigned_to_every_city_whose_bbox_contains_them():
+    elements = [
+        _node(1, 48.246, -4.489),                                    # Crozon
+        _node(2, 48.270, -4.530),                                    # entre les deux : recouvrement
+        {"type": "way", "id": 3, "center": {"lat": 48.276, "lon": -4.570}, "tags": {"natural": "beach"}},
+        {"type": "relation", "id": 4, "tags": {"historic": "castle"}},  # sans centre : ignorée
+        _node(5, 47.9, -4.0),                                        # hors des deux villes
+    ]
+
+    split = etl_osm_region.split_by_city(elements, {"Crozon": CROZON, "Camaret-sur-Mer": CAMARET})
+
+    assert [el["id"] for el in split["Crozon"]["elements"]] == [1, 2]
+    assert [el["id"] for el in split["Camaret-sur-Mer"]["elements"]] == [2, 3]
+
+
+def test_run_fetches_each_tile_once_and_loads_every_city(monkeypatch):
+    fetched, loaded = [], {}
+    monkeypatch.setattr(etl_osm_region, "_fetch_department_cities",
+                        lambda department: [(1, "Crozon", 48.25, -4.49), (2, "Camaret-sur-Mer", 48.28, -4.6)])
+    monkeypatch.setattr(etl_osm_region, "get_coordinates_for_city",
+                        lambda name: {"Crozon": (48.246, -4.489)}.get(name, (None, None)))
+
+    def extract(tile, label, **kwargs):
+        fetched.append(tile)
+        return {"elements": [_node(1, 48.246, -4.489), _node(2, 48.28, -4.6)]}
+
+    monkeypatch.setattr(etl_osm_region, "extract_bbox", extract)
+    monkeypatch.setattr(etl_osm_region, "load_osm_poi",
+                        lambda df, city_name: loaded.setdefault(city_name, sorted(df["osm_id"])))
+
+    summary = etl_osm_region.run("Finistère", tile_deg=0.5)
+
+    assert len(fetched) == 2
+    assert summary["elements"] == 2
+    assert loaded == {"Crozon": [1], "Camaret-sur-Mer": [2]}
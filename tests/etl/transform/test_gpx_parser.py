@@ -0,0 +1,95 @@
+import tracemalloc
+
+import numpy as np
+
+from etl.transform import gpx_parser
+from etl.transform.gpx_parser import parse_gpx
+
+GPX_11 = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="pytest" xmlns="http://www.topografix.com/GPX/1/1">
+  <metadata>
+    <name>Sample</name>
+    <desc>Description test</desc>
+    <author><name>Rando Club</name></author>
+  </metadata>
+  <wpt lat="48.3950" lon="-4.4830"><ele>60</ele><name>Phare</name><desc>Tourner à gauche</desc></wpt>
+  <trk>
+    <name>01-rando_test</name>
+    <desc>Desc trace</desc>
+    <trkseg>
+      <trkpt lat="48.3904" lon="-4.4861"><ele>10</ele><extensions><hr>120</hr></extensions></trkpt>
+      <trkpt lat="48.4000" lon="-4.4800"><ele>110</ele></trkpt>
+    </trkseg>
+    <trkseg>
+      <trkpt lat="48.4100" lon="-4.4700"></trkpt>
+    </trkseg>
+  </trk>
+</gpx>
+"""
+
+GPX_10 = """<?xml version="1.0"?>
+<gpx version="1.0" creator="pytest" xmlns="http://www.topografix.com/GPX/1/0">
+  <name>Ancien format</name>
+  <desc>Desc 1.0</desc>
+  <author>Jean</author>
+  <trk><trkseg><trkpt lat="45.0" lon="6.0"><ele>1000</ele></trkpt></trkseg></trk>
+</gpx>
+"""
+
+
+def _same(a, b):
+    for key in ("name", "description", "author", "tracks", "track_name", "track_description", "waypoints"):
+        assert a[key] == b[key], key
+    for key in ("lats", "lons", "eles", "segment_starts"):
+        assert np.array_equal(a[key], b[key], equal_nan=True), key
+
+
+def test_stream_matches_gpxpy():
+    streamed = parse_gpx(GPX_11)
+    assert streamed["track_name"] == "01-rando_test"
+    assert streamed["author"] == "Rando Club"
+    assert streamed["segment_starts"].tolist() == [2]
+    assert np.isnan(streamed["eles"][2])
+    _same(streamed, gpx_parser._parse_gpxpy(__import__("io").StringIO(GPX_11)))
+
+
+def test_gpx_10_metadata():
+    parsed = parse_gpx(GPX_10.encode())
+    assert (parsed["name"], parsed["description"], parsed["author"]) == ("Ancien format", "Desc 1.0", "Jean")
+    assert parsed["lats"].tolist() == [45.0] and parsed["eles"].tolist() == [1000.0]
+
+
+def test_falls_back_to_gpxpy_for_leading_whitespace(tmp_path):
+    path = tmp_path / "exotique.gpx"
+    path.write_text("\n\n  " + GPX_11, encoding="utf-8")
+    _same(parse_gpx(path), parse_gpx(GPX_11))
+
+
+def _write_track(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>\n')
+        for i in range(n):
+            f.write(f'<trkpt lat="{48 + i * 1e-6:.7f}" lon="{-4 - i * 1e-6:.7f}"><ele>{i % 300}.5</ele>'
+                    f'<time>2026-10-18T08:00:00Z</time></trkpt>\n')
+        f.write("</trkseg></trk></gpx>\n")
+
+
+def _peak_bytes(path):
+    tracemalloc.start()
+    parsed = parse_gpx(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, len(parsed["lats"])
+
+
+def test_memory_stays_bounded(tmp_path):
+    small, large = tmp_path / "small.gpx", tmp_path / "large.gpx"
+    _write_track(small, 5_000)
+    _write_track(large, 100_000)
+    small_peak, _ = _peak_bytes(small)
+    large_peak, count = _peak_bytes(large)
+    assert count == 100_000
+    # Au-delà des tableaux (3 × 8 octets par point, croissance comprise), rien
+    # ne dépend de la taille du fichier (≈ 10 Mo ici).
+    assert large_peak - small_peak < 95_000 * 24 * 1.5
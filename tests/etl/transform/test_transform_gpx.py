@@ -23,7 +23,7 @@ def test_normalize_name_replaces_tokens() -> None:
 
 
 def test_transform_gpx_returns_none_when_city_not_found(monkeypatch) -> None:
-    monkeypatch.setattr(transform_gpx, "get_city_from_coordinates", lambda *args, **kwargs: None)
+    monkeypatch.setattr(transform_gpx, "resolve_city", lambda *args, **kwargs: None)
 
     result = transform_gpx.transform_gpx(GPX_SAMPLE, "trace.gpx")
 
@@ -31,7 +31,7 @@ def test_transform_gpx_returns_none_when_city_not_found(monkeypatch) -> None:
 
 
 def test_transform_gpx_returns_expected_payload(monkeypatch) -> None:
-    monkeypatch.setattr(transform_gpx, "get_city_from_coordinates", lambda *args, **kwargs: "Brest")
+    monkeypatch.setattr(transform_gpx, "resolve_city", lambda *args, **kwargs: "Brest")
 
     result = transform_gpx.transform_gpx(GPX_SAMPLE, "trace.gpx")
 
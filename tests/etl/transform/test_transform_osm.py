@@ -1,4 +1,9 @@
-from etl.transform.transform_osm import transform_osm
+import random
+
+import pandas as pd
+import pytest
+
+from etl.transform.transform_osm import DEFAULT_NAME_BY_TYPE, build_address_from_tags, transform_osm
 
 
 def test_transform_osm_filters_and_keeps_expected_pois() -> None:
@@ -45,3 +50,101 @@ def test_transform_osm_invalid_payload_returns_empty_dataframe() -> None:
     df = transform_osm({}, city="Brest")
 
     assert df.empty
+
+
+def _reference_transform(osm_json: dict) -> pd.DataFrame:
+    """Ancienne transformation, élément par élément : référence de l'équivalence."""
+    pois = []
+    if not osm_json or 'elements' not in osm_json:
+        return pd.DataFrame()
+    for el in osm_json['elements']:
+        if 'tags' not in el:
+            continue
+        tags = el['tags']
+        if el.get('type') == 'node':
+            lat, lon = el.get('lat'), el.get('lon')
+        else:
+            center = el.get('center') or {}
+            lat, lon = center.get('lat'), center.get('lon')
+        name = tags.get('name') or tags.get('alt_name')
+        poi_type = (
+            tags.get('amenity') or
+            tags.get('tourism') or
+            tags.get('leisure') or
+            tags.get('shop') or
+            ('beach' if tags.get('natural') == 'beach' else None)
+        )
+        website = tags.get('website')
+        description = tags.get('description')
+        address = build_address_from_tags(tags)
+        if not name:
+            name = DEFAULT_NAME_BY_TYPE.get(poi_type)
+        if name and poi_type and lat is not None and lon is not None:
+            if poi_type == 'information' and name != 'Office du tourisme':
+                continue
+            poi = {'osm_id': el.get('id'), 'name': name, 'type': poi_type, 'lat': lat, 'lon': lon, 'source': 'osm'}
+            if website:
+                poi['website'] = website
+            if description:
+                poi['description'] = description
+            if address:
+                poi['address'] = address
+            pois.append(poi)
+    return pd.DataFrame(pois)
+
+
+def random_osm_json(n: int, seed: int = 0) -> dict:
+    """Réponse Overpass synthétique couvrant les cas limites (tags vides, sans centre, sans nom...)."""
+    rng = random.Random(seed)
+    pick = lambda *choices: rng.choice(choices)  # noqa: E731
+    elements = []
+    for i in range(n):
+        tags = {}
+        for key, values in (
+            ("amenity", ("toilets", "drinking_water", "restaurant", "shelter", "")),
+            ("tourism", ("information", "viewpoint", "camp_site", "")),
+            ("leisure", ("picnic_table", "")),
+            ("shop", ("bakery", "supermarket")),
+            ("natural", ("beach", "peak")),
+            ("name", (f"POI {i}", "Office du tourisme", "")),
+            ("alt_name", (f"Alias {i}", "")),
+            ("website", ("https://example.org", "")),
+            ("description", ("Vue sur la baie", "")),
+            ("addr:street", ("Rue du Port", "")),
+            ("addr:housenumber", ("12", "")),
+            ("addr:postcode", ("29160", "")),
+            ("addr:city", ("Crozon", "")),
+        ):
+            if rng.random() < 0.3:
+                tags[key] = pick(*values)
+        kind = pick("node", "node", "way", "relation")
+        el = {"type": kind, "id": i}
+        if kind == "node":
+            if rng.random() < 0.95:
+                el.update(lat=48 + rng.random(), lon=-4 - rng.random())
+        elif rng.random() < 0.9:
+            el["center"] = {"lat": 48 + rng.random(), "lon": -4 - rng.random()}
+        else:
+            el["center"] = pick(None, {})
+        if rng.random() < 0.97:
+            el["tags"] = tags
+        elements.append(el)
+    return {"elements": elements}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_columnar_transform_matches_element_by_element_reference(seed) -> None:
+    osm_json = random_osm_json(2000, seed)
+
+    pd.testing.assert_frame_equal(transform_osm(osm_json, city="Crozon"), _reference_transform(osm_json))
+
+
+@pytest.mark.parametrize("osm_json", [
+    {"elements": []},
+    {"elements": [{"type": "node", "id": 1, "lat": 48.0, "lon": -4.0}]},
+    {"elements": [{"type": "node", "id": 1, "lat": 48.0, "lon": -4.0, "tags": {"highway": "bus_stop"}}]},
+    {"elements": [{"type": "way", "id": 2, "center": {"lat": 48.0, "lon": -4.0},
+                   "tags": {"amenity": "toilets", "addr:street": "Quai", "addr:city": "Morgat"}}]},
+])
+def test_columnar_transform_matches_reference_on_edge_cases(osm_json) -> None:
+    pd.testing.assert_frame_equal(transform_osm(osm_json, city="Crozon"), _reference_transform(osm_json))
@@ -0,0 +1,79 @@
+import pytest
+
+from services import city_resolver
+from services.geo_index import GeoIndex
+
+CITIES = [(1, "Crozon", 48.2460, -4.4890), (2, "Camaret-sur-Mer", 48.2760, -4.5950)]
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    fetched, geocoded = [], []
+
+    def fetch(after_id):
+        fetched.append(after_id)
+        return [row for row in CITIES if row[0] > after_id]
+
+    monkeypatch.setattr(city_resolver, "_index", GeoIndex())
+    monkeypatch.setattr(city_resolver, "_names", {})
+    monkeypatch.setattr(city_resolver, "_refreshed_at", None)
+    monkeypatch.setattr(city_resolver, "_counters", {"snapped": 0, "geocoded": 0})
+    monkeypatch.setattr(city_resolver, "_fetch_cities", fetch)
+    monkeypatch.setattr(city_resolver, "get_city_from_coordinates",
+                        lambda lat, lon, language: geocoded.append((lat, lon)) or "Telgruc-sur-Mer")
+    monkeypatch.delenv("CITY_SNAP_RADIUS_KM", raising=False)
+    return {"fetched": fetched, "geocoded": geocoded}
+
+
+def test_start_near_a_known_city_needs_no_geocoding(resolver):
+    # ~500 m du départ enregistré pour Crozon
+    assert city_resolver.resolve_city(48.2500, -4.4860) == "Crozon"
+    assert resolver["geocoded"] == []
+    assert city_resolver.stats()["snapped"] == 1
+
+
+def test_start_far_from_known_cities_falls_back_to_nominatim(resolver):
+    assert city_resolver.resolve_city(48.1900, -4.4300) == "Telgruc-sur-Mer"
+    assert resolver["geocoded"] == [(48.1900, -4.4300)]
+
+
+def test_radius_is_configurable_and_zero_disables_snapping(resolver, monkeypatch):
+    monkeypatch.setenv("CITY_SNAP_RADIUS_KM", "0.2")
+    assert city_resolver.resolve_city(48.2500, -4.4860) == "Telgruc-sur-Mer"
+
+    monkeypatch.setenv("CITY_SNAP_RADIUS_KM", "0")
+    assert city_resolver.resolve_city(48.2460, -4.4890) == "Telgruc-sur-Mer"
+    assert len(resolver["geocoded"]) == 2
+
+
+def test_nearest_of_two_cities_wins(resolver):
+    name, distance_km = city_resolver.nearest_city(48.2700, -4.5800, max_km=5)
+    assert name == "Camaret-sur-Mer"
+    assert distance_km < 1.5
+
+
+def test_cities_are_read_once_then_incrementally(resolver, monkeypatch):
+    city_resolver.nearest_city(48.25, -4.49)
+    city_resolver.nearest_city(48.25, -4.49)
+    assert resolver["fetched"] == [0]
+
+    cities_after = CITIES + [(3, "Morgat", 48.2270, -4.4980)]
+    monkeypatch.setattr(city_resolver, "_fetch_cities", lambda after_id: [r for r in cities_after if r[0] > after_id])
+    monkeypatch.setattr(city_resolver, "_refreshed_at", city_resolver._refreshed_at - city_resolver.REFRESH_INTERVAL_S)
+    assert city_resolver.nearest_city(48.2270, -4.4980)[0] == "Morgat"
+
+
+def test_city_created_by_a_loader_is_snapped_right_away(resolver):
+    city_resolver.add(9, "Landévennec", 48.2910, -4.3160)  # index pas encore chargé : ignoré
+    assert city_resolver.nearest_city(48.2910, -4.3160) is None
+
+    city_resolver.add(9, "Landévennec", 48.2910, -4.3160)
+    assert city_resolver.nearest_city(48.2910, -4.3160)[0] == "Landévennec"
+
+
+def test_unreachable_database_falls_back_to_nominatim(resolver, monkeypatch):
+    def down(after_id):
+        raise ConnectionError("MySQL")
+
+    monkeypatch.setattr(city_resolver, "_fetch_cities", down)
+    assert city_resolver.resolve_city(48.2500, -4.4860) == "Telgruc-sur-Mer"
@@ -0,0 +1,183 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from services import geo_index
+from services.geo_index import GeoIndex
+from utils.geo_utils import haversine_distance_km
+
+BREST = (48.3904, -4.4861)
+
+
+def random_points(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = BREST[0] + rng.uniform(-0.3, 0.3, n)
+    lons = BREST[1] + rng.uniform(-0.4, 0.4, n)
+    return np.arange(1, n + 1), lats, lons
+
+
+def brute_force(ids, lats, lons, lat, lon):
+    return sorted(
+        ((int(i), haversine_distance_km(lat, lon, la, lo)) for i, la, lo in zip(ids, lats, lons)),
+        key=lambda item: item[1],
+    )
+
+
+def test_within_radius_matches_exact_circle() -> None:
+    ids, lats, lons = random_points()
+    index = GeoIndex()
+    index.load(ids, lats, lons)
+
+    result = index.within_radius(*BREST, 5)
+
+    expected = [(i, d) for i, d in brute_force(ids, lats, lons, *BREST) if d <= 5]
+    assert [i for i, _ in result] == [i for i, _ in expected]
+    assert np.allclose([d for _, d in result], [d for _, d in expected])
+
+
+def test_within_radius_excludes_bounding_box_corners() -> None:
+    # Coin de la bounding box d'un rayon de 5 km : dans le carré, hors du cercle.
+    index = GeoIndex()
+    index.load([1, 2], [BREST[0], BREST[0] + 0.04], [BREST[1], BREST[1] + 0.06])
+
+    assert [i for i, _ in index.within_radius(*BREST, 5)] == [1]
+
+
+def test_nearest_returns_k_closest() -> None:
+    ids, lats, lons = random_points()
+    index = GeoIndex()
+    index.load(ids, lats, lons)
+
+    result = index.nearest(*BREST, k=7)
+
+    assert [i for i, _ in result] == [i for i, _ in brute_force(ids, lats, lons, *BREST)[:7]]
+
+
+def test_add_is_incremental_and_ignores_known_ids() -> None:
+    index = GeoIndex()
+    index.load([1], [BREST[0]], [BREST[1]])
+
+    index.add([1, 2], [0.0, BREST[0] + 0.001], [0.0, BREST[1]])
+
+    assert len(index) == 2
+    assert index.max_id == 2
+    assert [i for i, _ in index.within_radius(*BREST, 1)] == [1, 2]
+
+
+def test_radius_filter_uses_index_ids_when_loaded(monkeypatch) -> None:
+    index = GeoIndex()
+    index.load([3, 4], [BREST[0], 40.0], [BREST[1], 2.0])
+    monkeypatch.setattr(geo_index, "_indexes", {"spots": index})
+    monkeypatch.setattr(geo_index, "_loaded", {"spots"})
+    monkeypatch.setattr(geo_index, "_checked_at", {"spots": float("inf")})
+
+    where, params = geo_index.radius_filter("spots", "s.id", "s.location", *BREST, 5)
+
+    assert where == "s.id IN (%s)"
+    assert params == (3,)
+
+
+def test_radius_filter_falls_back_to_spatial_sql(monkeypatch) -> None:
+    monkeypatch.setattr(geo_index, "_loaded", set())
+
+    where, params = geo_index.radius_filter("poi", "p.id", "p.location", *BREST, 5)
+
+    assert "ST_Distance_Sphere(p.location" in where
+    assert where.count("%s") == len(params)
+
+
+@pytest.fixture
+def spots_table(monkeypatch):
+    """Table spots en mémoire {id: (lat, lon)}, modifiable comme par un ETL d'un autre processus."""
+    table = {1: (BREST[0], BREST[1]), 2: (BREST[0] + 0.01, BREST[1])}
+    fetches = []
+
+    def fetch_points(kind, after_id=0, cnx=None):
+        fetches.append(after_id)
+        rows = sorted((i, *coords) for i, coords in table.items() if i > after_id)
+        return tuple(zip(*rows)) if rows else ([], [], [])
+
+    def fingerprint(kind, known_max_id, cnx=None):
+        known = [i for i in table if i <= known_max_id]
+        checksum = 0
+        for i in known:
+            checksum ^= zlib.crc32(f"{i},{table[i][0]},{table[i][1]}".encode())
+        return max(table, default=0), (len(known), checksum)
+
+    monkeypatch.setattr(geo_index, "_fetch_points", fetch_points)
+    monkeypatch.setattr(geo_index, "_fingerprint", fingerprint)
+    monkeypatch.setattr(geo_index, "_indexes", {"spots": GeoIndex()})
+    monkeypatch.setattr(geo_index, "_loaded", set())
+    monkeypatch.setattr(geo_index, "_fingerprints", {})
+    monkeypatch.setattr(geo_index, "_checked_at", {})
+    monkeypatch.setattr(geo_index, "SOURCES", {"spots": geo_index.SOURCES["spots"]})
+    geo_index.load_all()
+    fetches.clear()
+    return table, fetches
+
+
+def _spot_ids(index):
+    return [i for i, _ in index.within_radius(*BREST, 5)]
+
+
+def test_rows_inserted_by_another_process_are_added_after_the_interval(spots_table, monkeypatch) -> None:
+    table, fetches = spots_table
+    table[3] = (BREST[0] + 0.02, BREST[1])
+
+    assert _spot_ids(geo_index.get_index("spots")) == [1, 2]  # vérifié il y a moins de REFRESH_INTERVAL_S
+
+    monkeypatch.setattr(geo_index, "REFRESH_INTERVAL_S", 0)
+    assert _spot_ids(geo_index.get_index("spots")) == [1, 2, 3]
+    assert fetches == [2]  # incrémental : seules les lignes d'id > 2 sont relues
+
+
+def test_deleted_or_moved_rows_rebuild_the_index(spots_table, monkeypatch) -> None:
+    table, fetches = spots_table
+    monkeypatch.setattr(geo_index, "REFRESH_INTERVAL_S", 0)
+
+    del table[1]
+    assert _spot_ids(geo_index.get_index("spots")) == [2]
+
+    table[2] = (40.0, 2.0)
+    assert _spot_ids(geo_index.get_index("spots")) == []
+    assert fetches == [0, 0]
+
+
+def test_refresh_syncs_immediately_and_survives_database_errors(spots_table, monkeypatch) -> None:
+    table, _ = spots_table
+    table[3] = (BREST[0] + 0.02, BREST[1])
+
+    geo_index.refresh("spots")
+    assert _spot_ids(geo_index.get_index("spots")) == [1, 2, 3]
+
+    def unreachable(kind, known_max_id, cnx=None):
+        raise ConnectionError("MySQL indisponible")
+
+    monkeypatch.setattr(geo_index, "_fingerprint", unreachable)
+    monkeypatch.setattr(geo_index, "REFRESH_INTERVAL_S", 0)
+    geo_index.refresh("spots")
+    assert _spot_ids(geo_index.get_index("spots")) == [1, 2, 3]
+
+
+def test_caller_connection_is_reused_instead_of_a_second_checkout(monkeypatch) -> None:
+    class Cursor:
+        def execute(self, sql, params):
+            self.rows = [(7, BREST[0], BREST[1])]
+
+        def fetchall(self):
+            return self.rows
+
+        def close(self):
+            pass
+
+    class Connection:
+        def cursor(self, **kwargs):
+            return Cursor()
+
+    def no_checkout():
+        raise AssertionError("connexion empruntée au pool alors que l'appelant en tient une")
+
+    monkeypatch.setattr(geo_index.MySQLUtils, "connect", no_checkout)
+
+    assert geo_index._fetch_points("spots", cnx=Connection()) == ((7,), (BREST[0],), (BREST[1],))
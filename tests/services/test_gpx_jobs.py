@@ -0,0 +1,135 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from services import gpx_jobs
+
+USER = {"user_id": 7, "username": "contrib"}
+
+
+class InlineExecutor:
+    """Exécute les tâches tout de suite, dans le thread du test."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    calls = {"loaded": [], "weather": [], "scraping": [], "audit": []}
+    monkeypatch.setattr(gpx_jobs, "_jobs", gpx_jobs.OrderedDict())
+    monkeypatch.setattr(gpx_jobs, "_executor", InlineExecutor())
+    monkeypatch.setattr(gpx_jobs, "_scraping_executor", InlineExecutor())
+    monkeypatch.setattr(gpx_jobs, "gpx_already_in_mysql", lambda fname: False)
+    monkeypatch.setattr(gpx_jobs, "summarize_gpx",
+                        lambda path, fname: {"start_lat": 48.3, "start_lon": -4.5, "city_name": None})
+    monkeypatch.setattr(gpx_jobs, "resolve_city", lambda lat, lon: "Crozon")
+    monkeypatch.setattr(gpx_jobs, "load_gpx_data",
+                        lambda data, path, verifie: calls["loaded"].append((data["city_name"], verifie)) or data["city_name"])
+    monkeypatch.setattr(gpx_jobs, "extract_weather_data", lambda city, lat, lon: {"city": city})
+    monkeypatch.setattr(gpx_jobs, "load_weather_data", lambda data, city: calls["weather"].append(city))
+    monkeypatch.setattr(gpx_jobs, "scraping_background", calls["scraping"].append)
+    monkeypatch.setattr(gpx_jobs, "insert_auth_log", lambda **kw: calls["audit"].append(kw["action"]))
+    return calls
+
+
+def test_job_runs_every_stage_for_its_file(pipeline):
+    job_id = gpx_jobs.submit(Path("/data/crozon.gpx"), verifie=0, user=USER)
+
+    job = gpx_jobs.get_job(job_id)
+    assert job["status"] == "succeeded"
+    assert job["city"] == "Crozon"
+    assert [s["stage"] for s in job["stages"]] == ["queued", "parsing", "geocoding", "loading", "weather", "done"]
+    assert pipeline["loaded"] == [("Crozon", 0)]
+    assert pipeline["weather"] == ["Crozon"]
+    assert pipeline["scraping"] == ["Crozon"]
+    assert pipeline["audit"] == []
+
+
+def test_job_without_city_fails_before_loading(pipeline, monkeypatch):
+    monkeypatch.setattr(gpx_jobs, "resolve_city", lambda lat, lon: None)
+
+    job = gpx_jobs.get_job(gpx_jobs.submit(Path("/data/mer.gpx"), verifie=1, user=USER))
+
+    assert job["status"] == "failed"
+    assert job["stage"] == "geocoding"
+    assert pipeline["loaded"] == []
+    assert pipeline["audit"] == ["upload_gpx_failed"]
+
+
+def test_stage_error_is_reported_on_the_job(pipeline, monkeypatch):
+    def broken(data, path, verifie):
+        raise RuntimeError("MySQL indisponible")
+
+    monkeypatch.setattr(gpx_jobs, "load_gpx_data", broken)
+
+    job = gpx_jobs.get_job(gpx_jobs.submit(Path("/data/crozon.gpx"), verifie=1, user=USER))
+
+    assert job["status"] == "failed"
+    assert job["stage"] == "loading"
+    assert "MySQL indisponible" in job["message"]
+    assert pipeline["audit"] == ["upload_gpx_failed"]
+
+
+def test_weather_failure_does_not_fail_the_import(pipeline, monkeypatch):
+    def no_weather(city, lat, lon):
+        raise TimeoutError("Open-Meteo")
+
+    monkeypatch.setattr(gpx_jobs, "extract_weather_data", no_weather)
+
+    job = gpx_jobs.get_job(gpx_jobs.submit(Path("/data/crozon.gpx"), verifie=1, user=USER))
+
+    assert job["status"] == "succeeded"
+
+
+def test_registry_keeps_only_the_latest_jobs(pipeline, monkeypatch):
+    monkeypatch.setattr(gpx_jobs, "MAX_JOBS", 2)
+    ids = [gpx_jobs.submit(Path(f"/data/{i}.gpx"), verifie=1, user=USER) for i in range(3)]
+
+    assert gpx_jobs.get_job(ids[0]) is None
+    assert all(gpx_jobs.get_job(job_id) for job_id in ids[1:])
+
+
+def test_city_already_waiting_for_scraping_is_not_queued_twice(monkeypatch):
+    queued = []
+
+    class Recorder:
+        def submit(self, fn, city):
+            queued.append(city)
+
+    monkeypatch.setattr(gpx_jobs, "_scraping_executor", Recorder())
+    monkeypatch.setattr(gpx_jobs, "_scraping_pending", set())
+
+    gpx_jobs.schedule_scraping("Crozon")
+    gpx_jobs.schedule_scraping("Crozon")
+    gpx_jobs.schedule_scraping("Morgat")
+
+    assert queued == ["Crozon", "Morgat"]
+
+
+def test_submit_returns_before_processing(pipeline, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(gpx_jobs, "_executor", gpx_jobs.ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(gpx_jobs, "summarize_gpx", lambda path, fname: release.wait(5) and {
+        "start_lat": 48.3, "start_lon": -4.5, "city_name": None})
+
+    job_id = gpx_jobs.submit(Path("/data/lent.gpx"), verifie=1, user=USER)
+    assert gpx_jobs.get_job(job_id)["status"] in ("queued", "running")
+
+    release.set()
+    gpx_jobs._executor.shutdown(wait=True)
+    assert gpx_jobs.get_job(job_id)["status"] == "succeeded"
+
+
+def test_already_imported_file_is_discarded_without_reloading(pipeline, monkeypatch, tmp_path):
+    upload = tmp_path / "crozon.gpx"
+    upload.write_text("<gpx/>")
+    monkeypatch.setattr(gpx_jobs, "gpx_already_in_mysql", lambda fname: fname == "crozon.gpx")
+
+    job = gpx_jobs.get_job(gpx_jobs.submit(upload, verifie=0, user=USER))
+
+    assert job["status"] == "failed"
+    assert "déjà été importé" in job["message"]
+    assert not upload.exists()
+    assert pipeline["loaded"] == pipeline["weather"] == pipeline["scraping"] == []
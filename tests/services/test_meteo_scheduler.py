@@ -0,0 +1,64 @@
+from datetime import date, datetime, timedelta
+
+from services import meteo_scheduler
+from services.meteo_scheduler import MeteoScheduler, is_stale, stale_cities
+
+TODAY = date(2026, 10, 18)
+NOW = datetime(2026, 10, 18, 12, 0)
+MAX_AGE = timedelta(hours=6)
+
+
+def city(city_id, last_date=TODAY + timedelta(days=6), refreshed_at=NOW, active=0):
+    return {
+        "id": city_id, "name": f"Ville {city_id}", "latitude": 48.0, "longitude": -4.0,
+        "last_forecast_date": last_date, "refreshed_at": refreshed_at, "active_plan": active,
+    }
+
+
+def test_fresh_city_is_not_stale():
+    assert not is_stale(city(1), TODAY, NOW, MAX_AGE)
+
+
+def test_short_horizon_or_old_refresh_is_stale():
+    assert is_stale(city(1, last_date=TODAY + timedelta(days=5)), TODAY, NOW, MAX_AGE)
+    assert is_stale(city(1, last_date=None, refreshed_at=None), TODAY, NOW, MAX_AGE)
+    assert is_stale(city(1, refreshed_at=NOW - timedelta(hours=7)), TODAY, NOW, MAX_AGE)
+    assert is_stale(city(1, refreshed_at=None), TODAY, NOW, MAX_AGE)
+
+
+def test_active_plans_first_then_shortest_horizon():
+    cities = [
+        city(1, last_date=TODAY),
+        city(2, last_date=None),
+        city(3, last_date=TODAY + timedelta(days=3), active=1),
+        city(4),
+    ]
+    assert [c["id"] for c in stale_cities(cities, TODAY, NOW, MAX_AGE)] == [3, 2, 1]
+
+
+def test_cycle_refreshes_stale_cities_in_priority_batches(monkeypatch):
+    batches = []
+
+    def fake_etl_batch(cities):
+        batches.append([c["name"] for c in cities])
+        return {
+            "refreshed": [c["name"] for c in cities if c["name"] != "Ville 2"],
+            "failed": [c["name"] for c in cities if c["name"] == "Ville 2"],
+        }
+
+    monkeypatch.setattr(meteo_scheduler, "BATCH_SIZE", 2)
+    monkeypatch.setattr(meteo_scheduler, "PAUSE_BETWEEN_BATCHES_S", 0)
+    monkeypatch.setattr(meteo_scheduler, "run_meteo_etl_batch", fake_etl_batch)
+    monkeypatch.setattr(meteo_scheduler, "fetch_freshness", lambda: [
+        city(1, last_date=None), city(2, last_date=None),
+        city(3, last_date=date.today() + timedelta(days=6), refreshed_at=datetime.now()),
+        city(4, last_date=None, active=1),
+    ])
+    scheduler = MeteoScheduler()
+    scheduler._refresh_stale()
+
+    assert batches == [["Ville 4", "Ville 1"], ["Ville 2"]]
+    state = scheduler.state()
+    assert (state["cities_total"], state["cities_stale"]) == (4, 3)
+    assert (state["last_cycle_refreshed"], state["last_cycle_failed"]) == (2, 1)
+    assert state["cycles"] == 1 and state["current_batch"] is None
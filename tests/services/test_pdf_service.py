@@ -6,6 +6,7 @@ textes composés à partir des données du séjour et le balisage des descriptif
 """
 from services.pdf_service import (
     _cover_subtitle,
+    _elevation_profile_svg,
     _fr_int,
     _fr_measure,
     _fr_number,
@@ -108,3 +109,17 @@ def test_vany_note_repli_quand_rien_ne_se_distingue() -> None:
     note = vany_note({"city_name": "Rennes"}, days, {"days": 1, "elevation_m": 80})
     assert "flâner" in note["text"]
     assert note["text"].endswith("On se retrouve sur RandoVanGo pour le prochain voyage.")
+
+
+# --- Profil altimétrique ---
+
+def test_elevation_profile_svg_met_a_l_echelle() -> None:
+    svg = _elevation_profile_svg([(0.0, 100.0), (1.0, 200.0), (2.0, 100.0)], size=(200, 112))
+    # Altitude max en haut (marge de 6), min en bas, distance sur toute la largeur.
+    assert '<polyline points="0.0,106.0 100.0,6.0 200.0,106.0"' in svg
+
+
+def test_elevation_profile_svg_vide_sans_profil() -> None:
+    assert _elevation_profile_svg([]) == ""
+    assert _elevation_profile_svg([(0.0, 12.0)]) == ""
+
@@ -0,0 +1,74 @@
+import pytest
+
+from services import response_cache
+from services.response_cache import DiskBackend, MemoryBackend, ResponseCache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("RESPONSE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(response_cache, "_caches", {})
+    return tmp_path
+
+
+@pytest.fixture(params=["memory", "disk"])
+def cache(request, cache_dir):
+    backend = MemoryBackend() if request.param == "memory" else DiskBackend(cache_dir / "cities")
+    return ResponseCache("cities", backend)
+
+
+def test_hit_after_set_and_counters(cache):
+    key = cache.key("5", "2026-10-18")
+    assert cache.get(key) is None
+    cache.set(key, b"[]")
+    assert cache.get(key) == b"[]"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_key_depends_on_parts(cache):
+    cache.set(cache.key("5", "2026-10-18"), b"a")
+    assert cache.get(cache.key("10", "2026-10-18")) is None
+    assert cache.get(cache.key("5", "2026-10-19")) is None
+
+
+def test_invalidate_changes_generation(cache):
+    key = cache.key("5", "2026-10-18")
+    cache.set(key, b"a")
+    response_cache.invalidate("cities")
+    assert cache.key("5", "2026-10-18") != key
+    assert cache.get(cache.key("5", "2026-10-18")) is None
+
+
+def test_invalidate_during_computation_keeps_stale_body_unreachable(cache):
+    # La clé est prise avant le calcul : une écriture pendant celui-ci ne doit
+    # pas laisser la réponse périmée visible sous la nouvelle génération.
+    key = cache.key("5", "2026-10-18")
+    response_cache.invalidate("cities")
+    cache.set(key, b"stale")
+    assert cache.get(cache.key("5", "2026-10-18")) is None
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    backend.get("a")
+    backend.set("c", b"3")
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+
+
+def test_disk_backend_bounded(cache_dir):
+    backend = DiskBackend(cache_dir / "bounded", max_entries=2)
+    for i in range(4):
+        backend.set(f"k{i}", b"x")
+    assert len(list((cache_dir / "bounded").glob("*.json"))) == 2
+
+
+def test_get_cache_uses_configured_backend(monkeypatch):
+    monkeypatch.setenv("RESPONSE_CACHE_BACKEND", "disk")
+    cache = response_cache.get_cache("cities")
+    assert isinstance(cache.backend, DiskBackend)
+    assert response_cache.get_cache("cities") is cache
+    assert response_cache.all_stats()["cities"]["backend"] == "DiskBackend"
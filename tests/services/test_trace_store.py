@@ -0,0 +1,86 @@
+import numpy as np
+from bson import ObjectId
+
+from services import trace_store
+
+
+class FakeBucket:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def open_download_stream(self, file_id):
+        return self.chunks[file_id]
+
+
+def test_open_raw_gpx_streams_gridfs_chunks(monkeypatch):
+    file_id = ObjectId()
+    monkeypatch.setattr(trace_store, "_find", lambda mongo_id, projection: {"filename": "a.gpx", "gpx_file_id": file_id})
+    monkeypatch.setattr(trace_store, "_bucket", lambda: FakeBucket({file_id: [b"<gpx>", b"</gpx>"]}))
+    filename, chunks = trace_store.open_raw_gpx(str(ObjectId()))
+    assert filename == "a.gpx"
+    assert b"".join(chunks) == b"<gpx></gpx>"
+
+
+def test_open_raw_gpx_falls_back_to_embedded_content(monkeypatch):
+    docs = [{"filename": "ancien.gpx"}, {"gpx_content": "<gpx>é</gpx>"}]
+    monkeypatch.setattr(trace_store, "_find", lambda mongo_id, projection: docs.pop(0))
+    filename, chunks = trace_store.open_raw_gpx(str(ObjectId()))
+    assert filename == "ancien.gpx"
+    assert b"".join(chunks) == "<gpx>é</gpx>".encode("utf-8")
+
+
+def test_open_raw_gpx_missing_trace(monkeypatch):
+    monkeypatch.setattr(trace_store, "_find", lambda mongo_id, projection: None)
+    assert trace_store.open_raw_gpx(str(ObjectId())) is None
+
+
+def _projecting_find(doc, projections):
+    """Double de _find appliquant les projections de niveaux utilisées par fetch_trace."""
+    def find(mongo_id, projection):
+        projections.append(projection)
+        levels = projection.get("levels")
+        if isinstance(levels, dict):
+            start, count = levels["$slice"]
+            return {"bbox": doc["bbox"], "levels": doc["levels"][start:start + count]}
+        if "levels.max_points" in projection:
+            return {"bbox": doc["bbox"], "levels": [{"max_points": lvl["max_points"], "tolerance_m": lvl["tolerance_m"]}
+                                                     for lvl in doc["levels"]]}
+        return doc
+    return find
+
+
+def test_fetch_trace_decodes_packed_level(monkeypatch):
+    lats = [48.0 + i * 1e-4 for i in range(20)]
+    lons = [-4.0 + (i % 2) * 1e-3 for i in range(20)]
+    doc = trace_store.level_fields(lats, lons)
+    monkeypatch.setattr(trace_store, "_find", _projecting_find(doc, []))
+    got_lats, got_lons = trace_store.fetch_trace(str(ObjectId()), tolerance_m=1e6)
+    # Tolérance énorme : le niveau le plus grossier (tracé entier ici, 20 points).
+    assert np.allclose(got_lats, lats, atol=1e-6) and np.allclose(got_lons, lons, atol=1e-6)
+
+
+def test_fetch_trace_reads_only_the_chosen_level(monkeypatch):
+    rng = np.random.default_rng(5)
+    lats = 48.0 + np.cumsum(rng.normal(0, 1e-4, 3000))
+    lons = -4.0 + np.cumsum(rng.normal(0, 1e-4, 3000))
+    doc = trace_store.level_fields(lats, lons)
+    projections = []
+    monkeypatch.setattr(trace_store, "_find", _projecting_find(doc, projections))
+
+    tolerance = doc["levels"][1]["tolerance_m"]
+    got_lats, _ = trace_store.fetch_trace(str(ObjectId()), tolerance_m=tolerance)
+
+    # Métadonnées sans points, puis le seul niveau intermédiaire.
+    assert "levels" not in projections[0]
+    assert projections[1]["levels"] == {"$slice": [1, 1]}
+    expected, _, _ = trace_store.decode_track(doc["levels"][1]["track"])
+    assert np.allclose(got_lats, expected)
+
+
+def test_full_points_read_both_formats(monkeypatch):
+    legacy = {"points": [{"lat": 1.5, "lon": 2.5}, {"lat": 1.6, "lon": 2.6}]}
+    packed = trace_store.trace_fields([1.5, 1.6], [2.5, 2.6])
+    for doc in (legacy, packed):
+        monkeypatch.setattr(trace_store, "_find", lambda mongo_id, projection, doc=doc: doc)
+        lats, lons = trace_store.fetch_trace(str(ObjectId()))
+        assert np.allclose(lats, [1.5, 1.6]) and np.allclose(lons, [2.5, 2.6])
@@ -0,0 +1,108 @@
+import pytest
+from mysql.connector.errors import PoolError
+
+from utils import db_utils
+from utils.db_utils import MySQLUtils
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.rolled_back = False
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    """Double du pool mysql.connector : lève PoolError tant que `busy_calls` > 0."""
+
+    pool_size = 2
+
+    def __init__(self, busy_calls=0):
+        self.busy_calls = busy_calls
+        self.connections = []
+
+    def get_connection(self):
+        if self.busy_calls:
+            self.busy_calls -= 1
+            raise PoolError("pool exhausted")
+        cnx = FakeConnection()
+        self.connections.append(cnx)
+        return cnx
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    def install(busy_calls=0, timeout_s=1.0):
+        pool = FakePool(busy_calls)
+        monkeypatch.setattr(MySQLUtils, "_pool", pool)
+        monkeypatch.setattr(MySQLUtils, "_pool_timeout_s", timeout_s)
+        monkeypatch.setattr(MySQLUtils, "_stats", {"checkouts": 0, "waits": 0, "timeouts": 0, "wait_time_s": 0.0})
+        monkeypatch.setattr(db_utils, "POOL_RETRY_INTERVAL_S", 0)
+        return pool
+    return install
+
+
+def test_connect_waits_for_a_free_connection(fake_pool) -> None:
+    pool = fake_pool(busy_calls=3)
+
+    cnx = MySQLUtils.connect()
+
+    assert cnx is pool.connections[0]
+    assert MySQLUtils._stats["checkouts"] == 1
+    assert MySQLUtils._stats["waits"] == 1
+    assert MySQLUtils._stats["timeouts"] == 0
+
+
+def test_connect_raises_after_pool_timeout(fake_pool) -> None:
+    fake_pool(busy_calls=10**9, timeout_s=0)
+
+    with pytest.raises(PoolError):
+        MySQLUtils.connect()
+
+    assert MySQLUtils._stats["timeouts"] == 1
+    assert MySQLUtils._stats["checkouts"] == 0
+
+
+def test_connection_context_releases_and_rolls_back_on_error(fake_pool) -> None:
+    pool = fake_pool()
+
+    with pytest.raises(ValueError):
+        with MySQLUtils.connection():
+            raise ValueError("requête en échec")
+
+    cnx = pool.connections[0]
+    assert cnx.rolled_back
+    assert cnx.closed
+
+
+def test_get_db_dependency_releases_connection(fake_pool) -> None:
+    pool = fake_pool()
+
+    dependency = db_utils.get_db()
+    cnx = next(dependency)
+    assert not cnx.closed
+    with pytest.raises(StopIteration):
+        next(dependency)
+
+    assert pool.connections[0].closed
+
+
+def test_helpers_release_their_connection_when_the_query_fails(fake_pool, monkeypatch) -> None:
+    pool = fake_pool()
+
+    class FailingCursor:
+        def execute(self, *args):
+            raise RuntimeError("MySQL a coupé la connexion")
+
+    monkeypatch.setattr(FakeConnection, "cursor", lambda self, *args, **kwargs: FailingCursor(), raising=False)
+
+    for _ in range(pool.pool_size + 1):
+        with pytest.raises(RuntimeError):
+            db_utils.gpx_already_in_mysql("trace.gpx")
+
+    assert all(cnx.closed for cnx in pool.connections)
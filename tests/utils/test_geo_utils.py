@@ -1,4 +1,4 @@
-from utils.geo_utils import get_bounding_box
+from utils.geo_utils import bounding_box_wkt, get_bounding_box, spatial_radius_clause, spatial_radius_params
 
 
 def test_get_bounding_box_orders_bounds() -> None:
@@ -13,3 +13,22 @@ def test_get_bounding_box_zero_distance_returns_same_point() -> None:
 
     assert min_lat == max_lat == 48.39
     assert min_lon == max_lon == -4.49
+
+
+def test_bounding_box_wkt_is_a_closed_long_lat_polygon() -> None:
+    wkt = bounding_box_wkt(48.39, -4.49, 5)
+    min_lat, min_lon, max_lat, max_lon = get_bounding_box(48.39, -4.49, 5)
+
+    corners = wkt.removeprefix("POLYGON((").removesuffix("))").split(", ")
+    assert len(corners) == 5
+    assert corners[0] == corners[-1] == f"{min_lon} {min_lat}"
+    assert corners[2] == f"{max_lon} {max_lat}"
+
+
+def test_spatial_radius_params_match_clause_placeholders() -> None:
+    clause = spatial_radius_clause("p.location")
+    params = spatial_radius_params(48.39, -4.49, 5)
+
+    assert clause.count("%s") == len(params)
+    # POINT(x, y) en SRID 4326 : longitude d'abord ; rayon en mètres
+    assert params[1:] == (-4.49, 48.39, 5000)
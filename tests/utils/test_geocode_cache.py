@@ -0,0 +1,118 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils import geo_utils, geocode_cache
+from utils.rate_limiter import TokenBucket
+
+
+class FakeNominatim:
+    def __init__(self, address=None, coordinates=None):
+        self.address = address
+        self.coordinates = coordinates
+        self.calls = []
+
+    def reverse(self, query, language, timeout):
+        self.calls.append(("reverse", query))
+        return SimpleNamespace(raw={"address": self.address}) if self.address else None
+
+    def geocode(self, query, timeout):
+        self.calls.append(("geocode", query))
+        if self.coordinates is None:
+            return None
+        return SimpleNamespace(latitude=self.coordinates[0], longitude=self.coordinates[1])
+
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("GEOCODE_CACHE_PATH", str(tmp_path / "geocode.sqlite"))
+    monkeypatch.setattr(geo_utils, "_nominatim_bucket", TokenBucket(0))
+
+
+def use_nominatim(monkeypatch, **kwargs) -> FakeNominatim:
+    fake = FakeNominatim(**kwargs)
+    monkeypatch.setattr(geo_utils, "_get_geolocator", lambda: fake)
+    return fake
+
+
+def test_absent_and_expired_entries_are_misses():
+    assert geocode_cache.get(geocode_cache.FORWARD, "crozon, france") is geocode_cache.MISS
+
+    geocode_cache.put(geocode_cache.FORWARD, "crozon, france", [48.24, -4.49], ttl_s=-1)
+
+    assert geocode_cache.get(geocode_cache.FORWARD, "crozon, france") is geocode_cache.MISS
+    assert geocode_cache.purge_expired() == 1
+
+
+def test_reverse_key_rounds_to_about_ten_meters():
+    assert geocode_cache.reverse_key(48.241234, -4.491234, "fr") == geocode_cache.reverse_key(48.24119, -4.49121, "fr")
+    assert geocode_cache.reverse_key(48.2412, -4.4912, "fr") != geocode_cache.reverse_key(48.2412, -4.4912, "en")
+
+
+def test_known_city_is_geocoded_once(monkeypatch):
+    fake = use_nominatim(monkeypatch, coordinates=(48.24, -4.49))
+
+    assert geo_utils.get_coordinates_for_city("Crozon") == (48.24, -4.49)
+    assert geo_utils.get_coordinates_for_city(" crozon ") == (48.24, -4.49)
+
+    assert fake.calls == [("geocode", "Crozon, France")]
+
+
+def test_unknown_city_is_cached_as_missing_for_a_shorter_time(monkeypatch):
+    fake = use_nominatim(monkeypatch, coordinates=None)
+    before = time.time()
+
+    assert geo_utils.get_coordinates_for_city("Nullepart") == (None, None)
+    assert geo_utils.get_coordinates_for_city("Nullepart") == (None, None)
+
+    assert len(fake.calls) == 1
+    with geocode_cache._connection() as conn:
+        (expires_at,) = conn.execute("SELECT expires_at FROM geocode_cache").fetchone()
+    assert expires_at < before + geocode_cache.FOUND_TTL_S / 2
+
+
+def test_city_admin_info_and_address_share_one_reverse_call(monkeypatch):
+    fake = use_nominatim(monkeypatch, address={
+        "road": "Quai du Fret", "postcode": "29160", "town": "Crozon",
+        "county": "Finistère", "state": "Bretagne", "country": "France",
+    })
+
+    assert geo_utils.get_city_from_coordinates(48.24123, -4.49123) == "Crozon"
+    assert geo_utils.get_admin_info_from_coordinates(48.24123, -4.49123) == ("Finistère", "Bretagne", "France")
+    assert geo_utils.get_address_from_coordinates(48.24121, -4.49119) == "Quai du Fret, 29160 Crozon"
+
+    assert fake.calls == [("reverse", "48.2412, -4.4912")]
+
+
+def test_network_errors_are_not_cached(monkeypatch):
+    fake = use_nominatim(monkeypatch, coordinates=(48.24, -4.49))
+
+    def timeout(query, timeout):
+        fake.calls.append(("geocode", query))
+        raise geo_utils.GeocoderTimedOut("timeout")
+
+    monkeypatch.setattr(fake, "geocode", timeout)
+    assert geo_utils.get_coordinates_for_city("Crozon", max_retries=2) == (None, None)
+    assert len(fake.calls) == 2
+    assert geocode_cache.get(geocode_cache.FORWARD, "crozon, france") is geocode_cache.MISS
+
+
+def test_remembered_city_needs_no_geocoding(monkeypatch):
+    fake = use_nominatim(monkeypatch, coordinates=(0.0, 0.0))
+
+    assert geocode_cache.remember_city("Crozon", 48.25, -4.48)
+    assert not geocode_cache.remember_city("Crozon", 10.0, 10.0)
+
+    assert geo_utils.get_coordinates_for_city("Crozon") == (48.25, -4.48)
+    assert fake.calls == []
+
+
+def test_unusable_cache_falls_back_to_nominatim(monkeypatch, tmp_path):
+    # Un dossier à la place du fichier : SQLite ne peut pas l'ouvrir.
+    (tmp_path / "dossier.sqlite").mkdir()
+    monkeypatch.setenv("GEOCODE_CACHE_PATH", str(tmp_path / "dossier.sqlite"))
+    fake = use_nominatim(monkeypatch, coordinates=(48.24, -4.49))
+
+    assert geo_utils.get_coordinates_for_city("Crozon") == (48.24, -4.49)
+    assert len(fake.calls) == 1
@@ -0,0 +1,78 @@
+import numpy as np
+
+from utils.gpx_metrics import compute_metrics, segment_lengths_m, smooth_elevation
+
+
+def _meridian(n, step_deg=1e-4):
+    # Le long d'un méridien : 1e-4° de latitude ≈ 11,12 m.
+    return 45.0 + np.arange(n) * step_deg, np.full(n, 6.0)
+
+
+def test_segment_lengths_haversine():
+    lats, lons = _meridian(3)
+    assert np.allclose(segment_lengths_m(lats, lons), 11.119, atol=1e-3)
+
+
+def test_noise_does_not_inflate_uphill():
+    # Un point par mètre environ (enregistrement à la seconde), bruit de ±3 m.
+    lats, lons = _meridian(20000, step_deg=1e-5)
+    rng = np.random.default_rng(0)
+    trend = np.linspace(0, 300, 20000)
+    noisy = trend + rng.normal(0, 3, 20000)
+    raw_uphill = np.diff(noisy)[np.diff(noisy) > 0].sum()
+    metrics = compute_metrics(lats, lons, noisy)
+    assert raw_uphill > 1000
+    assert 280 < metrics["uphill_m"] < 320
+    assert metrics["downhill_m"] < 20
+
+
+def test_distance_and_moving_time_on_flat_track():
+    lats, lons = _meridian(1001)
+    metrics = compute_metrics(lats, lons, [100.0] * 1001)
+    assert abs(metrics["distance_m"] - 11119.5) < 1
+    assert abs(metrics["distance_3d_m"] - metrics["distance_m"]) < 1e-6
+    # Tobler à plat : 6·e^(-0,175) ≈ 5,04 km/h.
+    assert abs(metrics["moving_time_h"] - 11.1195 / 5.037) < 0.01
+
+
+def test_segment_gap_is_ignored():
+    lats = np.array([45.0, 45.0001, 46.0, 46.0001])
+    lons = np.full(4, 6.0)
+    whole = compute_metrics(lats, lons, [0, 0, 500, 500])
+    split = compute_metrics(lats, lons, [0, 0, 500, 500], segment_starts=[2])
+    assert whole["distance_m"] > 100000
+    assert abs(split["distance_m"] - 2 * 11.119) < 0.01
+    assert split["uphill_m"] == 0
+
+
+def test_smoothing_does_not_ramp_across_segment_break():
+    # Deux segments de ~5,5 km, l'un à 0 m, l'autre à 500 m : la rupture ne
+    # doit produire aucun dénivelé, même lissé.
+    lats, lons = _meridian(1000)
+    eles = np.concatenate((np.zeros(500), np.full(500, 500.0)))
+    metrics = compute_metrics(lats, lons, eles, segment_starts=[500])
+    assert metrics["uphill_m"] == 0.0 and metrics["downhill_m"] == 0.0
+    assert metrics["min_elevation_m"] == 0.0 and metrics["max_elevation_m"] == 500.0
+    assert compute_metrics(lats, lons, eles)["uphill_m"] > 499
+
+
+def test_missing_elevations():
+    lats, lons = _meridian(5)
+    partial = compute_metrics(lats, lons, [10.0, None, 30.0, None, 50.0], window_m=0)
+    assert partial["uphill_m"] == 40.0
+    none = compute_metrics(lats, lons, [None] * 5)
+    assert none["profile"] is None and none["uphill_m"] == 0.0 and none["distance_m"] > 0
+
+
+def test_profile_is_downsampled_and_spans_the_track():
+    lats, lons = _meridian(5000)
+    metrics = compute_metrics(lats, lons, np.linspace(0, 500, 5000), profile_points=100)
+    profile = metrics["profile"]
+    assert len(profile["distance_km"]) == len(profile["elevation_m"]) == 100
+    assert profile["distance_km"][0] == 0 and abs(profile["distance_km"][-1] - metrics["distance_m"] / 1000) < 1e-3
+
+
+def test_smoothing_window_on_distance():
+    distances = np.array([0.0, 10.0, 20.0, 1000.0])
+    smoothed = smooth_elevation(distances, np.array([0.0, 30.0, 0.0, 50.0]), window_m=30, passes=1)
+    assert np.allclose(smoothed, [15.0, 10.0, 15.0, 50.0])
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from utils.rate_limiter import InFlight, TokenBucket
+
+
+def test_token_bucket_spaces_calls_at_its_rate():
+    bucket = TokenBucket(20)  # un jeton toutes les 50 ms
+    start = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+    stats = bucket.stats()
+    assert stats["acquired"] == 3
+    assert stats["waiting"] == 0
+    assert stats["wait_max_s"] >= 0.04
+    assert stats["wait_avg_s"] == pytest.approx(stats["wait_total_s"] / 3)
+
+
+def test_token_bucket_serves_concurrent_threads_one_slot_each():
+    bucket = TokenBucket(20)
+    done = []
+
+    def call():
+        bucket.acquire()
+        done.append(time.monotonic())
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Un créneau de 50 ms par thread : aucun n'est partagé.
+    done.sort()
+    assert all(later - earlier >= 0.045 for earlier, later in zip(done, done[1:]))
+
+
+def test_token_bucket_without_rate_never_waits():
+    bucket = TokenBucket(0)
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+
+
+def test_in_flight_shares_one_call_between_concurrent_callers():
+    in_flight = InFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow_lookup():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return (48.24, -4.49)
+
+    leader = threading.Thread(target=lambda: results.append(in_flight.run("crozon", slow_lookup)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(in_flight.run("crozon", slow_lookup)))
+    follower.start()
+    while in_flight.coalesced == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert calls == [1]
+    assert results == [(48.24, -4.49)] * 2
+    # Une fois terminé, un nouvel appel repart bien vers la source.
+    assert in_flight.run("crozon", lambda: "nouveau") == "nouveau"
+
+
+def test_in_flight_error_reaches_every_waiting_caller():
+    in_flight = InFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise TimeoutError("Nominatim")
+
+    def call():
+        try:
+            in_flight.run("crozon", failing)
+        except TimeoutError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while in_flight.coalesced == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2
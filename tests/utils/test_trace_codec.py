@@ -0,0 +1,47 @@
+import bson
+import numpy as np
+import pytest
+
+from services.trace_store import trace_fields
+from utils.trace_codec import decode_track, encode_track
+
+
+def _series(n=2000):
+    rng = np.random.default_rng(3)
+    lats = 48.3 + np.cumsum(rng.normal(0, 1e-5, n))
+    lons = -4.5 + np.cumsum(rng.normal(0, 1e-5, n))
+    eles = 50 + np.cumsum(rng.normal(0, 0.3, n))
+    return lats, lons, eles
+
+
+def test_round_trip_within_a_microdegree():
+    lats, lons, eles = _series()
+    decoded_lats, decoded_lons, decoded_eles = decode_track(trace_fields(lats, lons, eles)["track"])
+    assert np.max(np.abs(decoded_lats - lats)) <= 0.5e-6
+    assert np.max(np.abs(decoded_lons - lons)) <= 0.5e-6
+    assert np.allclose(decoded_eles, eles, atol=1e-3)
+
+
+def test_missing_elevation_is_nan():
+    _, _, eles = decode_track(encode_track([1.0, 2.0], [3.0, 4.0], [None, 12.5]))
+    assert np.isnan(eles[0]) and eles[1] == 12.5
+
+
+def test_without_elevation_and_empty():
+    lats, lons, eles = decode_track(encode_track([], []))
+    assert len(lats) == len(lons) == 0 and eles is None
+
+
+def test_much_smaller_than_subdocuments():
+    lats, lons, eles = _series()
+    points = [{"lat": float(a), "lon": float(o), "ele": float(e)} for a, o, e in zip(lats, lons, eles)]
+    legacy = len(bson.encode({"points": points}))
+    packed = len(bson.encode({"track": trace_fields(lats, lons, eles)["track"]}))
+    assert packed * 4 < legacy
+
+
+def test_unknown_version_rejected():
+    track = encode_track([1.0], [2.0])
+    track["v"] = 99
+    with pytest.raises(ValueError):
+        decode_track(track)
@@ -0,0 +1,105 @@
+import numpy as np
+
+from utils.trace_utils import (
+    bbox_tolerance_m,
+    douglas_peucker_mask,
+    encode_polyline,
+    pick_level,
+    project_mercator,
+    simplify_trace,
+    trace_bbox,
+    trace_levels,
+    zoom_to_tolerance_m,
+)
+
+
+def test_encode_polyline_reference_example():
+    # Exemple de la documentation Google.
+    lats = [38.5, 40.7, 43.252]
+    lons = [-120.2, -120.95, -126.453]
+    assert encode_polyline(lats, lons) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_encode_polyline_empty():
+    assert encode_polyline([], []) == ""
+
+
+def test_straight_line_keeps_endpoints_only():
+    # Un parallèle est une droite en Web Mercator.
+    lats = np.full(500, 48.0)
+    lons = np.linspace(-4.0, -3.9, 500)
+    s_lats, s_lons = simplify_trace(lats, lons, tolerance_m=1.0)
+    assert list(zip(s_lats, s_lons)) == [(lats[0], lons[0]), (lats[-1], lons[-1])]
+
+
+def test_simplified_points_stay_within_tolerance():
+    rng = np.random.default_rng(0)
+    lats = 48.0 + np.cumsum(rng.normal(0, 1e-4, 5000))
+    lons = -4.0 + np.cumsum(rng.normal(0, 1e-4, 5000))
+    tolerance = zoom_to_tolerance_m(15)
+    x, y = project_mercator(lats, lons)
+    keep = douglas_peucker_mask(x, y, tolerance)
+    assert keep[0] and keep[-1] and keep.sum() < len(keep)
+
+    # Chaque point retiré est à moins de la tolérance du segment qui le remplace.
+    kept = np.flatnonzero(keep)
+    for start, end in zip(kept[:-1], kept[1:]):
+        for i in range(start + 1, end):
+            p, a, b = np.array([x[i], y[i]]), np.array([x[start], y[start]]), np.array([x[end], y[end]])
+            t = np.clip(np.dot(p - a, b - a) / max(np.dot(b - a, b - a), 1e-12), 0, 1)
+            assert np.linalg.norm(p - (a + t * (b - a))) <= tolerance + 1e-6
+
+
+def test_closed_loop_is_not_collapsed():
+    angles = np.linspace(0, 2 * np.pi, 200)
+    lats = 48.0 + 0.01 * np.sin(angles)
+    lons = -4.0 + 0.01 * np.cos(angles)
+    s_lats, _ = simplify_trace(lats, lons, tolerance_m=10.0)
+    assert 4 < len(s_lats) < 200
+
+
+def test_zoom_to_tolerance_halves_per_level():
+    assert zoom_to_tolerance_m(16) * 2 == zoom_to_tolerance_m(15)
+    assert round(zoom_to_tolerance_m(0)) == 156543
+
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 48.0 + np.cumsum(rng.normal(0, 1e-4, n)), -4.0 + np.cumsum(rng.normal(0, 1e-4, n))
+
+
+def test_levels_match_douglas_peucker_at_their_tolerance():
+    lats, lons = random_walk(3000)
+    x, y = project_mercator(lats, lons)
+    for level in trace_levels(lats, lons, sizes=(50, 500)):
+        assert 2 <= len(level["lat"]) <= level["max_points"]
+        # Le niveau est exactement Douglas-Peucker à sa tolérance.
+        keep = douglas_peucker_mask(x, y, level["tolerance_m"])
+        assert lats[keep].tolist() == level["lat"]
+
+
+def test_short_trace_levels_are_complete():
+    lats, lons = random_walk(30)
+    levels = trace_levels(lats, lons)
+    assert [lvl["max_points"] for lvl in levels] == [50, 500, 5000]
+    assert all(lvl["tolerance_m"] == 0 and len(lvl["lat"]) == 30 for lvl in levels)
+
+
+def test_pick_level_prefers_coarsest_sufficient():
+    levels = [
+        {"max_points": 500, "tolerance_m": 3.0},
+        {"max_points": 50, "tolerance_m": 40.0},
+        {"max_points": 5000, "tolerance_m": 0.2},
+    ]
+    assert pick_level(levels, 50.0)["max_points"] == 50
+    assert pick_level(levels, 5.0)["max_points"] == 500
+    assert pick_level(levels, 0.1) is None
+    assert pick_level(None, 10.0) is None
+
+
+def test_bbox_and_pixel_tolerance():
+    bbox = trace_bbox(np.array([48.0, 48.1]), np.array([-4.0, -3.9]))
+    assert bbox == {"min_lat": 48.0, "min_lon": -4.0, "max_lat": 48.1, "max_lon": -3.9}
+    assert trace_bbox(np.array([]), np.array([])) is None
+    # ~0,1° de latitude à 48° ≈ 16,7 km en Mercator, sur 700 px.
+    assert 20 < bbox_tolerance_m(bbox, 700) < 30